@@ -0,0 +1,162 @@
+"""
+Async HTTP front end for the Razorpay MCP server.
+
+Serves the same routes as the Flask app in main.py (/mcp, /mcp/request,
+/mcp/tools, /mcp/metadata and /mcp/health) with async handlers over the same
+execute_tool dispatch. An in-flight Razorpay call no longer pins a WSGI worker
+thread: it parks on the event loop while the blocking SDK call runs in a
+worker thread drawn from a large capacity limiter, so one worker process can
+hold thousands of slow upstream calls.
+
+Run it with uvicorn (installed with the mcp package):
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+The Flask app stays available as the compatibility mode.
+"""
+import os
+import logging
+import traceback
+
+import anyio
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from razorpay_client import get_default_client
+from razorpay_pool import client_pool, credentials_from_headers, resolve_client
+from prefetch import prefetcher
+from tool_dispatch import execute_tool
+from scheduler import activity, scheduler
+from prebuilt_responses import (METADATA_REPLY_RESPONSE, METADATA_RESPONSE, TOOLS_RESPONSE,
+                                StaticResponseASGIMiddleware)
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on Razorpay calls in flight in this process
+MAX_INFLIGHT = int(os.environ.get("RAZORPAY_ASGI_MAX_INFLIGHT", "1000"))
+
+_upstream_limiter = None
+
+
+def _limiter():
+    # CapacityLimiter must be created inside the running event loop
+    global _upstream_limiter
+    if _upstream_limiter is None:
+        _upstream_limiter = anyio.CapacityLimiter(MAX_INFLIGHT)
+    return _upstream_limiter
+
+
+async def run_tool(request: Request, tool_name, arguments):
+    """Run execute_tool for the request's merchant without blocking the event loop"""
+    client = resolve_client(credentials_from_headers(request.headers))
+    with activity.track():
+        return await anyio.to_thread.run_sync(execute_tool, tool_name, arguments, client, limiter=_limiter())
+
+
+def prebuilt(request: Request, response):
+    """Starlette response for a PrebuiltResponse, honouring If-None-Match"""
+    status, headers, body = response.respond(request.headers.get("if-none-match"),
+                                             request.headers.get("accept-encoding"))
+    return Response(body, status_code=status, headers=dict(headers))
+
+
+async def _json_body(request: Request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def health_check(request: Request):
+    """Health check endpoint"""
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics(request: Request):
+    """Runtime metrics for this worker"""
+    return JSONResponse({"client_pool": client_pool.stats(), "prefetch": prefetcher.stats(),
+                         "entity_cache": get_default_client().entity_cache.stats(),
+                         "negative_cache": get_default_client().negative_cache.stats(),
+                         "scheduler": scheduler.stats()})
+
+
+async def list_tools(request: Request):
+    """List available tools"""
+    return prebuilt(request, TOOLS_RESPONSE)
+
+
+async def get_metadata(request: Request):
+    """Return metadata about the MCP implementation"""
+    return prebuilt(request, METADATA_RESPONSE)
+
+
+async def handle_request(request: Request):
+    """Handle MCP request"""
+    try:
+        data = await _json_body(request)
+        logger.debug(f"Received MCP request: {data}")
+
+        if not data:
+            return JSONResponse({"error": "No data provided"}, status_code=400)
+
+        tool_name = data.get("tool_name")
+        arguments = data.get("arguments", {})
+
+        if not tool_name:
+            return JSONResponse({"error": "No tool_name provided"}, status_code=400)
+
+        logger.info(f"Calling tool: {tool_name} with arguments: {arguments}")
+
+        result = await run_tool(request, tool_name, arguments)
+        return JSONResponse(result)
+
+    except Exception as e:
+        logger.error(f"Error handling MCP request: {str(e)}")
+        logger.error(traceback.format_exc())
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def handle_standard_mcp(request: Request):
+    """Handle standard MCP protocol requests"""
+    try:
+        data = await _json_body(request)
+        if not data:
+            return JSONResponse({"error": "No data provided"}, status_code=400)
+
+        request_type = data.get("type")
+
+        if request_type == "metadata":
+            return prebuilt(request, METADATA_REPLY_RESPONSE)
+
+        elif request_type == "tool":
+            tool_name = data.get("name")
+            arguments = data.get("parameters", {})
+
+            if not tool_name:
+                return JSONResponse({"error": "No tool name provided"}, status_code=400)
+
+            result = await run_tool(request, tool_name, arguments)
+            return JSONResponse({"type": "tool_result", "data": result})
+
+        else:
+            return JSONResponse({"error": f"Unsupported request type: {request_type}"}, status_code=400)
+
+    except Exception as e:
+        logger.error(f"Error handling standard MCP request: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+routes = [
+    Route("/mcp/health", health_check, methods=["GET"]),
+    Route("/mcp/metrics", metrics, methods=["GET"]),
+    Route("/mcp/tools", list_tools, methods=["GET"]),
+    Route("/mcp/metadata", get_metadata, methods=["GET"]),
+    Route("/mcp/request", handle_request, methods=["POST"]),
+    Route("/mcp", handle_standard_mcp, methods=["POST"]),
+]
+
+# The static catalogue endpoints are answered from pre-built bytes ahead of routing
+# The lifespan runs the RAZORPAY_SCHEDULED_JOBS refresh jobs on the server's event loop
+app = StaticResponseASGIMiddleware(Starlette(routes=routes, lifespan=scheduler.lifespan))
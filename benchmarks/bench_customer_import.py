@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Throughput of the deduplicating bulk customer import.
+
+Writes a synthetic CRM export (CSV) in which a share of the rows are customers
+already on the account and a share repeat an earlier row, then imports it
+through RazorpayClient against an in-process stand-in for Razorpay's customer
+API. Every create, fetch and edit costs a fixed simulated latency; the account's existing customers
+are served to the index sync page by page. The script reports rows per
+second, how many rows reached Razorpay and the peak memory of the run.
+
+    python benchmarks/bench_customer_import.py --rows 100000 --existing 0.4 --latency-ms 50
+"""
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bulk_customers import import_customers_bulk  # noqa: E402
+from razorpay_client import RazorpayClient  # noqa: E402
+
+
+class SimulatedCustomers:
+    """customer.all / create / fetch / edit with created_at ordering and create latency."""
+
+    def __init__(self, latency_s):
+        self.latency_s = latency_s
+        self.rows = []
+        self.creates = 0
+        self._lock = threading.Lock()
+
+    def all(self, data=None, **kwargs):
+        data = data or {}
+        newest_first = [row for row in reversed(self.rows)
+                        if data.get("from", 0) <= row["created_at"] <= data.get("to", 2 ** 40)]
+        skip, count = data.get("skip", 0), data.get("count", 10)
+        page = newest_first[skip:skip + count]
+        return {"entity": "collection", "count": len(page), "items": page}
+
+    def create(self, data=None, **kwargs):
+        time.sleep(self.latency_s)
+        with self._lock:
+            self.creates += 1
+            customer = dict(data, id=f"cust_{len(self.rows):014d}", entity="customer",
+                            created_at=1700000000 + len(self.rows))
+            self.rows.append(customer)
+        return customer
+
+    def fetch(self, customer_id, data=None, **kwargs):
+        time.sleep(self.latency_s)
+        return dict(self.rows[int(customer_id[len("cust_"):])])
+
+    def edit(self, customer_id, data=None, **kwargs):
+        time.sleep(self.latency_s)
+        with self._lock:
+            customer = self.rows[int(customer_id[len("cust_"):])]
+            customer.update(data)
+        return dict(customer)
+
+
+def write_input(path, rows, existing_share, duplicate_share, backend, seed=7):
+    """Write the CSV and pre-load ``backend`` with the customers that already exist."""
+    rng = random.Random(seed)
+    written = []
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "email", "contact", "notes.crm_id"])
+        for i in range(rows):
+            if written and rng.random() < duplicate_share:
+                writer.writerow(rng.choice(written))
+                continue
+            row = [f"Customer {i}", f"customer{i}@example.com", f"+91 9{i:09d}", f"crm-{i}"]
+            if rng.random() < existing_share:
+                backend.rows.append({"id": f"cust_{len(backend.rows):014d}", "entity": "customer",
+                                     "name": row[0], "email": row[1], "contact": row[2].replace(" ", ""),
+                                     "created_at": 1600000000 + len(backend.rows)})
+            if len(written) < 1000:
+                written.append(row)
+            writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="Rows in the input file")
+    parser.add_argument("--existing", type=float, default=0.4, help="Share of rows already on the account")
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Share of rows repeating an earlier row")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated Razorpay create latency")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent create calls")
+    parser.add_argument("--rate", type=float, default=0, help="Calls per second (0 = unpaced)")
+    parser.add_argument("--mode", choices=("skip", "merge"), default="skip")
+    args = parser.parse_args()
+
+    backend = SimulatedCustomers(args.latency_ms / 1000.0)
+    client = RazorpayClient()
+    client._client = type("SimulatedRazorpay", (), {"customer": backend})()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "customers.csv")
+        write_input(path, args.rows, args.existing, args.duplicates, backend)
+        existing = len(backend.rows)
+        print(f"{args.rows} rows, {existing} customers already on the account")
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        summary = import_customers_bulk(client, path, mode=args.mode, output_path=os.path.join(tmp, "out.ndjson"),
+                                        max_workers=args.workers, rate_per_second=args.rate or None)
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"created {summary['created']}, merged {summary['merged']}, skipped {summary['skipped']}, "
+          f"failed {summary['failed']}")
+    print(f"{summary['sent_to_razorpay']} of {args.rows} rows sent to Razorpay ({backend.creates} creates)")
+    print(f"{elapsed:.1f}s total, {summary['rows'] / elapsed:,.0f} rows/s, peak traced memory {peak / 2 ** 20:.1f} MB")
+    naive = args.rows * args.latency_ms / 1000.0 / args.workers
+    print(f"creating every row at the same concurrency would take about {naive:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
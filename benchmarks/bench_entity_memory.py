@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Memory per cached payment: SDK dicts against the compact entity model.
+
+Builds synthetic payment payloads the way the SDK does (json.loads of a
+Razorpay-shaped response, so every string is its own object) and measures,
+with tracemalloc, the bytes each one holds as:
+
+  * a raw SDK dict
+  * an entities.Payment
+  * an entry of an EntityCache sized to hold them all (key, LRU slot and
+    expiry included)
+
+Raw dicts take a few GB at 1M, so they are measured on a sample
+(--raw-count) and reported per entity. A sample of entities is checked to
+round-trip to the original payload.
+
+    python benchmarks/bench_entity_memory.py --count 1000000 --raw-count 100000
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from entities import Payment  # noqa: E402
+from entity_cache import EntityCache  # noqa: E402
+
+METHODS = ("card", "upi", "netbanking", "wallet")
+STATUSES = ("captured", "captured", "captured", "authorized", "failed", "refunded")
+
+
+def _id(prefix, rng):
+    return f"{prefix}{rng.getrandbits(56):014x}"
+
+
+def payloads(count, seed=7):
+    """``count`` payment responses as JSON text, as they come off the wire."""
+    rng = random.Random(seed)
+    created = 1700000000
+    for i in range(count):
+        method = rng.choice(METHODS)
+        status = rng.choice(STATUSES)
+        amount = rng.randrange(100, 5000000)
+        created += rng.randrange(1, 30)
+        payment = {
+            "id": _id("pay_", rng), "entity": "payment", "amount": amount, "currency": "INR",
+            "status": status, "order_id": _id("order_", rng), "invoice_id": None, "international": False,
+            "method": method, "amount_refunded": amount if status == "refunded" else 0,
+            "refund_status": "full" if status == "refunded" else None, "captured": status in ("captured", "refunded"),
+            "description": f"Order #{100000 + i}", "card_id": _id("card_", rng) if method == "card" else None,
+            "bank": "HDFC" if method == "netbanking" else None, "wallet": "paytm" if method == "wallet" else None,
+            "vpa": f"user{i}@okaxis" if method == "upi" else None, "email": f"customer{i}@example.com",
+            "contact": f"+9198{rng.randrange(10 ** 8):08d}", "customer_id": _id("cust_", rng),
+            "notes": {"order_ref": f"ORD-{i}", "channel": rng.choice(("web", "app"))},
+            "fee": amount // 50, "tax": amount // 278, "error_code": "BAD_REQUEST_ERROR" if status == "failed" else None,
+            "error_description": "Payment failed" if status == "failed" else None,
+            "error_source": None, "error_step": None, "error_reason": None,
+            "acquirer_data": {"auth_code": f"{rng.randrange(10 ** 6):06d}", "rrn": f"{rng.randrange(10 ** 12):012d}"},
+            "created_at": created,
+        }
+        if method == "card":
+            payment["card"] = {"id": payment["card_id"], "entity": "card", "name": "", "last4": f"{i % 10000:04d}",
+                               "network": "Visa", "type": "credit", "issuer": "HDFC", "international": False,
+                               "emi": False, "sub_type": "consumer"}
+        yield json.dumps(payment)
+
+
+def measure(label, build, count):
+    gc.collect()
+    tracemalloc.start()
+    started = time.monotonic()
+    held = build()
+    took = time.monotonic() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<14} {count:>9,} entities  {current / 2 ** 20:9.1f} MB  {current / count:8,.0f} B/entity  "
+          f"built in {took:.1f}s")
+    return held, current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000000, help="Payments held as entities and in the cache")
+    parser.add_argument("--raw-count", type=int, default=100000, help="Payments held as raw dicts (a sample)")
+    args = parser.parse_args()
+
+    raw, raw_bytes = measure("raw dicts", lambda: [json.loads(text) for text in payloads(args.raw_count)],
+                             args.raw_count)
+    del raw
+
+    entities, entity_bytes = measure("entities", lambda: [Payment.from_dict(json.loads(text))
+                                                          for text in payloads(args.count)], args.count)
+    sample = list(payloads(min(1000, args.count)))
+    assert all(entities[i].to_dict() == json.loads(text) for i, text in enumerate(sample)), "round trip failed"
+    del entities
+
+    def fill_cache():
+        cache = EntityCache(max_entries=args.count, ttl=3600)
+        for text in payloads(args.count):
+            payment = json.loads(text)
+            cache.put("payment", payment["id"], payment)
+        return cache
+
+    cache, cache_bytes = measure("entity cache", fill_cache, args.count)
+    assert len(cache._entries) == args.count
+    print(f"entities take {entity_bytes / raw_bytes:.0%} of the raw dicts' memory; "
+          f"1M cached payments: {cache_bytes * 1e6 / 2 ** 30:.2f} GB (raw dicts alone: {raw_bytes * 1e6 / 2 ** 30:.2f} GB)")
+
+
+if __name__ == "__main__":
+    main()
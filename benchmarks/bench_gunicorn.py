@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Compare gunicorn profiles for the Razorpay MCP HTTP server.
+
+Each profile from gunicorn_config.py is started against a synthetic replay
+cassette, so every /mcp/request call costs a fixed simulated Razorpay
+latency and nothing leaves the machine. A pool of client threads then drives
+payment_fetch calls for a fixed duration and the script reports throughput,
+latency percentiles and the memory (PSS) of the whole gunicorn tree.
+
+    python benchmarks/bench_gunicorn.py --latency-ms 200 --clients 64 --duration 20
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.request
+from urllib.error import URLError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from razorpay_cassette import request_key  # noqa: E402
+
+PAYMENT_ID = "pay_BenchPayment01"
+
+PROFILES = [
+    ("sync", {"GUNICORN_WORKER_CLASS": "sync"}),
+    ("gthread", {"GUNICORN_WORKER_CLASS": "gthread"}),
+    ("gthread, no preload", {"GUNICORN_WORKER_CLASS": "gthread", "GUNICORN_PRELOAD": "0"}),
+    ("async", {"GUNICORN_WORKER_CLASS": "async"}),
+]
+
+
+def write_cassette(path, latency_s):
+    """Write a one-interaction cassette answering the benchmark payment fetch."""
+    import gzip
+
+    url = f"https://api.razorpay.com/v1/payments/{PAYMENT_ID}"
+    entry = {
+        "key": request_key("GET", url, {"params": {}}),
+        "method": "GET",
+        "path": f"/v1/payments/{PAYMENT_ID}",
+        "status": 200,
+        "body": {"id": PAYMENT_ID, "entity": "payment", "amount": 50000, "currency": "INR",
+                 "status": "captured", "method": "upi", "created_at": 1700000000},
+        "elapsed": latency_s,
+    }
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def pss_kb(root_pid):
+    """Proportional set size of a process and its direct children, in KB (Linux only).
+
+    PSS splits pages shared copy-on-write between the processes sharing them,
+    so unlike RSS it shows what preloading actually saves.
+    """
+    pids = [root_pid]
+    try:
+        with open(f"/proc/{root_pid}/task/{root_pid}/children") as f:
+            pids += [int(pid) for pid in f.read().split()]
+    except OSError:
+        return None
+
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Pss:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/mcp/health", timeout=1).read()
+            return True
+        except (URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    return False
+
+
+def drive(base_url, clients, duration):
+    """Run the load for ``duration`` seconds; return (latencies, errors)."""
+    body = json.dumps({"tool_name": "payment_fetch", "arguments": {"payment_id": PAYMENT_ID}}).encode()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                req = urllib.request.Request(f"{base_url}/mcp/request", data=body,
+                                             headers={"Content-Type": "application/json"})
+                urllib.request.urlopen(req, timeout=30).read()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(name, overrides, args, cassette):
+    env = dict(os.environ)
+    env.update(overrides)
+    env.update({
+        "RAZORPAY_CASSETTE": cassette,
+        "RAZORPAY_CASSETTE_MODE": "replay",
+        "RAZORPAY_CASSETTE_LATENCY_SCALE": "1.0",
+        "RAZORPAY_UPSTREAM_LATENCY_MS": str(args.latency_ms),
+        "GUNICORN_BIND": f"127.0.0.1:{args.port}",
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        if not wait_ready(base_url):
+            return {"profile": name, "error": "server did not start"}
+        latencies, errors = drive(base_url, args.clients, args.duration)
+        return {
+            "profile": name,
+            "rps": len(latencies) / args.duration,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "errors": errors,
+            "pss_mb": (pss_kb(proc.pid) or 0) / 1024,
+        }
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=200, help="Simulated Razorpay latency")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent client threads")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per profile")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--profile", action="append", help="Only run the named profile(s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = os.path.join(tmp, "bench.jsonl.gz")
+        write_cassette(cassette, args.latency_ms / 1000)
+
+        print(f"{'profile':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'PSS MB':>10}")
+        for name, overrides in PROFILES:
+            if args.profile and name not in args.profile:
+                continue
+            row = run_profile(name, overrides, args, cassette)
+            if "error" in row:
+                print(f"{name:<22}{row['error']}")
+                continue
+            print(f"{name:<22}{row['rps']:>10.1f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+                  f"{row['errors']:>8}{row['pss_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Measure cold start of the stdio MCP server.
+
+For each mode (--fast-start and --no-fast-start) the server is launched
+fresh several times and driven over stdio:
+
+  * ready       time until the initialize response arrives
+  * tools/list  time until the tool list arrives
+  * first call  time until the first razorpay_payments_get result arrives,
+                answered from a zero-latency replay cassette
+
+It then prints the slowest imports (cumulative) from ``python -X importtime``.
+
+    python benchmarks/profile_startup.py --runs 5
+"""
+import os
+import sys
+import json
+import time
+import gzip
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from razorpay_cassette import request_key  # noqa: E402
+
+PAYMENT_ID = "pay_StartupProbe01"
+
+
+def write_cassette(path):
+    url = f"https://api.razorpay.com/v1/payments/{PAYMENT_ID}"
+    entry = {
+        "key": request_key("GET", url, {"params": {}}),
+        "method": "GET",
+        "path": f"/v1/payments/{PAYMENT_ID}",
+        "status": 200,
+        "body": {"id": PAYMENT_ID, "entity": "payment", "amount": 100, "status": "captured"},
+        "elapsed": 0,
+    }
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def _send(proc, message):
+    proc.stdin.write(json.dumps(message) + "\n")
+    proc.stdin.flush()
+
+
+def _wait_for(proc, request_id):
+    for line in proc.stdout:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if message.get("id") == request_id:
+            return message
+    raise RuntimeError("server exited before answering")
+
+
+def time_session(extra_args, env):
+    """Launch one server and return (ready, tools_list, first_call) in seconds."""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "razorpay_mcp_server.py")] + extra_args,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, env=env, cwd=ROOT
+    )
+    try:
+        _send(proc, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2024-11-05", "capabilities": {},
+            "clientInfo": {"name": "profile-startup", "version": "1.0"}}})
+        _wait_for(proc, 1)
+        ready = time.perf_counter() - started
+        _send(proc, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+        _send(proc, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        _wait_for(proc, 2)
+        tools_list = time.perf_counter() - started
+
+        _send(proc, {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {
+            "name": "razorpay_payments_get", "arguments": {"arguments": {"payment_id": PAYMENT_ID}}}})
+        _wait_for(proc, 3)
+        first_call = time.perf_counter() - started
+        return ready, tools_list, first_call
+    finally:
+        proc.stdin.close()
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def top_imports(limit):
+    """Slowest direct imports of the server by cumulative time, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import razorpay_mcp_server"],
+        capture_output=True, text=True, cwd=ROOT
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line[len("import time:"):].split("|")
+        module = module[1:]
+        # Keep the server's direct imports; deeper modules are counted in their parents
+        depth = (len(module) - len(module.lstrip())) // 2
+        if depth == 1:
+            rows.append((int(cumulative_us), module.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--imports", type=int, default=10, help="How many slow imports to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cassette = os.path.join(tmp, "startup.jsonl.gz")
+        write_cassette(cassette)
+        env = dict(os.environ, RAZORPAY_CASSETTE=cassette, RAZORPAY_CASSETTE_MODE="replay",
+                   RAZORPAY_CASSETTE_LATENCY_SCALE="0")
+
+        print(f"{'mode':<18}{'ready ms':>10}{'tools/list ms':>15}{'first call ms':>15}")
+        for mode, extra in (("--no-fast-start", ["--no-fast-start"]), ("--fast-start", ["--fast-start"])):
+            samples = [time_session(extra, env) for _ in range(args.runs)]
+            ready, listed, called = (statistics.median(column) * 1000 for column in zip(*samples))
+            print(f"{mode:<18}{ready:>10.1f}{listed:>15.1f}{called:>15.1f}")
+
+    print("\nSlowest imports (cumulative) for `import razorpay_mcp_server`:")
+    for cumulative_us, module in top_imports(args.imports):
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Deduplicating bulk customer import.
+
+import_customers_bulk() streams customer records (name, email, contact and
+``notes.<key>`` columns) from a CSV/NDJSON file or a list. Each record is
+checked against the client's CustomerIndex by normalized email and contact
+before anything is sent to Razorpay:
+
+  * a customer already on the merchant account is skipped, or with
+    ``mode="merge"`` updated with the record's changed fields
+  * a record repeating an earlier one in the same input is skipped
+  * only new customers are created, on BulkRunner's paced worker pool
+
+The lookups are in-memory, so a re-imported CRM export costs one incremental
+index sync rather than one API call per row. The index is synced before the
+first record is read. Customers created by an earlier, interrupted run are
+then already indexed, so rerunning the same input resumes it without a
+checkpoint. Creates also send ``fail_existing=0``, so Razorpay returns rather
+than duplicates a customer that appeared after the sync.
+"""
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from bulk_runner import DONE, BulkRunner, OutputWriter, read_records
+from local_index import normalize_contact, normalize_email
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SKIP = "skip"
+MERGE = "merge"
+CUSTOMER_FIELDS = ("name", "email", "contact")
+
+
+def record_to_customer(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Map one input record to create_customer parameters."""
+    customer = {}
+    for field in CUSTOMER_FIELDS:
+        value = record.get(field)
+        if value not in (None, ""):
+            customer[field] = str(value).strip()
+    notes = dict(record["notes"]) if isinstance(record.get("notes"), dict) else {}
+    for column, value in record.items():
+        if column.startswith("notes.") and value not in (None, ""):
+            notes[column[len("notes."):]] = value
+    if notes:
+        customer["notes"] = notes
+    return customer
+
+
+def _changes(existing: Dict[str, Any], customer: Dict[str, Any]) -> Dict[str, Any]:
+    changes = {}
+    if customer.get("name") and customer["name"] != existing.get("name"):
+        changes["name"] = customer["name"]
+    if customer.get("email") and normalize_email(customer["email"]) != normalize_email(existing.get("email")):
+        changes["email"] = customer["email"]
+    if customer.get("contact") and normalize_contact(customer["contact"]) != normalize_contact(existing.get("contact")):
+        changes["contact"] = customer["contact"]
+    return changes
+
+
+def import_customers_bulk(client, customers: Union[str, Iterable[Dict[str, Any]]], mode: str = SKIP,
+                          output_path: Optional[str] = None, max_workers: int = 4,
+                          rate_per_second: Optional[float] = 5.0, sync_index: bool = True,
+                          progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+    """Create the customers that do not exist yet and return the run summary.
+
+    ``customers`` is an iterable of records or the path of a CSV/NDJSON file.
+    With ``output_path``, one NDJSON line per record is appended:
+    {row, status, id, reason, error} where status is created, merged,
+    skipped or failed. ``rate_per_second=None`` leaves calls unpaced.
+    """
+    if mode not in (SKIP, MERGE):
+        raise ValueError(f"mode must be '{SKIP}' or '{MERGE}'")
+    started = time.monotonic()
+    index = client.customer_index
+    if sync_index:
+        index.sync(client)
+
+    records = read_records(customers) if isinstance(customers, str) else customers
+    total = None if isinstance(customers, str) else (len(customers) if hasattr(customers, "__len__") else None)
+    output = OutputWriter(output_path) if output_path else None
+    counts = {"created": 0, "merged": 0, "skipped": 0, "failed": 0}
+    lock = threading.Lock()
+    last_progress = [0.0]
+
+    def report_progress(final=False):
+        if progress is None:
+            return
+        now = time.monotonic()
+        with lock:
+            if not final and now - last_progress[0] < 0.5:
+                return
+            last_progress[0] = now
+            done = sum(counts.values())
+        try:
+            progress(done, total)
+        except Exception as e:
+            logger.debug(f"Progress callback failed: {str(e)}")
+
+    def outcome(row, status, customer_id=None, reason=None, error=None):
+        with lock:
+            counts[status] += 1
+        if output is not None:
+            record = {"row": row, "status": status}
+            if customer_id:
+                record["id"] = customer_id
+            if reason:
+                record["reason"] = reason
+            if error:
+                record["error"] = error
+            output.write(record)
+
+    # Emails and contacts of rows already seen in this input, to drop repeats
+    # while the first copy may still be in flight
+    claimed = set()
+
+    def work():
+        """Yield the records that need an API call; settle the rest here."""
+        for row, record in enumerate(records):
+            customer = record_to_customer(record)
+            keys = {key for key in (("email", normalize_email(customer.get("email"))),
+                                    ("contact", normalize_contact(customer.get("contact")))) if key[1]}
+            if keys & claimed:
+                outcome(row, "skipped", reason="duplicate in input")
+            else:
+                claimed.update(keys)
+                existing = index.find(email=customer.get("email"), contact=customer.get("contact"))
+                if existing is None:
+                    yield row, "create", customer, None
+                elif mode == MERGE and (_changes(existing, customer) or customer.get("notes")):
+                    yield row, "merge", customer, existing
+                else:
+                    outcome(row, "skipped", customer_id=existing["id"], reason="exists")
+            report_progress()
+
+    def apply(item):
+        row, action, customer, existing = item
+        if action == "create":
+            return "created", client.create_customer(dict(customer, fail_existing="0"))
+        changes = _changes(existing, customer)
+        if customer.get("notes"):
+            current_notes = client.get_customer({"id": existing["id"]}).get("notes") or {}
+            if isinstance(current_notes, list):
+                # Razorpay sends empty notes as []
+                current_notes = {}
+            merged_notes = dict(current_notes, **customer["notes"])
+            if merged_notes != current_notes:
+                changes["notes"] = merged_notes
+        if not changes:
+            return "skipped", existing
+        return "merged", client.edit_customer(dict(changes, id=existing["id"]))
+
+    def record_outcome(seq, item, status, payload):
+        row = item[0]
+        if status != DONE:
+            outcome(row, "failed", error=payload)
+            return
+        action, customer = payload
+        outcome(row, action, customer_id=customer.get("id"), reason="unchanged" if action == "skipped" else None)
+
+    runner = BulkRunner(
+        apply,
+        max_workers=max_workers,
+        rate_limiter=TokenBucket(rate_per_second, burst=max(1, int(rate_per_second))) if rate_per_second else None,
+        key=lambda item: f"row {item[0]}",
+        on_result=record_outcome,
+        progress=lambda done, _: report_progress(),
+    )
+    logger.info(f"Starting customer import ({mode} mode) against an index of {len(index)} customers")
+    try:
+        run = runner.run(work(), total=total)
+    finally:
+        if output is not None:
+            output.close()
+    report_progress(final=True)
+
+    summary = dict(counts)
+    summary.update({
+        "rows": sum(counts.values()),
+        "sent_to_razorpay": run["processed"],
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "failures": run["failures"],
+        "index": index.stats(),
+    })
+    if "rate_limit" in run:
+        summary["rate_limit"] = run["rate_limit"]
+    if output_path:
+        summary["output"] = output_path
+    return summary
@@ -0,0 +1,139 @@
+"""
+Bulk payment-link creation from CSV or NDJSON files.
+
+create_payment_links_bulk() streams rows from the input file, maps each row's
+columns to create_payment_link parameters and creates the links on
+BulkRunner's paced worker pool. Each outcome is appended to an NDJSON output
+file as it completes. With a checkpoint, a crashed run resumes where it
+stopped. Rows are streamed and outcomes written as they arrive, so memory
+stays flat however large the file is.
+
+Every link gets a reference_id, taken from the row or derived from the batch
+id and row number. Razorpay refuses a second link with the same
+reference_id, and on resume a row that was in flight is first looked up by
+its reference_id, so no customer gets two links.
+
+Column mapping: ``mapping`` maps create_payment_link parameters to input
+columns, e.g. {"customer_email": "Email", "amount": "Amount (paise)"}.
+Parameters not in the mapping are read from a column of the same name.
+Columns named ``notes.<key>`` become link notes. ``defaults`` fills
+parameters the row leaves empty, e.g. {"currency": "INR"}.
+"""
+import uuid
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from bulk_runner import DONE, BulkRunner, CheckpointJournal, OutputWriter, read_records
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+LINK_PARAMS = (
+    "amount", "currency", "description", "customer_name", "customer_email", "customer_contact",
+    "reference_id", "expire_by", "callback_url", "callback_method",
+)
+INTEGER_PARAMS = ("amount", "expire_by")
+BOOLEAN_PARAMS = ("notify_sms", "notify_email", "reminder_enable")
+
+
+def _as_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def row_to_params(row: Dict[str, Any], mapping: Optional[Dict[str, str]] = None,
+                  defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Map one input row to create_payment_link parameters."""
+    mapping = mapping or {}
+    params = dict(defaults or {})
+    for param in LINK_PARAMS + BOOLEAN_PARAMS:
+        value = row.get(mapping.get(param, param))
+        if value in (None, ""):
+            continue
+        if param in INTEGER_PARAMS:
+            value = int(value)
+        elif param in BOOLEAN_PARAMS:
+            value = _as_bool(value)
+        params[param] = value
+
+    notes = dict(params.get("notes") or {})
+    if isinstance(row.get("notes"), dict):
+        notes.update(row["notes"])
+    for column, value in row.items():
+        if column.startswith("notes.") and value not in (None, ""):
+            notes[column[len("notes."):]] = value
+    if notes:
+        params["notes"] = notes
+    return params
+
+
+def derived_reference_id(batch_id: str, seq: int) -> str:
+    # Razorpay reference ids are limited to 40 characters
+    return "bl_" + hashlib.sha256(f"{batch_id}:{seq}".encode("utf-8")).hexdigest()[:32]
+
+
+def create_payment_links_bulk(client, input_path: str, output_path: str, checkpoint_path: Optional[str] = None,
+                              mapping: Optional[Dict[str, str]] = None, defaults: Optional[Dict[str, Any]] = None,
+                              batch_id: Optional[str] = None, max_workers: int = 4, rate_per_second: float = 5.0,
+                              progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                              retry_failed: bool = True) -> Dict[str, Any]:
+    """Create a payment link per input row and return the run summary.
+
+    Outcomes are appended to ``output_path`` as NDJSON lines of
+    {row, reference_id, status, id, short_url, error}. Run again with the
+    same input and ``checkpoint_path`` to resume; rows that failed are
+    retried unless ``retry_failed`` is False.
+    """
+    checkpoint = CheckpointJournal(checkpoint_path, batch_id, retry_failed) if checkpoint_path else None
+    batch_id = checkpoint.batch_id if checkpoint else (batch_id or uuid.uuid4().hex)
+
+    def link_params(entry):
+        seq, row = entry
+        params = row_to_params(row, mapping, defaults)
+        params.setdefault("reference_id", derived_reference_id(batch_id, seq))
+        return params
+
+    def create(entry):
+        return client.create_payment_link(link_params(entry))
+
+    def reconcile(entry):
+        reference_id = link_params(entry)["reference_id"]
+        found = client.list_payment_links({"reference_id": reference_id})
+        links = found.get("payment_links") or found.get("items") or []
+        return links[0] if links else None
+
+    output = OutputWriter(output_path)
+
+    def record_outcome(seq, entry, status, payload):
+        record = {"row": seq, "status": status}
+        try:
+            record["reference_id"] = link_params(entry)["reference_id"]
+        except (ValueError, TypeError):
+            pass
+        if status == DONE:
+            record["id"] = payload.get("id")
+            record["short_url"] = payload.get("short_url")
+        else:
+            record["error"] = payload
+        output.write(record)
+
+    runner = BulkRunner(
+        create,
+        max_workers=max_workers,
+        rate_limiter=TokenBucket(rate_per_second, burst=max(1, int(rate_per_second))),
+        checkpoint=checkpoint,
+        key=lambda entry: f"row {entry[0]}",
+        reconcile=reconcile,
+        on_result=record_outcome,
+        progress=progress,
+    )
+    logger.info(f"Starting bulk payment link batch {batch_id} from {input_path}")
+    try:
+        summary = runner.run(enumerate(read_records(input_path)))
+    finally:
+        output.close()
+    summary.setdefault("batch_id", batch_id)
+    summary["output"] = output_path
+    return summary
@@ -0,0 +1,98 @@
+"""
+Bulk refunds.
+
+create_refunds_bulk() refunds many payments in one call, from a list of
+{"payment_id", "amount", "notes"} records or from a CSV/NDJSON file with
+those columns. It runs on BulkRunner, so calls are paced, run in a bounded
+pool and are checkpointed.
+
+Every refund carries an idempotency key derived from the batch id and the
+item's position, sent both as Razorpay's X-Refund-Idempotency header and as
+the refund receipt. A resumed run skips refunds its checkpoint records as
+finished. For refunds that were in flight when the previous run stopped, it
+first looks for a refund with that receipt on the payment, so no payment is
+refunded twice.
+"""
+import uuid
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from bulk_runner import BulkRunner, CheckpointJournal, read_records
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+def refund_idempotency_key(batch_id: str, seq: int, payment_id: str, amount) -> str:
+    digest = hashlib.sha256(f"{batch_id}:{seq}:{payment_id}:{amount}".encode("utf-8")).hexdigest()
+    # Razorpay receipts are limited to 40 characters
+    return f"bulk_{digest[:32]}"
+
+
+def _normalize(record: Dict[str, Any], seq: int, batch_id: str) -> Dict[str, Any]:
+    payment_id = str(record.get("payment_id") or "").strip()
+    if not payment_id:
+        raise ValueError(f"Refund #{seq} has no payment_id")
+    amount = record.get("amount")
+    # Omitted or empty amount means a full refund
+    amount = int(amount) if amount not in (None, "") else None
+    return {
+        "seq": seq,
+        "payment_id": payment_id,
+        "amount": amount,
+        "notes": record.get("notes") or {},
+        "idempotency_key": refund_idempotency_key(batch_id, seq, payment_id, amount),
+    }
+
+
+def create_refunds_bulk(client, refunds: Union[str, Iterable[Dict[str, Any]]], checkpoint_path: Optional[str] = None,
+                        batch_id: Optional[str] = None, max_workers: int = 4, rate_per_second: float = 5.0,
+                        progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                        retry_failed: bool = True) -> Dict[str, Any]:
+    """Create one refund per record and return the run summary.
+
+    ``refunds`` is an iterable of records or the path of a CSV/NDJSON file.
+    Pass the same ``checkpoint_path`` (and input) again to resume an
+    interrupted run; the batch id is then read from the checkpoint. Refunds
+    that failed are retried unless ``retry_failed`` is False.
+    """
+    checkpoint = CheckpointJournal(checkpoint_path, batch_id, retry_failed) if checkpoint_path else None
+    batch_id = checkpoint.batch_id if checkpoint else (batch_id or uuid.uuid4().hex)
+
+    records = read_records(refunds) if isinstance(refunds, str) else refunds
+    total = None if isinstance(refunds, str) else (len(refunds) if hasattr(refunds, "__len__") else None)
+    # Records are validated by the worker, so one bad row fails alone instead of stopping the run
+    items = enumerate(records)
+
+    def refund(entry):
+        item = _normalize(entry[1], entry[0], batch_id)
+        params = {"payment_id": item["payment_id"], "notes": item["notes"],
+                  "receipt": item["idempotency_key"], "idempotency_key": item["idempotency_key"]}
+        if item["amount"] is not None:
+            params["amount"] = item["amount"]
+        return client.create_refund(params)
+
+    def reconcile(entry):
+        item = _normalize(entry[1], entry[0], batch_id)
+        # Bypass the entity cache; the refund may have been created moments ago
+        existing = client.fetch_entity("payment_refunds", item["payment_id"])
+        for candidate in existing.get("items", []):
+            if candidate.get("receipt") == item["idempotency_key"]:
+                logger.info(f"Refund for {item['payment_id']} already exists as {candidate.get('id')}")
+                return candidate
+        return None
+
+    runner = BulkRunner(
+        refund,
+        max_workers=max_workers,
+        rate_limiter=TokenBucket(rate_per_second, burst=max(1, int(rate_per_second))),
+        checkpoint=checkpoint,
+        key=lambda entry: str(entry[1].get("payment_id") or f"#{entry[0]}"),
+        reconcile=reconcile,
+        progress=progress,
+    )
+    logger.info(f"Starting bulk refund batch {batch_id}")
+    summary = runner.run(items, total=total)
+    summary.setdefault("batch_id", batch_id)
+    return summary
@@ -0,0 +1,269 @@
+"""
+Shared machinery for bulk Razorpay operations.
+
+A bulk tool hands BulkRunner a stream of items and a worker function that
+performs one Razorpay call per item. The runner provides:
+
+  * a bounded worker pool; items are read from the stream only as slots free
+    up, so memory does not grow with the size of the input
+  * an optional TokenBucket pacing the calls to stay inside Razorpay's limits
+  * an append-only checkpoint journal. Every item is journalled as
+    ``started`` before its call and as ``done`` or ``failed`` after it, so a
+    rerun with the same checkpoint skips finished items. Items that were in
+    flight when the previous run died, and by default items that failed
+    (e.g. a 429 or 5xx), are first passed to a ``reconcile`` hook, which
+    checks whether Razorpay already applied them, and run again if not.
+  * throttled progress callbacks and a summary with per-outcome counts
+
+Items are identified by their position in the input stream, so a resumed
+run must be given the same input in the same order.
+"""
+import os
+import csv
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream records from a CSV file (by header) or an NDJSON file, one at a time."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {key.strip(): value for key, value in row.items() if key}
+            return
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON record") from e
+
+
+class OutputWriter:
+    """Appends one NDJSON line per outcome and flushes it straight away."""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CheckpointJournal:
+    """Append-only NDJSON journal of item outcomes, keyed by input position.
+
+    Only positions above the low watermark (the first position not yet
+    finished) are held in memory. Items finish roughly in input order, so
+    that set stays about as small as the worker pool's window. With
+    ``retry_failed``, failed items are left unfinished and retried on resume.
+    """
+
+    def __init__(self, path: str, batch_id: Optional[str] = None, retry_failed: bool = True):
+        self.path = path
+        self.batch_id = batch_id
+        self.retry_failed = retry_failed
+        self.watermark = 0
+        self._finished = set()
+        self.started = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+        else:
+            self.batch_id = self.batch_id or uuid.uuid4().hex
+        self._file = open(path, "a", encoding="utf-8")
+        if os.path.getsize(path) == 0:
+            self._write({"batch_id": self.batch_id})
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+                if "batch_id" in record:
+                    if self.batch_id and record["batch_id"] != self.batch_id:
+                        raise ValueError(f"Checkpoint {self.path} belongs to batch {record['batch_id']}, "
+                                         f"not {self.batch_id}")
+                    self.batch_id = record["batch_id"]
+                elif record.get("status") == STARTED or (record.get("status") == FAILED and self.retry_failed):
+                    self.started.add(record["seq"])
+                else:
+                    self.started.discard(record["seq"])
+                    self._mark_finished(record["seq"])
+        logger.info(f"Resuming batch {self.batch_id} from {self.path}: "
+                    f"{self.watermark + len(self._finished)} items finished, {len(self.started)} to reconcile or retry")
+
+    def _mark_finished(self, seq: int):
+        self._finished.add(seq)
+        while self.watermark in self._finished:
+            self._finished.discard(self.watermark)
+            self.watermark += 1
+
+    def is_finished(self, seq: int) -> bool:
+        with self._lock:
+            return seq < self.watermark or seq in self._finished
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, seq: int, status: str, **fields):
+        with self._lock:
+            self._write(dict(fields, seq=seq, status=status))
+            if status != STARTED:
+                self.started.discard(seq)
+                self._mark_finished(seq)
+
+    def close(self):
+        self._file.close()
+
+
+class BulkRunner:
+    """Run ``worker(item)`` over a stream of items with bounded concurrency.
+
+    ``key(item)`` names an item in failure reports, ``reconcile(item)``
+    returns the result of an already-applied call (or None to run the worker
+    again) and ``on_result(seq, item, status, payload)`` sees every outcome,
+    e.g. to write an output file. ``progress(done, total)`` is called at most
+    every ``progress_interval`` seconds and once at the end.
+    """
+
+    def __init__(self, worker: Callable[[Any], Any], max_workers: int = 4,
+                 rate_limiter: Optional[TokenBucket] = None, checkpoint: Optional[CheckpointJournal] = None,
+                 key: Callable[[Any], str] = str, reconcile: Optional[Callable[[Any], Any]] = None,
+                 on_result: Optional[Callable[[int, Any, str, Any], None]] = None,
+                 progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                 progress_interval: float = 0.5, max_failures_reported: int = 100):
+        self.worker = worker
+        self.max_workers = max(1, int(max_workers))
+        self.rate_limiter = rate_limiter
+        self.checkpoint = checkpoint
+        self.key = key
+        self.reconcile = reconcile
+        self.on_result = on_result
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.max_failures_reported = max_failures_reported
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._last_progress = 0.0
+        self.counts = {"succeeded": 0, "failed": 0, "skipped": 0, "reconciled": 0}
+        self.failures = []
+
+    def stop(self):
+        """Stop taking new items; calls already in flight are allowed to finish."""
+        self.stop_event.set()
+
+    def _finish(self, seq, item, status, payload, total, counter=None):
+        if self.checkpoint is not None:
+            fields = {"key": self.key(item)}
+            if status == FAILED:
+                fields["error"] = payload
+            elif isinstance(payload, dict) and payload.get("id"):
+                fields["id"] = payload["id"]
+            self.checkpoint.record(seq, status, **fields)
+        if self.on_result is not None:
+            self.on_result(seq, item, status, payload)
+        with self._lock:
+            self.counts[counter or ("failed" if status == FAILED else "succeeded")] += 1
+            if status == FAILED and len(self.failures) < self.max_failures_reported:
+                self.failures.append({"seq": seq, "key": self.key(item), "error": payload})
+        self._report_progress(total)
+
+    def _report_progress(self, total, final=False):
+        if self.progress is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not final and now - self._last_progress < self.progress_interval:
+                return
+            self._last_progress = now
+            done = sum(self.counts.values())
+        try:
+            self.progress(done, total)
+        except Exception as e:
+            logger.debug(f"Progress callback failed: {str(e)}")
+
+    def _process(self, seq, item, total, reconcile_first):
+        counter = None
+        try:
+            result = None
+            if reconcile_first and self.reconcile is not None:
+                result = self.reconcile(item)
+            if result is not None:
+                counter = "reconciled"
+            else:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                if self.checkpoint is not None and not reconcile_first:
+                    self.checkpoint.record(seq, STARTED, key=self.key(item))
+                result = self.worker(item)
+        except Exception as e:
+            self._finish(seq, item, FAILED, str(e), total)
+            return
+        self._finish(seq, item, DONE, result, total, counter=counter)
+
+    def run(self, items: Iterable[Any], total: Optional[int] = None) -> Dict[str, Any]:
+        """Process every item and return the run summary."""
+        started = time.monotonic()
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+        reconcile_pending = set(self.checkpoint.started) if self.checkpoint is not None else set()
+
+        def release(_):
+            slots.release()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="razorpay-bulk") as pool:
+                for seq, item in enumerate(items):
+                    if self.stop_event.is_set():
+                        break
+                    if self.checkpoint is not None and self.checkpoint.is_finished(seq):
+                        with self._lock:
+                            self.counts["skipped"] += 1
+                        continue
+                    slots.acquire()
+                    future = pool.submit(self._process, seq, item, total, seq in reconcile_pending)
+                    future.add_done_callback(release)
+        finally:
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+
+        self._report_progress(total, final=True)
+        summary = dict(self.counts)
+        summary.update({
+            "processed": sum(self.counts.values()),
+            "stopped_early": self.stop_event.is_set(),
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+            "failures": self.failures,
+        })
+        if self.checkpoint is not None:
+            summary["batch_id"] = self.checkpoint.batch_id
+            summary["checkpoint"] = self.checkpoint.path
+        if self.rate_limiter is not None:
+            summary["rate_limit"] = self.rate_limiter.stats()
+        return summary
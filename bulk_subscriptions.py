@@ -0,0 +1,162 @@
+"""
+Bulk subscription lifecycle operations by filter.
+
+apply_subscription_action() cancels, pauses or resumes every subscription
+matching a filter (plan_id, customer_id and/or status). Subscriptions are
+streamed with cursor pagination, filtered on Razorpay's side by plan_id and
+customer_id and locally by status. The action then runs on BulkRunner's
+paced worker pool.
+
+A subscription already in the action's target state (or one the action does
+not apply to, such as pausing a cancelled subscription) is skipped without
+an API call. A run is therefore idempotent: after an interruption, running
+it again only touches what is left. With ``dry_run`` nothing is changed and
+the summary lists what would be.
+
+A cancel at cycle end leaves the subscription ``active`` with
+``has_scheduled_changes`` set, so such a cancel skips subscriptions that
+already have scheduled changes. Razorpay does not say which change is
+scheduled, so one with, say, a pending plan update is skipped as well.
+"""
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from bulk_runner import DONE, BulkRunner, OutputWriter
+from pagination import iter_collection
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# action: (client method, statuses it applies to, statuses that mean it is already done)
+ACTIONS = {
+    "cancel": ("cancel_subscription",
+               ("created", "authenticated", "active", "pending", "halted", "paused"),
+               ("cancelled", "completed", "expired")),
+    "pause": ("pause_subscription", ("active",), ("paused",)),
+    "resume": ("resume_subscription", ("paused",), ("active",)),
+}
+
+
+def _flag(value: Any) -> bool:
+    return str(value).strip().lower() in ("1", "true", "yes") if isinstance(value, str) else bool(value)
+
+
+def subscription_filter(plan_id: Optional[str] = None, customer_id: Optional[str] = None,
+                        status: Union[str, Iterable[str], None] = None) -> Callable[[Dict[str, Any]], bool]:
+    """Predicate matching subscriptions by plan, customer and status (one or several)."""
+    statuses = {status} if isinstance(status, str) else set(status or ())
+
+    def matches(subscription):
+        return ((plan_id is None or subscription.get("plan_id") == plan_id)
+                and (customer_id is None or subscription.get("customer_id") == customer_id)
+                and (not statuses or subscription.get("status") in statuses))
+    return matches
+
+
+def apply_subscription_action(client, action: str, plan_id: Optional[str] = None, customer_id: Optional[str] = None,
+                              status: Union[str, Iterable[str], None] = None, dry_run: bool = False,
+                              options: Optional[Dict[str, Any]] = None, output_path: Optional[str] = None,
+                              max_workers: int = 4, rate_per_second: float = 5.0, max_results: int = 1000,
+                              progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+    """Apply ``action`` (cancel, pause or resume) to every matching subscription.
+
+    ``options`` are passed to each call, e.g. {"cancel_at_cycle_end": True}.
+    Per-subscription results ({id, customer_id, status, outcome, error}) are
+    returned up to ``max_results``, and all of them are appended to
+    ``output_path`` as NDJSON when it is given.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"action must be one of {', '.join(ACTIONS)}")
+    if not (plan_id or customer_id or status):
+        raise ValueError("At least one of plan_id, customer_id or status is required")
+    method_name, applicable, already_done = ACTIONS[action]
+    method = getattr(client, method_name)
+    at_cycle_end = action == "cancel" and _flag((options or {}).get("cancel_at_cycle_end"))
+    started = time.monotonic()
+
+    list_params = {}
+    if plan_id:
+        list_params["plan_id"] = plan_id
+    if customer_id:
+        list_params["customer_id"] = customer_id
+    matches = subscription_filter(plan_id, customer_id, status)
+
+    output = OutputWriter(output_path) if output_path else None
+    applied = "would_apply" if dry_run else "applied"
+    counts = {"matched": 0, applied: 0, "skipped": 0, "failed": 0}
+    results = []
+    lock = threading.Lock()
+
+    def outcome(subscription, result, counter, status_after=None, reason=None, error=None):
+        record = {"id": subscription["id"], "customer_id": subscription.get("customer_id"),
+                  "status": subscription.get("status"), "outcome": result}
+        if status_after:
+            record["status_after"] = status_after
+        if reason:
+            record["reason"] = reason
+        if error:
+            record["error"] = error
+        with lock:
+            counts[counter] += 1
+            if len(results) < max_results:
+                results.append(record)
+        if output is not None:
+            output.write(record)
+
+    def work():
+        """Yield the subscriptions the action applies to; settle the rest here."""
+        for subscription in iter_collection(client.list_subscriptions, list_params):
+            if not matches(subscription):
+                continue
+            with lock:
+                counts["matched"] += 1
+            current = subscription.get("status")
+            if current in already_done:
+                outcome(subscription, "skipped", "skipped", reason=f"already {current}")
+            elif current not in applicable:
+                outcome(subscription, "skipped", "skipped", reason=f"cannot {action} a {current} subscription")
+            elif at_cycle_end and subscription.get("has_scheduled_changes"):
+                outcome(subscription, "skipped", "skipped", reason="already has scheduled changes")
+            elif dry_run:
+                outcome(subscription, f"would_{action}", applied)
+            else:
+                yield subscription
+
+    def apply(subscription):
+        return method(dict(options or {}, id=subscription["id"]))
+
+    def record_outcome(seq, subscription, result, payload):
+        if result == DONE:
+            outcome(subscription, "applied", "applied", status_after=payload.get("status"))
+        else:
+            outcome(subscription, "failed", "failed", error=payload)
+
+    runner = BulkRunner(
+        apply,
+        max_workers=max_workers,
+        rate_limiter=TokenBucket(rate_per_second, burst=max(1, int(rate_per_second))),
+        key=lambda subscription: subscription["id"],
+        on_result=record_outcome,
+        progress=progress,
+    )
+    logger.info(f"Starting bulk subscription {action} for {list_params or status}{' (dry run)' if dry_run else ''}")
+    try:
+        run = runner.run(work())
+    finally:
+        if output is not None:
+            output.close()
+
+    summary = dict(counts)
+    summary.update({
+        "action": action,
+        "dry_run": dry_run,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "results": results,
+        "results_truncated": counts["matched"] > len(results),
+        "rate_limit": run["rate_limit"],
+    })
+    if output_path:
+        summary["output"] = output_path
+    return summary
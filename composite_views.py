@@ -0,0 +1,154 @@
+"""
+Composite "full view" lookups that gather related entities concurrently.
+
+Building a complete picture of an order otherwise takes one MCP round trip
+per entity. Each function here fetches a small dependency graph. Independent
+fetches run side by side on a shared thread pool, so the latency is roughly
+the graph's critical path. The results come back as one merged document,
+optionally projected down to the requested fields:
+
+    order_full         order + payments, each payment with its refunds
+    payment_full       payment + refunds + order
+    subscription_full  subscription + plan + customer
+
+Every entity is fetched through client.get_entity() with prefetching off:
+the view requests the related entities itself, so letting the root fetch
+also schedule prefetches of them would send each of those calls twice. An
+entity the prefetcher had already warmed (after an earlier plain lookup) is
+still taken from the cache. A failed fetch of a related entity
+is reported under ``errors`` instead of failing the whole view; a failure to
+fetch the root entity is raised.
+"""
+import os
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.environ.get("RAZORPAY_COMPOSITE_WORKERS", "8")),
+                    thread_name_prefix="razorpay-composite"
+                )
+    return _executor
+
+
+def _items(collection) -> List[Any]:
+    if isinstance(collection, dict):
+        return list(collection.get("items", []))
+    return list(collection or [])
+
+
+def _fetch(client, kind: str, entity_id: str) -> Any:
+    # The view fetches the related entities itself, so nothing is prefetched
+    return client.get_entity(kind, entity_id, prefetch=False)
+
+
+def _result(future, name: str, errors: Dict[str, str], default=None):
+    try:
+        return future.result()
+    except Exception as e:
+        logger.warning(f"Composite view could not fetch {name}: {str(e)}")
+        errors[name] = str(e)
+        return default
+
+
+def project(document: Any, fields: Optional[List[str]]) -> Any:
+    """Keep only the dotted ``fields`` of a document; lists are projected item by item.
+
+        project(order, ["id", "amount", "payments.id", "payments.refunds.amount"])
+    """
+    if not fields:
+        return document
+    if isinstance(document, list):
+        return [project(item, fields) for item in document]
+    if not isinstance(document, dict):
+        return document
+
+    nested = {}
+    result = {}
+    for field in fields:
+        head, _, rest = field.partition(".")
+        if head not in document:
+            continue
+        if rest:
+            nested.setdefault(head, []).append(rest)
+        else:
+            result[head] = document[head]
+    for head, rests in nested.items():
+        if head not in result:
+            result[head] = project(document[head], rests)
+    # Errors always survive projection, so a partial view is never mistaken for a full one
+    if "errors" in document:
+        result["errors"] = document["errors"]
+    return result
+
+
+def order_full(client, order_id: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """An order with its payments, each payment carrying its refunds."""
+    pool = _pool()
+    errors = {}
+    order_future = pool.submit(_fetch, client, "order", order_id)
+    payments_future = pool.submit(_fetch, client, "order_payments", order_id)
+
+    payments = _items(_result(payments_future, "payments", errors, default=[]))
+    refund_futures = [pool.submit(_fetch, client, "payment_refunds", payment["id"]) for payment in payments]
+    order = order_future.result()
+
+    merged_payments = []
+    for payment, future in zip(payments, refund_futures):
+        refunds = _items(_result(future, f"refunds:{payment['id']}", errors, default=[]))
+        merged_payments.append(dict(payment, refunds=refunds))
+
+    document = dict(order, payments=merged_payments)
+    if errors:
+        document["errors"] = errors
+    return project(document, fields)
+
+
+def payment_full(client, payment_id: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """A payment with its refunds and, when it belongs to one, its order."""
+    pool = _pool()
+    errors = {}
+    payment_future = pool.submit(_fetch, client, "payment", payment_id)
+    refunds_future = pool.submit(_fetch, client, "payment_refunds", payment_id)
+
+    payment = payment_future.result()
+    order_future = pool.submit(_fetch, client, "order", payment["order_id"]) if payment.get("order_id") else None
+
+    document = dict(payment, refunds=_items(_result(refunds_future, "refunds", errors, default=[])))
+    if order_future is not None:
+        document["order"] = _result(order_future, "order", errors)
+    if errors:
+        document["errors"] = errors
+    return project(document, fields)
+
+
+def subscription_full(client, subscription_id: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """A subscription with its plan and customer."""
+    pool = _pool()
+    errors = {}
+    subscription = _fetch(client, "subscription", subscription_id)
+
+    plan_future = pool.submit(_fetch, client, "plan", subscription["plan_id"]) if subscription.get("plan_id") else None
+    customer_future = (pool.submit(_fetch, client, "customer", subscription["customer_id"])
+                       if subscription.get("customer_id") else None)
+
+    document = dict(subscription)
+    if plan_future is not None:
+        document["plan"] = _result(plan_future, "plan", errors)
+    if customer_future is not None:
+        document["customer"] = _result(customer_future, "customer", errors)
+    if errors:
+        document["errors"] = errors
+    return project(document, fields)
@@ -0,0 +1,173 @@
+"""
+Local search index over a merchant's customers.
+
+Razorpay only looks customers up by id. CustomerIndex keeps a compact copy
+of each customer (id, name, email, contact, created_at) in memory and
+indexes it four ways:
+
+  * email    hash index on the lower-cased address
+  * contact  hash index on the last ten digits, so "+91 99999 99999" and
+             "9999999999" match
+  * name     prefix index over name tokens (sorted token list + bisect) and
+             a trigram index for misspelt or partial names. The trigram
+             index is the largest of the four and only fuzzy name searches
+             need it, so it is built on the first one
+
+The index is filled by LocalIndex's incremental sync, and create_customer
+adds new customers as they are made. Razorpay has no "updated since"
+filter, so edits made elsewhere only show up after a full resync
+(``sync(client, full=True)``).
+
+When RAZORPAY_CUSTOMER_INDEX_DIR is set, each merchant's index is saved
+there after a sync and reloaded on start, so a new process does not have to
+re-read every customer.
+"""
+import bisect
+import logging
+from typing import Any, Dict, List, Optional
+
+from local_index import (LocalIndex, add_posting, normalize_contact, normalize_email, postings, remove_posting,
+                         tokenize)
+
+logger = logging.getLogger(__name__)
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CustomerIndex(LocalIndex):
+    """In-memory email/contact/name index of one merchant's customers."""
+
+    kind = "customers"
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self._by_email = {}
+        self._by_contact = {}
+        self._by_token = {}
+        self._by_trigram = None
+        self._sorted_tokens = []
+        self._tokens_dirty = False
+        super().__init__(snapshot_path)
+
+    def _compact(self, customer: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": customer["id"],
+            "name": customer.get("name"),
+            "email": customer.get("email"),
+            "contact": customer.get("contact"),
+            "created_at": customer.get("created_at"),
+        }
+
+    def _list_method(self, client):
+        return client.list_customers
+
+    def _index(self, record, previous=None):
+        customer_id = record["id"]
+        email = normalize_email(record["email"])
+        if email:
+            add_posting(self._by_email, email, customer_id)
+        contact = normalize_contact(record["contact"])
+        if contact:
+            add_posting(self._by_contact, contact, customer_id)
+        for token in tokenize(record["name"]):
+            if token not in self._by_token:
+                self._tokens_dirty = True
+            add_posting(self._by_token, token, customer_id)
+        if self._by_trigram is not None:
+            self._index_trigrams(record)
+
+    def _index_trigrams(self, record):
+        for gram in trigrams(" ".join(tokenize(record["name"]))):
+            add_posting(self._by_trigram, gram, record["id"])
+
+    def _unindex(self, record):
+        customer_id = record["id"]
+        remove_posting(self._by_email, normalize_email(record["email"]), customer_id)
+        remove_posting(self._by_contact, normalize_contact(record["contact"]), customer_id)
+        for token in tokenize(record["name"]):
+            if remove_posting(self._by_token, token, customer_id):
+                self._tokens_dirty = True
+        if self._by_trigram is not None:
+            for gram in trigrams(" ".join(tokenize(record["name"]))):
+                remove_posting(self._by_trigram, gram, customer_id)
+
+    # Queries
+    def find(self, email: Optional[str] = None, contact: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The customer with this email or contact, if indexed."""
+        with self._lock:
+            for index, key in ((self._by_email, normalize_email(email)), (self._by_contact, normalize_contact(contact))):
+                ids = postings(index, key)
+                if ids:
+                    return self.records[min(ids)]
+        return None
+
+    def _prefix_ids(self, token: str) -> set:
+        if self._tokens_dirty:
+            self._sorted_tokens = sorted(self._by_token)
+            self._tokens_dirty = False
+        ids = set()
+        position = bisect.bisect_left(self._sorted_tokens, token)
+        while position < len(self._sorted_tokens) and self._sorted_tokens[position].startswith(token):
+            ids |= postings(self._by_token, self._sorted_tokens[position])
+            position += 1
+        return ids
+
+    def _name_ids(self, name: str, fuzzy_threshold: float) -> List[str]:
+        tokens = tokenize(name)
+        if not tokens:
+            return []
+        # Every query token must prefix some token of the name
+        ids = None
+        for token in tokens:
+            matches = self._prefix_ids(token)
+            ids = matches if ids is None else ids & matches
+            if not ids:
+                break
+        if ids:
+            return sorted(ids)
+
+        # No prefix match: rank by trigram overlap
+        if self._by_trigram is None:
+            self._by_trigram = {}
+            for record in self.records.values():
+                self._index_trigrams(record)
+        query = trigrams(" ".join(tokens))
+        scores = {}
+        for gram in query:
+            for customer_id in postings(self._by_trigram, gram):
+                scores[customer_id] = scores.get(customer_id, 0) + 1
+        ranked = sorted(((count / len(query), customer_id) for customer_id, count in scores.items()
+                         if count / len(query) >= fuzzy_threshold), reverse=True)
+        return [customer_id for _, customer_id in ranked]
+
+    def search(self, email: Optional[str] = None, contact: Optional[str] = None, name: Optional[str] = None,
+               limit: int = 10, fuzzy_threshold: float = 0.5) -> List[Dict[str, Any]]:
+        """Customers matching every given criterion, best name matches first."""
+        with self._lock:
+            candidates = None
+            for index, key in ((self._by_email, normalize_email(email)), (self._by_contact, normalize_contact(contact))):
+                if key is None:
+                    continue
+                ids = postings(index, key)
+                candidates = set(ids) if candidates is None else candidates & ids
+            if name:
+                ordered = [customer_id for customer_id in self._name_ids(name, fuzzy_threshold)
+                           if candidates is None or customer_id in candidates]
+            elif candidates is not None:
+                ordered = sorted(candidates)
+            else:
+                ordered = []
+            return [dict(self.records[customer_id]) for customer_id in ordered[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = super().stats()
+            stats.update({
+                "emails": len(self._by_email),
+                "contacts": len(self._by_contact),
+                "name_tokens": len(self._by_token),
+                "trigram_index": self._by_trigram is not None,
+            })
+            return stats
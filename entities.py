@@ -0,0 +1,201 @@
+"""
+Compact in-memory form of Razorpay entities.
+
+The SDK returns each entity as a nested dict of 20-40 keys, which costs a
+few KB in CPython. The entity cache and the payment index hold many of them
+for a long time, so they store these slotted classes instead:
+
+  * the fields most reads need are ``__slots__`` attributes, with no
+    per-object ``__dict__``
+  * low-cardinality strings (status, method, currency, ...) are interned, so
+    every "captured" is the same object and a record only holds a pointer
+  * amounts, counts and timestamps are plain ints (a whole float such as
+    500.0 is stored as 500; strings are kept as sent)
+  * everything else (notes, card, acquirer_data, ...) is kept as one compact
+    UTF-8 JSON blob and only decoded when one of those keys is read
+
+An entity reads like the dict it came from: ``entity["amount"]``,
+``entity.get("notes")``, ``dict(entity)`` and to_dict() all work, and
+to_dict() gives back every key of the original. compact() and expand()
+convert cache values, including collections, in either direction.
+"""
+import sys
+import copy
+import json
+from typing import Any, Dict, Optional
+
+_UNSET = object()
+
+
+def _int(value: Any) -> Any:
+    # Only whole floats become ints; strings and everything else stay as sent
+    if type(value) is float and value.is_integer():
+        return int(value)
+    return value
+
+
+class Entity:
+    """Base class: a slotted record with interned enums, int amounts and a lazily decoded blob."""
+
+    __slots__ = ("_blob",)
+
+    entity = None  # Razorpay's "entity" value
+    FIELDS = ()    # slotted fields, in the order to_dict() writes them
+    INTS = ()      # amounts, counts and timestamps
+    ENUMS = ()     # low-cardinality strings to intern
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Entity":
+        record = cls.__new__(cls)
+        fields = cls.FIELDS
+        extra = {}
+        for key, value in data.items():
+            if key not in fields:
+                if key != "entity":
+                    extra[key] = value
+                continue
+            if key in cls.INTS:
+                value = _int(value)
+            elif key in cls.ENUMS and type(value) is str:
+                value = sys.intern(value)
+            setattr(record, key, value)
+        record._blob = json.dumps(extra, separators=(",", ":"), ensure_ascii=False).encode() if extra else None
+        return record
+
+    @property
+    def extra(self) -> Dict[str, Any]:
+        """The fields kept in the blob, decoded afresh on each access."""
+        return json.loads(self._blob) if self._blob else {}
+
+    def keys(self):
+        keys = [field for field in self.FIELDS if getattr(self, field, _UNSET) is not _UNSET]
+        keys.insert(1 if keys and keys[0] == "id" else 0, "entity")
+        return keys + list(self.extra)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            value = getattr(self, key, _UNSET)
+            if value is _UNSET:
+                raise KeyError(key)
+            return value
+        if key == "entity":
+            return self.entity
+        return self.extra[key]
+
+    def __contains__(self, key: str) -> bool:
+        if key in self.FIELDS:
+            return getattr(self, key, _UNSET) is not _UNSET
+        return key == "entity" or key in self.extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field, _UNSET)
+            if value is not _UNSET:
+                data[field] = value
+            if field == "id":
+                data["entity"] = self.entity
+        data.setdefault("entity", self.entity)
+        data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"{type(self).__name__}({getattr(self, 'id', None)!r})"
+
+
+class Payment(Entity):
+    entity = "payment"
+    FIELDS = ("id", "amount", "currency", "status", "order_id", "invoice_id", "international", "method",
+              "amount_refunded", "refund_status", "captured", "description", "card_id", "bank", "wallet", "vpa",
+              "email", "contact", "customer_id", "fee", "tax", "error_code", "error_description", "created_at")
+    INTS = ("amount", "amount_refunded", "fee", "tax", "created_at")
+    ENUMS = ("currency", "status", "method", "refund_status", "bank", "wallet", "error_code")
+    __slots__ = FIELDS
+
+
+class Order(Entity):
+    entity = "order"
+    FIELDS = ("id", "amount", "amount_paid", "amount_due", "currency", "receipt", "offer_id", "status", "attempts",
+              "created_at")
+    INTS = ("amount", "amount_paid", "amount_due", "attempts", "created_at")
+    ENUMS = ("currency", "status")
+    __slots__ = FIELDS
+
+
+class Refund(Entity):
+    entity = "refund"
+    FIELDS = ("id", "amount", "currency", "payment_id", "receipt", "status", "speed_processed", "speed_requested",
+              "batch_id", "created_at")
+    INTS = ("amount", "created_at")
+    ENUMS = ("currency", "status", "speed_processed", "speed_requested")
+    __slots__ = FIELDS
+
+
+class Customer(Entity):
+    entity = "customer"
+    FIELDS = ("id", "name", "email", "contact", "gstin", "created_at")
+    INTS = ("created_at",)
+    __slots__ = FIELDS
+
+
+class Settlement(Entity):
+    entity = "settlement"
+    FIELDS = ("id", "amount", "status", "fees", "tax", "utr", "created_at")
+    INTS = ("amount", "fees", "tax", "created_at")
+    ENUMS = ("status",)
+    __slots__ = FIELDS
+
+
+class Subscription(Entity):
+    entity = "subscription"
+    FIELDS = ("id", "plan_id", "customer_id", "status", "current_start", "current_end", "ended_at", "quantity",
+              "charge_at", "start_at", "end_at", "auth_attempts", "total_count", "paid_count", "customer_notify",
+              "created_at", "expire_by", "short_url", "has_scheduled_changes", "change_scheduled_at", "source",
+              "payment_method", "offer_id", "remaining_count")
+    INTS = ("current_start", "current_end", "ended_at", "quantity", "charge_at", "start_at", "end_at",
+            "auth_attempts", "total_count", "paid_count", "created_at", "expire_by", "change_scheduled_at",
+            "remaining_count")
+    ENUMS = ("status", "source", "payment_method")
+    __slots__ = FIELDS
+
+
+class Plan(Entity):
+    entity = "plan"
+    FIELDS = ("id", "interval", "period", "created_at")
+    INTS = ("interval", "created_at")
+    ENUMS = ("period",)
+    __slots__ = FIELDS
+
+
+# Razorpay "entity" value -> class
+ENTITY_TYPES = {cls.entity: cls for cls in (Payment, Order, Refund, Customer, Settlement, Subscription, Plan)}
+
+
+def compact(value: Any) -> Any:
+    """The compact form of an SDK payload; anything unrecognised is stored as a private copy."""
+    if not isinstance(value, dict):
+        return copy.deepcopy(value)
+    entity = value.get("entity")
+    cls: Optional[type] = ENTITY_TYPES.get(entity)
+    if cls is not None and value.get("id"):
+        return cls.from_dict(value)
+    if entity == "collection" and isinstance(value.get("items"), list):
+        return dict(copy.deepcopy({k: v for k, v in value.items() if k != "items"}),
+                    items=[compact(item) for item in value["items"]])
+    return copy.deepcopy(value)
+
+
+def expand(value: Any) -> Any:
+    """Undo compact(): fresh plain dicts, as the SDK returned them, never the stored objects."""
+    if isinstance(value, Entity):
+        return value.to_dict()
+    if isinstance(value, dict) and value.get("entity") == "collection" and isinstance(value.get("items"), list):
+        return dict(copy.deepcopy({k: v for k, v in value.items() if k != "items"}),
+                    items=[expand(item) for item in value["items"]])
+    return copy.deepcopy(value)
@@ -0,0 +1,123 @@
+"""
+Short-lived cache of Razorpay entities, one per RazorpayClient.
+
+Entries are keyed by (kind, id), e.g. ("order", "order_X") or
+("order_payments", "order_X"), expire after a TTL and are evicted LRU once
+the cache is full. The client only fills it through the prefetcher, and its
+getters take a prefetched entry on its first read (removing it) and send
+every other read to Razorpay, so a caller polling an entity never sees stale
+state. The client also invalidates an entry whenever it changes the entity
+itself (refunds, subscription state changes).
+
+Entries written by the prefetcher are tagged with the relationship that
+produced them, so the first read of each can be credited to that
+relationship (a prefetch hit) and an entry that expires unread counted as
+wasted. Expired entries are swept by expire(), which stats() runs first.
+
+Payloads are stored in the compact form from entities.compact() and
+expanded back into plain dicts on every read, so callers never share (or
+mutate) the cached copy.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from entities import compact, expand
+
+
+class EntityCache:
+    """Thread-safe TTL + LRU cache of entity payloads."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, listener=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Receives record_hit(relation) / record_wasted(relation) for prefetched entries
+        self.listener = listener
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, kind: str, entity_id: str, prefetched_only: bool = False) -> Optional[Any]:
+        """The cached value, if live; with ``prefetched_only``, only an unread prefetched entry, which is taken."""
+        if not self.enabled:
+            return None
+        key = (kind, entity_id)
+        now = time.monotonic()
+        relation = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now or (prefetched_only and not entry[2]):
+                if entry is not None and entry[1] <= now:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self.hits += 1
+            value, relation = entry[0], entry[2]
+            if prefetched_only:
+                # Never served again, so it would only hold a slot
+                del self._entries[key]
+            else:
+                self._entries.move_to_end(key)
+                entry[2] = None
+        if relation and self.listener is not None:
+            self.listener.record_hit(relation)
+        return expand(value)
+
+    def contains(self, kind: str, entity_id: str) -> bool:
+        """Whether a live, unread prefetched entry exists, without counting a hit or miss."""
+        with self._lock:
+            entry = self._entries.get((kind, entity_id))
+            return entry is not None and bool(entry[2]) and entry[1] > time.monotonic()
+
+    def put(self, kind: str, entity_id: str, value: Any, relation: Optional[str] = None):
+        if not self.enabled or value is None:
+            return
+        key = (kind, entity_id)
+        value = compact(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = [value, time.monotonic() + self.ttl, relation]
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, kind: str, entity_id: str):
+        with self._lock:
+            if (kind, entity_id) in self._entries:
+                self._drop((kind, entity_id))
+
+    def _drop(self, key):
+        # Caller holds the lock. Only a prefetch that expired unread was wasted;
+        # invalidations and evictions of live entries say nothing about it.
+        entry = self._entries.pop(key)
+        if entry[2] and entry[1] <= time.monotonic() and self.listener is not None:
+            self.listener.record_wasted(entry[2])
+
+    def expire(self) -> int:
+        """Drop every expired entry, counting unread prefetches as wasted; returns how many went."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[1] <= now]
+            for key in expired:
+                self._drop(key)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        self.expire()
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,103 @@
+"""
+Production gunicorn profile for the Razorpay MCP HTTP server.
+
+    gunicorn -c gunicorn_config.py
+    GUNICORN_WORKER_CLASS=async gunicorn -c gunicorn_config.py
+
+Everything is driven by environment variables:
+
+    GUNICORN_WORKER_CLASS          sync | gthread | async (default: gthread)
+    GUNICORN_BIND                  default: 0.0.0.0:5000
+    GUNICORN_WORKERS               override the derived worker count
+    GUNICORN_THREADS               override the derived gthread thread count
+    GUNICORN_MAX_THREADS           cap for the derived thread count (default: 64)
+    GUNICORN_PRELOAD               1/0, build the app in the master (default: 1)
+    GUNICORN_MAX_REQUESTS          recycle a worker after this many requests (default: 2000)
+    GUNICORN_GRACEFUL_TIMEOUT      seconds a recycled worker gets to drain (default: 30)
+    RAZORPAY_UPSTREAM_LATENCY_MS   measured median Razorpay latency (default: 300)
+    RAZORPAY_REQUEST_CPU_MS        CPU time this server spends per request (default: 5)
+
+The async worker class serves asgi_app:app through uvicorn; sync and gthread
+serve the Flask app in main.py.
+"""
+import os
+import math
+import importlib.util
+import multiprocessing
+
+WORKER_CLASSES = ("sync", "gthread", "async")
+
+profile = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+if profile not in WORKER_CLASSES:
+    raise ValueError(f"GUNICORN_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, got {profile!r}")
+
+cores = multiprocessing.cpu_count()
+upstream_latency_ms = float(os.environ.get("RAZORPAY_UPSTREAM_LATENCY_MS", "300"))
+request_cpu_ms = max(float(os.environ.get("RAZORPAY_REQUEST_CPU_MS", "5")), 0.1)
+
+# A request spends request_cpu_ms on the CPU and upstream_latency_ms waiting on
+# Razorpay, so a core stays busy with (latency + cpu) / cpu requests in flight.
+concurrency_per_core = math.ceil((upstream_latency_ms + request_cpu_ms) / request_cpu_ms)
+
+
+def _derived_workers():
+    if profile == "sync":
+        # One request per process: scale with latency, bounded by memory
+        return min(cores * concurrency_per_core, 4 * cores + 1)
+    # gthread and async workers overlap upstream waits themselves
+    return cores
+
+
+def _derived_threads():
+    max_threads = int(os.environ.get("GUNICORN_MAX_THREADS", "64"))
+    return max(2, min(concurrency_per_core, max_threads))
+
+
+def _uvicorn_worker():
+    # uvicorn.workers is deprecated in favour of the uvicorn-worker package
+    if importlib.util.find_spec("uvicorn_worker"):
+        return "uvicorn_worker.UvicornWorker"
+    return "uvicorn.workers.UvicornWorker"
+
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "0")) or _derived_workers()
+
+if profile == "async":
+    worker_class = _uvicorn_worker()
+    wsgi_app = "asgi_app:app"
+elif profile == "gthread":
+    worker_class = "gthread"
+    threads = int(os.environ.get("GUNICORN_THREADS", "0")) or _derived_threads()
+    wsgi_app = "main:app"
+else:
+    worker_class = "sync"
+    wsgi_app = "main:app"
+
+# Build clients and tool metadata once in the master; workers share them
+# copy-on-write instead of importing everything again after the fork.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+# Graceful recycling bounds slow leaks; jitter keeps workers from restarting together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+timeout = max(30, math.ceil(upstream_latency_ms / 1000 * 10))
+keepalive = 5
+
+
+def when_ready(server):
+    server.log.info(
+        f"Razorpay MCP profile: {profile} x {workers} workers"
+        + (f" x {threads} threads" if profile == "gthread" else "")
+        + f" (preload={preload_app}, latency={upstream_latency_ms:.0f}ms, cpu={request_cpu_ms:.1f}ms)"
+    )
+
+
+def post_fork(server, worker):
+    # Sockets opened by the master must not be shared between workers
+    try:
+        from razorpay_client import get_default_client
+        get_default_client().reset_connections()
+    except Exception as e:
+        server.log.warning(f"Could not reset the Razorpay connection pool after fork: {e}")
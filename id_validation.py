@@ -0,0 +1,122 @@
+"""
+Local checks on Razorpay entity IDs, and a negative cache of IDs that do not exist.
+
+Every Razorpay ID is a per-entity prefix followed by 14 alphanumeric
+characters, e.g. ``pay_29QQoUBi66xm2f``. validate_id() rejects a missing,
+mistyped or wrong-entity ID (an order ID passed as a payment ID) before any
+network call, with an error saying what was expected.
+RAZORPAY_STRICT_IDS=0 relaxes the length check and only requires the prefix
+and an alphanumeric body.
+
+A well-formed ID can still not exist. NegativeCache remembers Razorpay's
+"does not exist" answers for a short TTL (RAZORPAY_NEGATIVE_CACHE_TTL,
+default 60 seconds), so an agent retrying the same bad ID gets the same
+error without another round trip.
+"""
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# entity kind -> (ID prefix, label used in errors)
+ID_FORMATS = {
+    "payment": ("pay_", "Payment"),
+    "order": ("order_", "Order"),
+    "refund": ("rfnd_", "Refund"),
+    "customer": ("cust_", "Customer"),
+    "payment_link": ("plink_", "Payment Link"),
+    "settlement": ("setl_", "Settlement"),
+    "subscription": ("sub_", "Subscription"),
+    "plan": ("plan_", "Plan"),
+}
+
+STRICT = os.environ.get("RAZORPAY_STRICT_IDS", "1") != "0"
+_BODY = re.compile(r"[A-Za-z0-9]{14}" if STRICT else r"[A-Za-z0-9]+")
+# Razorpay's answer for an unknown ID: "The id provided does not exist"
+_NOT_FOUND = "does not exist"
+
+
+def kind_of(entity_id: str) -> Optional[str]:
+    """The entity kind an ID's prefix belongs to, if any."""
+    for kind, (prefix, _) in ID_FORMATS.items():
+        if entity_id.startswith(prefix):
+            return kind
+    return None
+
+
+def _a(label: str) -> str:
+    return f"{'an' if label[0] in 'AEIOU' else 'a'} {label.lower()}"
+
+
+def validate_id(kind: str, entity_id: Any) -> str:
+    """Return ``entity_id`` stripped of whitespace, or raise ValueError if it cannot be a ``kind`` ID."""
+    prefix, label = ID_FORMATS[kind]
+    if entity_id is None or entity_id == "":
+        raise ValueError(f"{label} ID is required")
+    if not isinstance(entity_id, str):
+        raise ValueError(f"{label} ID must be a string, got {type(entity_id).__name__}")
+    entity_id = entity_id.strip()
+    if entity_id.startswith(prefix) and _BODY.fullmatch(entity_id[len(prefix):]):
+        return entity_id
+    other = kind_of(entity_id)
+    if other and other != kind:
+        raise ValueError(f"{entity_id!r} is {_a(ID_FORMATS[other][1])} ID, not {_a(label)} ID")
+    expected = f"{prefix} followed by 14 letters and digits" if STRICT else f"{prefix} followed by letters and digits"
+    raise ValueError(f"Invalid {label.lower()} ID {entity_id!r}: expected {expected}")
+
+
+def is_not_found(error: Exception) -> bool:
+    """Whether an SDK error is Razorpay saying the entity does not exist."""
+    message = str(error).lower()
+    return type(error).__name__ == "BadRequestError" and _NOT_FOUND in message
+
+
+class NegativeCache:
+    """Thread-safe TTL + LRU cache of (kind, id) pairs Razorpay reported as not found."""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.recorded = 0
+
+    def check(self, kind: str, entity_id: str):
+        """Raise the remembered error again if ``entity_id`` is known not to exist."""
+        if self.ttl <= 0:
+            return
+        key = (kind, entity_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            error_class, message, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return
+            self.hits += 1
+        raise error_class(message)
+
+    def record(self, kind: str, entity_id: str, error: Exception) -> bool:
+        """Remember ``error`` if it is a not-found answer; returns whether it was."""
+        if self.ttl <= 0 or not is_not_found(error):
+            return False
+        with self._lock:
+            self._entries.pop((kind, entity_id), None)
+            self._entries[(kind, entity_id)] = (type(error), str(error), time.monotonic() + self.ttl)
+            self.recorded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def forget(self, kind: str, entity_id: str):
+        with self._lock:
+            self._entries.pop((kind, entity_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        return {"entries": size, "ttl_seconds": self.ttl, "hits": self.hits, "recorded": self.recorded}
@@ -0,0 +1,203 @@
+"""
+Shared machinery for the local entity indexes (customers, payments).
+
+Razorpay's list APIs only filter by creation time. A LocalIndex keeps a
+compact copy of one merchant's entities in memory so they can be searched
+without paging through the API. It is filled by a streamed, incremental
+sync. Entities are read page by page with cursor pagination, starting from
+the newest created_at already indexed (less ``resync_window`` seconds, for
+entities whose state can still change). An index can be saved as a gzipped
+NDJSON snapshot and reloaded by the next process.
+
+Subclasses say how to compact an entity, how to (un)index a compact record
+and which client method lists the entities.
+"""
+import os
+import re
+import gzip
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from pagination import iter_collection
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    email = (email or "").strip().lower()
+    return email or None
+
+
+def normalize_contact(contact: Optional[str]) -> Optional[str]:
+    digits = "".join(ch for ch in str(contact or "") if ch.isdigit())
+    # Compare national numbers, ignoring country code and leading zeros
+    return digits[-10:] if digits else None
+
+
+def tokenize(text: Any) -> List[str]:
+    return _TOKEN_RE.findall(str(text or "").lower())
+
+
+def add_posting(index: Dict[str, Any], key: str, entity_id: str):
+    # Most keys belong to one entity, so a lone id is stored bare and only
+    # becomes a set when a second entity shares the key
+    ids = index.get(key)
+    if ids is None:
+        index[key] = entity_id
+    elif isinstance(ids, str):
+        if ids != entity_id:
+            index[key] = {ids, entity_id}
+    else:
+        ids.add(entity_id)
+
+
+def remove_posting(index: Dict[str, Any], key: str, entity_id: str) -> bool:
+    """Remove an id from a key's postings; True when the key is gone."""
+    ids = index.get(key)
+    if ids is None:
+        return False
+    if isinstance(ids, str):
+        if ids != entity_id:
+            return False
+        del index[key]
+        return True
+    ids.discard(entity_id)
+    if len(ids) == 1:
+        index[key] = next(iter(ids))
+    return False
+
+
+def postings(index: Dict[str, Any], key: Optional[str]) -> set:
+    """The ids posted under a key. The returned set must not be modified."""
+    ids = index.get(key) if key else None
+    if ids is None:
+        return set()
+    return {ids} if isinstance(ids, str) else ids
+
+
+class LocalIndex:
+    """Base class: records by id, incremental sync, snapshots and staleness."""
+
+    kind = "entities"
+
+    def __init__(self, snapshot_path: Optional[str] = None, resync_window: int = 0):
+        self.snapshot_path = snapshot_path
+        self.resync_window = resync_window
+        self.records = {}
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self.synced_until = None
+        self.last_sync = None
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load(snapshot_path)
+
+    def __len__(self):
+        return len(self.records)
+
+    # Subclass hooks
+    def _compact(self, entity: Dict[str, Any]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def _index(self, record: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+        """Index a record; ``previous`` is the (already unindexed) record it replaces."""
+        raise NotImplementedError
+
+    def _unindex(self, record: Dict[str, Any]):
+        raise NotImplementedError
+
+    def _list_method(self, client):
+        raise NotImplementedError
+
+    # Maintenance
+    def add(self, entity: Dict[str, Any]):
+        """Insert or replace one entity."""
+        if not isinstance(entity, dict) or not entity.get("id"):
+            return
+        record = self._compact(entity)
+        with self._lock:
+            previous = self.records.get(record["id"])
+            if previous is not None:
+                self._unindex(previous)
+            self.records[record["id"]] = record
+            self._index(record, previous)
+
+    def add_many(self, entities: Iterable[Dict[str, Any]]) -> int:
+        added = 0
+        for entity in entities:
+            self.add(entity)
+            added += 1
+        return added
+
+    # Sync
+    def sync(self, client, full: bool = False, page_size: int = 100) -> Dict[str, Any]:
+        """Stream entities from Razorpay into the index.
+
+        Incremental by default: only entities created at or after the newest
+        one a completed sync read, less the resync window, are read. Razorpay
+        lists newest first, so the watermark only moves once the whole pass
+        has succeeded; entities added by write paths never move it.
+        """
+        with self._sync_lock:
+            started = time.monotonic()
+            params = {}
+            if self.synced_until is not None and not full:
+                params["from"] = max(0, self.synced_until - self.resync_window)
+            seen = 0
+            newest = self.synced_until
+            for entity in iter_collection(self._list_method(client), params, page_size=page_size):
+                self.add(entity)
+                seen += 1
+                created_at = entity.get("created_at") if isinstance(entity, dict) else None
+                if created_at and (newest is None or created_at > newest):
+                    newest = created_at
+            self.synced_until = newest
+            self.last_sync = time.time()
+            if self.snapshot_path:
+                self.save(self.snapshot_path)
+            took = time.monotonic() - started
+            logger.info(f"{self.kind.capitalize()} index sync read {seen} {self.kind} in {took:.2f}s; "
+                        f"{len(self)} indexed")
+            return {"read": seen, "indexed": len(self), "seconds": round(took, 3)}
+
+    def is_stale(self, max_age: float) -> bool:
+        return self.last_sync is None or time.time() - self.last_sync > max_age
+
+    # Snapshots
+    def save(self, path: str):
+        tmp = f"{path}.tmp"
+        with self._lock, gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"synced_until": self.synced_until, "last_sync": self.last_sync}) + "\n")
+            for record in self.records.values():
+                f.write(json.dumps(dict(record), separators=(",", ":")) + "\n")
+        os.replace(tmp, path)
+
+    def load(self, path: str):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            for line in f:
+                self.add(json.loads(line))
+        self.synced_until = header.get("synced_until") or self.synced_until
+        self.last_sync = header.get("last_sync")
+        logger.info(f"Loaded {len(self)} {self.kind} from {path}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                self.kind: len(self.records),
+                "synced_until": self.synced_until,
+                "last_sync": self.last_sync,
+            }
+
+
+def snapshot_path_for(kind: str, key_id: str) -> Optional[str]:
+    """Snapshot file for one merchant's index, if RAZORPAY_<KIND>_INDEX_DIR is set."""
+    directory = os.environ.get(f"RAZORPAY_{kind.upper()}_INDEX_DIR")
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{kind}s-{key_id}.ndjson.gz")
@@ -0,0 +1,208 @@
+"""
+Process supervisor for MCP server workers.
+
+McpSupervisor runs N copies of razorpay_mcp_server.py, streams each worker's
+stderr line by line into our logs, restarts workers that exit with
+exponential backoff and reports per-worker health, memory and uptime.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "razorpay_mcp_server.py")
+
+# Worker log lines look like "INFO: message" (see razorpay_mcp_server.py)
+_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
+
+def read_rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process in bytes, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class WorkerProcess:
+    """One supervised MCP server process and its restart bookkeeping."""
+
+    def __init__(self, index: int, command: List[str]):
+        self.index = index
+        self.command = command
+        self.process = None
+        self.started_at = None
+        self.restarts = 0
+        self.consecutive_failures = 0
+        self.last_exit_code = None
+        self.next_start_at = None
+
+    @property
+    def name(self):
+        return f"mcp-worker-{self.index}"
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def spawn(self):
+        """Start the worker process and the thread that drains its stderr."""
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,  # held open so a stdio server does not see EOF
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self.started_at = time.time()
+        self.next_start_at = None
+        threading.Thread(target=self._pump_stderr, args=(self.process,), name=f"{self.name}-stderr", daemon=True).start()
+        logger.info(f"Started {self.name} (pid {self.process.pid})")
+
+    def _pump_stderr(self, process):
+        child_logger = logging.getLogger(f"{__name__}.{self.name}")
+        for line in process.stderr:
+            line = line.rstrip()
+            if not line:
+                continue
+            level, _, message = line.partition(": ")
+            if level in _LEVELS:
+                child_logger.log(_LEVELS[level], message)
+            else:
+                child_logger.info(line)
+
+    def terminate(self, timeout: float = 5.0):
+        if not self.alive:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        if self.alive:
+            health = "running"
+        elif self.next_start_at is not None:
+            health = "restarting"
+        else:
+            health = "stopped"
+
+        return {
+            "name": self.name,
+            "pid": self.process.pid if self.alive else None,
+            "health": health,
+            "uptime_seconds": round(now - self.started_at, 1) if self.alive else 0,
+            "memory_rss_bytes": read_rss_bytes(self.process.pid) if self.alive else None,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "restart_in_seconds": round(max(0.0, self.next_start_at - now), 1) if self.next_start_at else None,
+        }
+
+
+class McpSupervisor:
+    """Keeps a fixed number of MCP server workers running.
+
+    A worker that exits is restarted after a delay that doubles with each
+    consecutive failure (up to max_backoff); a worker that stayed up for
+    stable_after seconds starts again from the initial delay.
+    """
+
+    def __init__(self, workers: int = 1, transport: str = "stdio", base_port: int = 8100,
+                 initial_backoff: float = 1.0, max_backoff: float = 60.0,
+                 stable_after: float = 30.0, poll_interval: float = 0.5):
+        self.transport = transport
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.poll_interval = poll_interval
+        self.workers = [WorkerProcess(i, self._command(i, base_port)) for i in range(workers)]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor = None
+
+    def _command(self, index, base_port):
+        command = [sys.executable, SERVER_SCRIPT, "--transport", self.transport]
+        if self.transport != "stdio":
+            # Networked workers each listen on their own port
+            command += ["--port", str(base_port + index)]
+        return command
+
+    @property
+    def running(self):
+        return self._monitor is not None and self._monitor.is_alive()
+
+    def start(self):
+        """Spawn every worker and start watching them."""
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            for worker in self.workers:
+                worker.spawn()
+            self._monitor = threading.Thread(target=self._watch, name="mcp-supervisor", daemon=True)
+            self._monitor.start()
+
+    def stop(self):
+        """Stop watching and terminate every worker."""
+        self._stop.set()
+        if self._monitor:
+            self._monitor.join(timeout=self.poll_interval * 4)
+        for worker in self.workers:
+            worker.next_start_at = None
+            worker.terminate()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            now = time.time()
+            for worker in self.workers:
+                if worker.alive:
+                    continue
+
+                if worker.next_start_at is None:
+                    self._schedule_restart(worker, now)
+                elif now >= worker.next_start_at:
+                    try:
+                        worker.spawn()
+                        worker.restarts += 1
+                    except Exception as e:
+                        logger.error(f"Could not restart {worker.name}: {e}")
+                        self._schedule_restart(worker, now)
+
+    def _schedule_restart(self, worker, now):
+        worker.last_exit_code = worker.process.returncode if worker.process else None
+        uptime = now - worker.started_at if worker.started_at else 0
+        if uptime >= self.stable_after:
+            worker.consecutive_failures = 0
+        delay = min(self.max_backoff, self.initial_backoff * (2 ** worker.consecutive_failures))
+        worker.consecutive_failures += 1
+        worker.next_start_at = now + delay
+        logger.warning(f"{worker.name} exited with code {worker.last_exit_code}; restarting in {delay:.1f}s")
+
+    def status(self) -> Dict[str, Any]:
+        """Per-worker health, memory and uptime."""
+        workers = [worker.status() for worker in self.workers]
+        return {
+            "running": self.running,
+            "transport": self.transport,
+            "healthy_workers": sum(1 for worker in workers if worker["health"] == "running"),
+            "workers": workers,
+        }
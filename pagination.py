@@ -0,0 +1,158 @@
+"""
+Keyset cursor pagination over Razorpay's skip/count list APIs.
+
+Razorpay lists newest first and pages with ``skip``, so a deep page makes
+Razorpay walk past everything before it, and payments created mid-scan shift
+every later page. A keyset cursor records where the previous page ended,
+as the ``created_at`` of its last item plus the ids already returned at that
+second. The next request narrows ``to`` to just past that second, and
+``skip`` only has to step over the ids seen within it. Every page costs the
+same however deep the scan is. Newer objects fall outside the window, so a
+scan neither repeats nor misses items. Items past the boundary second and
+ids already seen are dropped client-side, so the scan is right whether
+Razorpay treats ``to`` as inclusive or exclusive.
+
+An endpoint that ignores ``from``/``to`` shows itself by returning items
+newer than the window. The scan then falls back to plain ``skip`` paging
+from where it was (an offset cursor).
+
+Cursors are opaque URL-safe strings; callers pass ``next_cursor`` from one
+page back as ``cursor`` to get the next.
+"""
+import json
+import base64
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Razorpay's default page size when count is not given
+DEFAULT_COUNT = 10
+MAX_COUNT = 100
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+        if state.get("to") is None:
+            int(state["offset"])
+        else:
+            int(state["to"])
+            list(state["seen"])
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+    return state
+
+
+def _created(item) -> Optional[int]:
+    created_at = item.get("created_at") if isinstance(item, dict) else None
+    return int(created_at) if created_at is not None else None
+
+
+def apply_cursor(razorpay_params: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Rewrite list parameters to continue from ``cursor``."""
+    if not cursor:
+        return razorpay_params
+    state = decode_cursor(cursor)
+    params = dict(razorpay_params)
+    if state.get("to") is None:
+        params["skip"] = int(state["offset"])
+    else:
+        # One second past the boundary, so an exclusive ``to`` still covers it
+        params["to"] = int(state["to"]) + 1
+        # Only ids tied at the boundary second are skipped, never whole pages
+        params["skip"] = int(state.get("skip", len(state["seen"])))
+    if state.get("from") is not None:
+        params["from"] = state["from"]
+    if state.get("count") is not None:
+        params.setdefault("count", state["count"])
+    return params
+
+
+def ignores_window(result: Any, request_params: Dict[str, Any], cursor: Optional[str]) -> bool:
+    """Whether a page requested with a keyset cursor holds items newer than its window."""
+    if not cursor or decode_cursor(cursor).get("to") is None or not isinstance(result, dict):
+        return False
+    to = int(request_params["to"])
+    return any((_created(item) or 0) > to for item in result.get("items") or [])
+
+
+def offset_cursor(cursor: str) -> str:
+    """The plain ``skip`` cursor for the position a keyset cursor stands at."""
+    state = decode_cursor(cursor)
+    return encode_cursor({"offset": state.get("offset", 0), "from": state.get("from"), "count": state.get("count")})
+
+
+def attach_next_cursor(result: Any, request_params: Dict[str, Any], cursor: Optional[str] = None) -> Any:
+    """Drop already-seen items from a page and add its ``next_cursor``.
+
+    ``next_cursor`` is None once a page comes back short, i.e. the scan is done.
+    """
+    if not isinstance(result, dict) or not isinstance(result.get("items"), list):
+        return result
+
+    previous = decode_cursor(cursor) if cursor else None
+    raw = result["items"]
+    count = int(request_params.get("count") or DEFAULT_COUNT)
+    full = len(raw) >= count
+    offset = int(previous.get("offset", 0)) if previous else int(request_params.get("skip") or 0)
+
+    if previous and previous.get("to") is None:
+        next_cursor = None
+        if full:
+            next_cursor = encode_cursor({"offset": offset + len(raw), "from": previous.get("from"),
+                                         "count": request_params.get("count")})
+        return dict(result, count=len(raw), items=raw, next_cursor=next_cursor)
+
+    items = raw
+    if previous:
+        boundary = int(previous["to"])
+        seen = set(previous["seen"])
+        items = [item for item in raw if item.get("id") not in seen and (_created(item) or 0) <= boundary]
+
+    next_cursor = None
+    state = {"from": request_params.get("from"), "count": request_params.get("count"),
+             "offset": offset + len(items)}
+    if full and items and _created(items[-1]) is not None:
+        last_created = _created(items[-1])
+        seen_at_last = [item["id"] for item in items if _created(item) == last_created]
+        skip = len(seen_at_last)
+        if previous and int(previous["to"]) == last_created:
+            # The whole page sat in the boundary second; keep its earlier ids too
+            seen_at_last = list(previous["seen"]) + seen_at_last
+            skip = int(request_params.get("skip") or 0) + len(raw)
+        next_cursor = encode_cursor(dict(state, to=last_created, seen=seen_at_last, skip=skip))
+    elif full and previous:
+        # Nothing new in a full page: only ids past or at the boundary came back, so step past them
+        next_cursor = encode_cursor(dict(state, to=previous["to"], seen=previous["seen"],
+                                         skip=int(request_params.get("skip") or 0) + len(raw)))
+
+    return dict(result, count=len(items), items=items, next_cursor=next_cursor)
+
+
+def iter_collection(list_method: Callable[[Dict[str, Any]], Any], params: Optional[Dict[str, Any]] = None,
+                    page_size: int = MAX_COUNT) -> Iterator[Dict[str, Any]]:
+    """Yield every item of a list method, following next_cursor page by page.
+
+        for payment in iter_collection(client.list_payments, {"from": start}):
+            ...
+    """
+    params = dict(params or {})
+    params.setdefault("count", page_size)
+    params.pop("skip", None)
+    while True:
+        page = list_method(params)
+        yield from page.get("items", [])
+        cursor = page.get("next_cursor")
+        if not cursor:
+            return
+        if cursor == params.get("cursor"):
+            raise RuntimeError("Pagination is not advancing: the list returned the cursor it was given")
+        params["cursor"] = cursor
@@ -0,0 +1,222 @@
+"""
+Local search index over a merchant's payments.
+
+Razorpay's payment list only filters by creation time, so finding payments
+by notes, email, contact, method or amount means reading every page.
+PaymentIndex keeps a compact copy of each payment in memory, as a slotted
+entities.Payment, with:
+
+  * an inverted index from words to payments, covering notes values,
+    email, contact and description
+  * exact-match postings for email, contact, method, status, currency and
+    each ``notes`` key/value pair
+  * sorted (value, id) lists on amount and created_at, searched with bisect
+
+A search is driven from whichever is smaller: the rarest postings, or the
+narrowest range bisected out of a sorted list. The other filters are then
+checked against those candidates only. Its cost depends on how many payments match, not on how
+many API pages the data spans.
+
+The index is filled by LocalIndex's incremental sync. A payment's status
+and refunded amount keep changing after it is created, so each sync re-reads
+the last RAZORPAY_PAYMENT_INDEX_RESYNC_WINDOW seconds (default one day).
+With RAZORPAY_PAYMENT_INDEX_DIR set, snapshots persist across restarts.
+"""
+import heapq
+import bisect
+import logging
+from typing import Any, Dict, List, Optional
+
+from entities import Payment
+from local_index import (LocalIndex, add_posting, normalize_contact, normalize_email, postings, remove_posting,
+                         tokenize)
+
+logger = logging.getLogger(__name__)
+
+SORT_FIELDS = ("created_at", "amount")
+
+
+def _notes(notes) -> Dict[str, Any]:
+    # Razorpay sends empty notes as []
+    return dict(notes) if isinstance(notes, dict) else {}
+
+
+class PaymentIndex(LocalIndex):
+    """In-memory inverted and range index of one merchant's payments."""
+
+    kind = "payments"
+
+    def __init__(self, snapshot_path: Optional[str] = None, resync_window: int = 86400):
+        self._by_term = {}
+        self._by_token = {}
+        self._sorted = {field: [] for field in SORT_FIELDS}
+        self._sorted_dirty = {field: False for field in SORT_FIELDS}
+        super().__init__(snapshot_path, resync_window=resync_window)
+
+    def _compact(self, payment: Dict[str, Any]) -> Payment:
+        return Payment.from_dict({
+            "id": payment["id"],
+            "amount": payment.get("amount") or 0,
+            "currency": payment.get("currency"),
+            "status": payment.get("status"),
+            "method": payment.get("method"),
+            "order_id": payment.get("order_id"),
+            "email": payment.get("email"),
+            "contact": payment.get("contact"),
+            "description": payment.get("description"),
+            "notes": _notes(payment.get("notes")),
+            "amount_refunded": payment.get("amount_refunded") or 0,
+            "created_at": payment.get("created_at") or 0,
+        })
+
+    def _list_method(self, client):
+        return client.list_payments
+
+    @staticmethod
+    def _terms(record) -> List[str]:
+        terms = []
+        email = normalize_email(record["email"])
+        if email:
+            terms.append(f"email:{email}")
+        contact = normalize_contact(record["contact"])
+        if contact:
+            terms.append(f"contact:{contact}")
+        for field in ("method", "status", "currency"):
+            if record[field]:
+                terms.append(f"{field}:{str(record[field]).lower()}")
+        for key, value in record["notes"].items():
+            terms.append(f"note:{key}={str(value).strip().lower()}")
+        return terms
+
+    @staticmethod
+    def _tokens(record) -> set:
+        tokens = set(tokenize(record["email"]))
+        tokens.update(tokenize(record["description"]))
+        for value in record["notes"].values():
+            tokens.update(tokenize(value))
+        contact = normalize_contact(record["contact"])
+        if contact:
+            tokens.add(contact)
+        return tokens
+
+    def _index(self, record, previous=None):
+        payment_id = record["id"]
+        for term in self._terms(record):
+            add_posting(self._by_term, term, payment_id)
+        for token in self._tokens(record):
+            add_posting(self._by_token, token, payment_id)
+        # Amount and created_at never change, so a replaced payment keeps its entries
+        if previous is None:
+            for field in SORT_FIELDS:
+                self._sorted[field].append((record[field], payment_id))
+                self._sorted_dirty[field] = True
+
+    def _unindex(self, record):
+        payment_id = record["id"]
+        for term in self._terms(record):
+            remove_posting(self._by_term, term, payment_id)
+        for token in self._tokens(record):
+            remove_posting(self._by_token, token, payment_id)
+
+    def sync(self, client, full: bool = False, page_size: int = 100) -> Dict[str, Any]:
+        summary = super().sync(client, full=full, page_size=page_size)
+        self._sort_pending()
+        return summary
+
+    def load(self, path: str):
+        super().load(path)
+        self._sort_pending()
+
+    def _sort_pending(self):
+        # Sort after a sync rather than in the next search
+        with self._lock:
+            for field in SORT_FIELDS:
+                self._sorted_list(field)
+
+    # Queries
+    def _sorted_list(self, field):
+        if self._sorted_dirty[field]:
+            # Syncs append in long runs, which list.sort merges in near-linear time
+            self._sorted[field].sort()
+            self._sorted_dirty[field] = False
+        return self._sorted[field]
+
+    def _range(self, field, low, high):
+        """(start, stop) positions of the values in [low, high] in a sorted list."""
+        values = self._sorted_list(field)
+        start = 0 if low is None else bisect.bisect_left(values, (low,))
+        stop = len(values) if high is None else bisect.bisect_left(values, (high + 1,))
+        return values, start, max(start, stop)
+
+    def search(self, text: Optional[str] = None, email: Optional[str] = None, contact: Optional[str] = None,
+               method: Optional[str] = None, status: Optional[str] = None, currency: Optional[str] = None,
+               notes: Optional[Dict[str, Any]] = None, amount_min: Optional[int] = None,
+               amount_max: Optional[int] = None, created_from: Optional[int] = None,
+               created_to: Optional[int] = None, sort: str = "created_at", descending: bool = True,
+               limit: int = 20) -> Dict[str, Any]:
+        """Payments matching every given filter, as {count, items}.
+
+        ``text`` matches whole words in notes, email, contact and
+        description; every word must match. ``count`` is the number of
+        matches, ``items`` the first ``limit`` of them in ``sort`` order.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}")
+        terms = []
+        if email:
+            terms.append(f"email:{normalize_email(email)}")
+        if contact:
+            terms.append(f"contact:{normalize_contact(contact)}")
+        for field, value in (("method", method), ("status", status), ("currency", currency)):
+            if value:
+                terms.append(f"{field}:{str(value).lower()}")
+        for key, value in (notes or {}).items():
+            terms.append(f"note:{key}={str(value).strip().lower()}")
+        ranges = {"amount": (amount_min, amount_max), "created_at": (created_from, created_to)}
+        ranges = {field: bounds for field, bounds in ranges.items() if bounds != (None, None)}
+
+        with self._lock:
+            lists = [postings(self._by_term, term) for term in terms]
+            lists += [postings(self._by_token, token) for token in tokenize(text)]
+            lists.sort(key=len)
+            spans = {field: self._range(field, *bounds) for field, bounds in ranges.items()}
+            narrowest = min(spans, key=lambda f: spans[f][2] - spans[f][1], default=None)
+            span_size = spans[narrowest][2] - spans[narrowest][1] if narrowest else len(self.records)
+
+            if lists and len(lists[0]) <= span_size:
+                # Drive from the rarest postings, intersecting upwards
+                candidates = set(lists[0])
+                for ids in lists[1:]:
+                    if not candidates:
+                        break
+                    candidates &= ids
+                matched = [payment_id for payment_id in candidates if self._in_ranges(payment_id, ranges)]
+            else:
+                # Drive from the narrowest range's slice of its sorted list
+                field = narrowest or sort
+                values, start, stop = spans[field] if narrowest else self._range(sort, None, None)
+                others = {f: bounds for f, bounds in ranges.items() if f != field}
+                if field == sort and not others and not lists:
+                    # Already in sort order: no need to look past the page
+                    page = values[max(start, stop - limit):stop][::-1] if descending else values[start:start + limit]
+                    return {"count": stop - start,
+                            "items": [dict(self.records[payment_id]) for _, payment_id in page]}
+                matched = [payment_id for _, payment_id in values[start:stop]
+                           if all(payment_id in ids for ids in lists) and self._in_ranges(payment_id, others)]
+
+            key = lambda payment_id: (self.records[payment_id][sort], payment_id)  # noqa: E731
+            page = heapq.nlargest(limit, matched, key=key) if descending else heapq.nsmallest(limit, matched, key=key)
+            return {"count": len(matched), "items": [dict(self.records[payment_id]) for payment_id in page]}
+
+    def _in_ranges(self, payment_id, ranges) -> bool:
+        record = self.records[payment_id]
+        for field, (low, high) in ranges.items():
+            if (low is not None and record[field] < low) or (high is not None and record[field] > high):
+                return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = super().stats()
+            stats.update({"terms": len(self._by_term), "tokens": len(self._by_token)})
+            return stats
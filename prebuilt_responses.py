@@ -0,0 +1,143 @@
+"""
+Pre-built responses for the static MCP catalogue endpoints.
+
+/mcp/tools, /mcp/metadata and the metadata reply of POST /mcp only ever
+return the fixed tool catalogue, and clients poll them constantly. Their JSON
+bodies are serialized and gzipped once at import, each with a strong ETag, so
+a request costs a header lookup and a write of ready-made bytes, or a 304 when
+the client's If-None-Match still matches.
+
+StaticResponseMiddleware (WSGI) and StaticResponseASGIMiddleware answer the
+GET endpoints before the request reaches Flask or Starlette routing.
+"""
+import gzip
+import json
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from tool_dispatch import RAZORPAY_TOOLS, SERVER_INFO
+
+logger = logging.getLogger(__name__)
+
+Headers = List[Tuple[str, str]]
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows a gzip response."""
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class PrebuiltResponse:
+    """A JSON body serialized and compressed once, with strong ETags."""
+
+    def __init__(self, payload: Any):
+        self.body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        # mtime=0 keeps the gzip bytes, and so the ETag, stable across restarts
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Each encoding is its own representation and gets its own strong ETag
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        """Weak comparison of If-None-Match against either representation (RFC 9110 13.1.2)."""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in (self.etag, self.gzip_etag):
+                return True
+        return False
+
+    def respond(self, if_none_match: Optional[str] = None,
+                accept_encoding: Optional[str] = None) -> Tuple[int, Headers, bytes]:
+        """Return (status, headers, body) for a request with these headers."""
+        use_gzip = accepts_gzip(accept_encoding)
+        headers = [
+            ("ETag", self.gzip_etag if use_gzip else self.etag),
+            ("Cache-Control", "no-cache"),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if self.not_modified(if_none_match):
+            return 304, headers, b""
+
+        body = self.gzip_body if use_gzip else self.body
+        headers.append(("Content-Type", "application/json"))
+        headers.append(("Content-Length", str(len(body))))
+        if use_gzip:
+            headers.append(("Content-Encoding", "gzip"))
+        return 200, headers, body
+
+
+TOOLS_RESPONSE = PrebuiltResponse({"tools": RAZORPAY_TOOLS})
+METADATA_RESPONSE = PrebuiltResponse(dict(SERVER_INFO, tools=RAZORPAY_TOOLS))
+METADATA_REPLY_RESPONSE = PrebuiltResponse({"type": "metadata", "data": dict(SERVER_INFO, tools=RAZORPAY_TOOLS)})
+
+# GET endpoints answered by the middlewares before routing
+STATIC_ROUTES: Dict[str, PrebuiltResponse] = {
+    "/mcp/tools": TOOLS_RESPONSE,
+    "/mcp/metadata": METADATA_RESPONSE,
+}
+
+_STATUS_LINES = {200: "200 OK", 304: "304 Not Modified"}
+
+
+class StaticResponseMiddleware:
+    """WSGI middleware serving STATIC_ROUTES without entering the wrapped app."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        prebuilt = STATIC_ROUTES.get(environ.get("PATH_INFO", ""))
+        method = environ.get("REQUEST_METHOD")
+        if prebuilt is None or method not in ("GET", "HEAD"):
+            return self.app(environ, start_response)
+
+        status, headers, body = prebuilt.respond(environ.get("HTTP_IF_NONE_MATCH"),
+                                                 environ.get("HTTP_ACCEPT_ENCODING"))
+        start_response(_STATUS_LINES[status], headers)
+        return [b""] if method == "HEAD" else [body]
+
+
+class StaticResponseASGIMiddleware:
+    """ASGI middleware serving STATIC_ROUTES without entering the wrapped app."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        prebuilt = STATIC_ROUTES.get(scope.get("path", "")) if scope["type"] == "http" else None
+        method = scope.get("method")
+        if prebuilt is None or method not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {}
+        for name, value in scope.get("headers", []):
+            if name in (b"if-none-match", b"accept-encoding"):
+                request_headers[name] = value.decode("latin-1")
+        status, headers, body = prebuilt.respond(request_headers.get(b"if-none-match"),
+                                                 request_headers.get(b"accept-encoding"))
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        })
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
@@ -0,0 +1,151 @@
+"""
+Speculative prefetch of related entities.
+
+Agents follow predictable paths: after fetching an order they ask for its
+payments, and after a subscription they ask for its plan and customer. When a
+parent entity is fetched, the Prefetcher warms the client's EntityCache with
+the related entities in the background, so the follow-up call is answered
+without a Razorpay round trip.
+
+Prefetching is strictly best effort. Work goes to a small shared pool of
+daemon threads. When the pool's queue is full the prefetch is dropped rather
+than queued, so the primary response is never delayed and a burst of parent
+lookups cannot flood Razorpay.
+
+The relationship map is configured with RAZORPAY_PREFETCH, a comma-separated
+list of relationships from RELATIONSHIPS (``none`` disables prefetching):
+
+    RAZORPAY_PREFETCH=order.payments,subscription.plan,subscription.customer
+
+Per-relationship counts of prefetches, hits (the prefetched entry was read)
+and wasted fetches (it expired unread) show which relationships pay off.
+"""
+import os
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# relationship -> (parent kind, child kind, parent field holding the child id)
+RELATIONSHIPS = {
+    "order.payments": ("order", "order_payments", "id"),
+    "payment.order": ("payment", "order", "order_id"),
+    "payment.customer": ("payment", "customer", "customer_id"),
+    "payment.refunds": ("payment", "payment_refunds", "id"),
+    "subscription.plan": ("subscription", "plan", "plan_id"),
+    "subscription.customer": ("subscription", "customer", "customer_id"),
+}
+
+DEFAULT_RELATIONSHIPS = "order.payments,subscription.plan,subscription.customer"
+
+
+def parse_relationships(spec: Optional[str]) -> Dict[str, List[str]]:
+    """Turn a RAZORPAY_PREFETCH value into {parent kind: [relationship, ...]}."""
+    by_parent = {}
+    for name in (spec or "").split(","):
+        name = name.strip()
+        if not name or name == "none":
+            continue
+        if name not in RELATIONSHIPS:
+            logger.warning(f"Ignoring unknown prefetch relationship: {name}")
+            continue
+        by_parent.setdefault(RELATIONSHIPS[name][0], []).append(name)
+    return by_parent
+
+
+class Prefetcher:
+    """Bounded, drop-when-busy background warming of entity caches."""
+
+    def __init__(self, relationships: Dict[str, List[str]], max_workers: int = 2, max_pending: int = 16):
+        self.relationships = relationships
+        self.max_workers = max_workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        # Caches written to, swept by stats() so expired unread prefetches count as wasted
+        self._caches = weakref.WeakSet()
+        self.counters = {name: {"scheduled": 0, "hits": 0, "wasted": 0, "failed": 0}
+                         for names in relationships.values() for name in names}
+        self.dropped = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Created on first use so processes that never prefetch start no threads
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="razorpay-prefetch")
+        return self._executor
+
+    def after_fetch(self, client, kind: str, entity: Any):
+        """Schedule prefetches for an entity the client just returned. Never blocks."""
+        names = self.relationships.get(kind)
+        if not names or not isinstance(entity, dict) or not client.entity_cache.enabled:
+            return
+        for name in names:
+            _, child_kind, field = RELATIONSHIPS[name]
+            child_id = entity.get(field)
+            if not child_id or client.entity_cache.contains(child_kind, child_id):
+                continue
+            key = (id(client), child_kind, child_id)
+            with self._lock:
+                if key in self._in_flight:
+                    continue
+                if not self._slots.acquire(blocking=False):
+                    self.dropped += 1
+                    continue
+                self._in_flight.add(key)
+                self.counters[name]["scheduled"] += 1
+            self._pool().submit(self._run, client, name, child_kind, child_id, key)
+
+    def _run(self, client, name, child_kind, child_id, key):
+        try:
+            value = client.fetch_entity(child_kind, child_id)
+            client.entity_cache.put(child_kind, child_id, value, relation=name)
+            with self._lock:
+                self._caches.add(client.entity_cache)
+        except Exception as e:
+            with self._lock:
+                self.counters[name]["failed"] += 1
+            logger.debug(f"Prefetch {name} for {child_id} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(key)
+            self._slots.release()
+
+    # EntityCache listener interface
+    def record_hit(self, relation: str):
+        with self._lock:
+            self.counters[relation]["hits"] += 1
+
+    def record_wasted(self, relation: str):
+        with self._lock:
+            self.counters[relation]["wasted"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            caches = list(self._caches)
+        for cache in caches:
+            cache.expire()
+        with self._lock:
+            relationships = {}
+            for name, counts in self.counters.items():
+                done = counts["scheduled"] - counts["failed"]
+                relationships[name] = dict(counts, hit_rate=round(counts["hits"] / done, 3) if done else None)
+            return {
+                "in_flight": len(self._in_flight),
+                "dropped": self.dropped,
+                "max_workers": self.max_workers,
+                "relationships": relationships,
+            }
+
+
+prefetcher = Prefetcher(
+    parse_relationships(os.environ.get("RAZORPAY_PREFETCH", DEFAULT_RELATIONSHIPS)),
+    max_workers=int(os.environ.get("RAZORPAY_PREFETCH_WORKERS", "2")),
+    max_pending=int(os.environ.get("RAZORPAY_PREFETCH_MAX_PENDING", "16"))
+)
@@ -0,0 +1,286 @@
+"""
+Record/replay transport for the Razorpay SDK.
+
+``razorpay.Client`` sends every API call through ``client.session`` (a
+``requests.Session``). A cassette wraps that session so real traffic can be
+captured to a compact gzip'd NDJSON file and later served back from memory,
+with the original latencies (optionally scaled), without touching Razorpay.
+
+Enable it with environment variables:
+
+    RAZORPAY_CASSETTE=cassettes/prod-sample.jsonl.gz
+    RAZORPAY_CASSETTE_MODE=record        # or "replay"
+    RAZORPAY_CASSETTE_LATENCY_SCALE=1.0  # replay only, 0 disables the sleeps
+    RAZORPAY_CASSETTE_PATH_FALLBACK=0    # replay only, 1 answers unmatched requests by path
+"""
+import os
+import gzip
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, parse_qsl
+
+logger = logging.getLogger(__name__)
+
+SCRUBBED = "[scrubbed]"
+
+# Keys whose values are personal data or secrets. They are replaced on both the
+# recorded request and the recorded response, so the cassette can be shared.
+SCRUB_KEYS = frozenset({
+    "name", "email", "contact", "phone", "vpa", "address", "line1", "line2",
+    "zipcode", "city", "account_number", "ifsc", "bank_account", "last4",
+    "customer_name", "customer_email", "customer_contact", "billing_address",
+    "shipping_address", "beneficiary_name", "gstin", "key_id", "key_secret",
+    "authorization", "password", "token",
+})
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when no recorded interaction matches a request."""
+
+
+def scrub(value):
+    """Return a copy of ``value`` with credentials and PII replaced."""
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, item in value.items():
+            if str(key).lower() in SCRUB_KEYS and item not in (None, ""):
+                cleaned[key] = SCRUBBED
+            else:
+                cleaned[key] = scrub(item)
+        return cleaned
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    return value
+
+
+def _decode_body(body):
+    """Turn a request body as sent by the SDK into plain JSON data."""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    if isinstance(body, str):
+        try:
+            return json.loads(body)
+        except ValueError:
+            return body
+    return body
+
+
+def request_key(method: str, url: str, options: Dict[str, Any]) -> str:
+    """Build the canonical match key for a request.
+
+    The key is built from scrubbed data, so a live request matches its recording
+    even though the recording no longer contains the original PII.
+    """
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update({k: str(v) for k, v in (options.get("params") or {}).items() if v is not None})
+    body = _decode_body(options.get("data") if options.get("data") is not None else options.get("json"))
+    return json.dumps(
+        [method.upper(), parts.path, scrub(query), scrub(body)],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+
+
+class _SessionProxy:
+    """Base for the session wrappers; routes the verb helpers through request()."""
+
+    def get(self, url, **options):
+        return self.request("GET", url, **options)
+
+    def post(self, url, **options):
+        return self.request("POST", url, **options)
+
+    def put(self, url, **options):
+        return self.request("PUT", url, **options)
+
+    def patch(self, url, **options):
+        return self.request("PATCH", url, **options)
+
+    def delete(self, url, **options):
+        return self.request("DELETE", url, **options)
+
+
+class RecordingSession(_SessionProxy):
+    """Pass-through session that appends every interaction to a cassette."""
+
+    def __init__(self, session, cassette):
+        self._session = session
+        self._cassette = cassette
+
+    def request(self, method, url, **options):
+        start = time.perf_counter()
+        response = self._session.request(method, url, **options)
+        self._cassette.record(method, url, options, response, time.perf_counter() - start)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class ReplaySession(_SessionProxy):
+    """Session that answers requests from a cassette held in memory."""
+
+    def __init__(self, cassette):
+        self._cassette = cassette
+
+    def request(self, method, url, **options):
+        return self._cassette.replay(method, url, options)
+
+    def close(self):
+        pass
+
+
+class Cassette:
+    """A file of recorded request/response pairs.
+
+    In record mode interactions are appended as they happen to a single gzip
+    stream, sync-flushed after every line. A recorder that is killed leaves
+    that stream without its end marker, so replay keeps every complete line
+    and drops the truncated tail. In replay mode the whole file is loaded
+    once and responses for the same request are served in recording order,
+    the last one repeating once the sequence runs out.
+
+    Requests are matched on their exact key. With ``path_fallback`` an
+    unmatched request is answered with a response recorded for the same
+    method and path (other parameters or body); those answers are counted in
+    ``fallback_hits``, apart from exact ``hits``.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 1.0,
+                 path_fallback: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.path_fallback = path_fallback
+        self._lock = threading.Lock()
+        self._file = None
+        self._exact = defaultdict(deque)
+        self._by_path = defaultdict(deque)
+        self.hits = 0
+        self.fallback_hits = 0
+        self.misses = 0
+
+        if mode == "replay":
+            self._load()
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._file = gzip.open(path, "at", encoding="utf-8")
+            atexit.register(self.close)
+
+    def wrap(self, session):
+        """Return the session the SDK should use in this cassette's mode."""
+        if self.mode == "record":
+            return RecordingSession(session, self)
+        return ReplaySession(self)
+
+    def _load(self):
+        count = 0
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if not line.endswith("\n"):
+                        # Last line of a recording cut off mid-write
+                        logger.warning(f"Ignoring a truncated interaction at the end of {self.path}")
+                        break
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    self._exact[entry["key"]].append(entry)
+                    self._by_path[(entry["method"], entry["path"])].append(entry)
+                    count += 1
+            except EOFError:
+                # The recorder was stopped before closing the gzip stream
+                logger.warning(f"{self.path} ends without a gzip end marker; replaying the "
+                               f"{count} complete interactions")
+        logger.info(f"Loaded {count} recorded interactions from {self.path}")
+
+    def record(self, method, url, options, response, elapsed):
+        """Append one scrubbed interaction to the cassette file."""
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+
+        entry = {
+            "key": request_key(method, url, options),
+            "method": method.upper(),
+            "path": urlsplit(url).path,
+            "status": response.status_code,
+            "body": scrub(body),
+            "elapsed": round(elapsed, 4),
+        }
+        line = json.dumps(entry, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def _next(self, queue):
+        # Keep the last response around so a replayed loop never runs dry
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def replay(self, method, url, options):
+        """Build the recorded response for a request, sleeping for its latency."""
+        key = request_key(method, url, options)
+        with self._lock:
+            queue = self._exact.get(key)
+            if queue:
+                self.hits += 1
+            elif self.path_fallback and self._by_path.get((method.upper(), urlsplit(url).path)):
+                queue = self._by_path[(method.upper(), urlsplit(url).path)]
+                self.fallback_hits += 1
+            else:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded interaction for {method.upper()} {urlsplit(url).path}")
+            entry = self._next(queue)
+
+        if self.latency_scale > 0 and entry.get("elapsed"):
+            time.sleep(entry["elapsed"] * self.latency_scale)
+        return _build_response(entry, url)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _build_response(entry, url):
+    # requests is a dependency of the razorpay SDK, so it is always present
+    from requests.models import Response
+
+    response = Response()
+    response.status_code = entry["status"]
+    response._content = json.dumps(entry["body"]).encode("utf-8")
+    response.headers["Content-Type"] = "application/json"
+    response.encoding = "utf-8"
+    response.url = url
+    return response
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    """Return the process-wide cassette configured in the environment, if any."""
+    path = os.environ.get("RAZORPAY_CASSETTE")
+    if not path:
+        return None
+
+    with _cassettes_lock:
+        if path not in _cassettes:
+            mode = os.environ.get("RAZORPAY_CASSETTE_MODE", "replay")
+            scale = float(os.environ.get("RAZORPAY_CASSETTE_LATENCY_SCALE", "1.0"))
+            fallback = os.environ.get("RAZORPAY_CASSETTE_PATH_FALLBACK", "0").lower() in ("1", "true", "yes")
+            _cassettes[path] = Cassette(path, mode=mode, latency_scale=scale, path_fallback=fallback)
+            logger.info(f"Razorpay cassette enabled: {path} ({mode})")
+        return _cassettes[path]
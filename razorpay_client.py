@@ -1,34 +1,221 @@
 import os
 import logging
+import threading
 import traceback
-from razorpay import Client
+
+from razorpay_cassette import cassette_from_env
+from pagination import apply_cursor, attach_next_cursor, ignores_window, offset_cursor
+from entity_cache import EntityCache
+from prefetch import prefetcher
+from customer_index import CustomerIndex
+from payment_index import PaymentIndex
+from revenue_analytics import PlanIndex
+from local_index import snapshot_path_for
+from id_validation import NegativeCache, validate_id
 
 logger = logging.getLogger(__name__)
 
+# Cache kinds keyed by another entity's ID
+ID_KINDS = {'payment_refunds': 'payment', 'order_payments': 'order'}
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_default_client():
+    """Return the process-wide client built from the environment credentials.
+
+    Every front end in a process shares this instance, so a preloaded gunicorn
+    master builds it once and its workers inherit it copy-on-write.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = RazorpayClient()
+        return _default_client
+
 class RazorpayClient:
     """Client for interacting with the Razorpay API."""
     
-    def __init__(self):
-        """Initialize the Razorpay client with API credentials."""
-        self.key_id = os.environ.get("RAZORPAY_KEY_ID")
-        self.key_secret = os.environ.get("RAZORPAY_KEY_SECRET")
+    def __init__(self, key_id=None, key_secret=None):
+        """Initialize the Razorpay client with API credentials.
+
+        Explicit credentials (one merchant of a multi-merchant pool) take
+        precedence over RAZORPAY_KEY_ID / RAZORPAY_KEY_SECRET.
+        """
+        self.key_id = key_id or os.environ.get("RAZORPAY_KEY_ID")
+        self.key_secret = key_secret or os.environ.get("RAZORPAY_KEY_SECRET")
         
         if not self.key_id or not self.key_secret:
             logger.warning("Razorpay API credentials not set. Using test mode.")
             self.key_id = self.key_id or "rzp_test_key"
             self.key_secret = self.key_secret or "rzp_test_secret"
         
-        self.client = Client(auth=(self.key_id, self.key_secret))
+        # The SDK client is built on first use; importing razorpay costs more
+        # than the rest of a cold start, and many sessions never call a tool.
+        self._client = None
+        self._client_lock = threading.Lock()
+
+        # Recently fetched entities, warmed ahead of use by the prefetcher
+        self.entity_cache = EntityCache(
+            max_entries=int(os.environ.get("RAZORPAY_ENTITY_CACHE_SIZE", "1024")),
+            ttl=float(os.environ.get("RAZORPAY_ENTITY_CACHE_TTL", "30")),
+            listener=prefetcher
+        )
+        # IDs Razorpay recently said do not exist
+        self.negative_cache = NegativeCache(ttl=float(os.environ.get("RAZORPAY_NEGATIVE_CACHE_TTL", "60")))
+        self._customer_index = None
+        self._payment_index = None
+        self._plan_catalog = None
+
+    @property
+    def client(self):
+        """The underlying razorpay.Client, created on first access."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_sdk_client()
+        return self._client
+
+    def _build_sdk_client(self):
+        from razorpay import Client
+        from requests.adapters import HTTPAdapter
+
+        client = Client(auth=(self.key_id, self.key_secret))
+
+        # Size the keep-alive pool for the concurrent sessions sharing this client
+        pool_size = int(os.environ.get("RAZORPAY_HTTP_POOL_SIZE", "32"))
+        client.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+        # Route SDK traffic through a record/replay cassette when configured
+        cassette = cassette_from_env()
+        if cassette:
+            client.session = cassette.wrap(client.session)
+        return client
+
+    @property
+    def customer_index(self):
+        """Local search index of this merchant's customers, created on first use."""
+        if self._customer_index is None:
+            with self._client_lock:
+                if self._customer_index is None:
+                    self._customer_index = CustomerIndex(snapshot_path_for("customer", self.key_id))
+        return self._customer_index
+
+    @property
+    def payment_index(self):
+        """Local search index of this merchant's payments, created on first use."""
+        if self._payment_index is None:
+            with self._client_lock:
+                if self._payment_index is None:
+                    self._payment_index = PaymentIndex(
+                        snapshot_path_for("payment", self.key_id),
+                        resync_window=int(os.environ.get("RAZORPAY_PAYMENT_INDEX_RESYNC_WINDOW", "86400"))
+                    )
+        return self._payment_index
+
+    @property
+    def plan_catalog(self):
+        """Hash index of this merchant's plans, created empty on first use and filled by sync()."""
+        if self._plan_catalog is None:
+            with self._client_lock:
+                if self._plan_catalog is None:
+                    self._plan_catalog = PlanIndex(self)
+        return self._plan_catalog
+
+    def warm(self):
+        """Build the SDK client now instead of on the first API call."""
+        return self.client
+
+    def reset_connections(self):
+        """Drop pooled connections, e.g. after a fork, without building a client."""
+        if self._client is not None:
+            self._client.session.close()
+
+    def _list_page(self, fetch, razorpay_params, params):
+        """Fetch one page of a list API, continuing from params['cursor'] if given."""
+        cursor = params.get('cursor')
+        request_params = apply_cursor(razorpay_params, cursor)
+        result = fetch(request_params)
+        if ignores_window(result, request_params, cursor):
+            logger.warning("List API ignored the cursor's time window; continuing with skip paging")
+            cursor = offset_cursor(cursor)
+            request_params = apply_cursor(razorpay_params, cursor)
+            result = fetch(request_params)
+        return attach_next_cursor(result, request_params, cursor)
+
+    def fetch_entity(self, kind, entity_id):
+        """Fetch one entity from Razorpay, bypassing the entity cache."""
+        if kind == 'payment':
+            return self.client.payment.fetch(entity_id)
+        if kind == 'payment_refunds':
+            return self.client.payment.fetch_multiple_refund(entity_id)
+        if kind == 'order':
+            return self.client.order.fetch(entity_id)
+        if kind == 'order_payments':
+            return self.client.order.payments(entity_id)
+        if kind == 'customer':
+            return self.client.customer.fetch(entity_id)
+        if kind == 'plan':
+            return self.client.plan.fetch(entity_id)
+        if kind == 'subscription':
+            return self.client.subscription.fetch(entity_id)
+        raise ValueError(f"Unknown entity kind: {kind}")
+
+    def _checked_call(self, id_kind, entity_id, call, *args, **kwargs):
+        """Call Razorpay about an entity unless it is known not to exist; remembers a not-found answer."""
+        self.negative_cache.check(id_kind, entity_id)
+        try:
+            return call(*args, **kwargs)
+        except Exception as e:
+            self.negative_cache.record(id_kind, entity_id, e)
+            raise
+
+    def _checked_write(self, id_kind, entity_id, call, *args, **kwargs):
+        """Call Razorpay to change an entity unless it is known not to exist.
+
+        Errors are not remembered: a write can fail for reasons that say
+        nothing about whether the ID exists.
+        """
+        self.negative_cache.check(id_kind, entity_id)
+        return call(*args, **kwargs)
+
+    def _cached_fetch(self, kind, entity_id, prefetch=True):
+        """Fetch an entity and, with ``prefetch``, schedule prefetches of its relations.
+
+        Only the first read of a prefetched entry is served from the cache, and
+        plain fetches are not cached, so a caller polling an entity always sees
+        Razorpay's current state.
+        """
+        value = self.entity_cache.get(kind, entity_id, prefetched_only=True)
+        if value is None:
+            id_kind = ID_KINDS.get(kind, kind)
+            value = self._checked_call(id_kind, entity_id, self.fetch_entity, kind, entity_id)
+        if prefetch:
+            prefetcher.after_fetch(self, kind, value)
+        return value
+
+    def get_entity(self, kind, entity_id, prefetch=True):
+        """Get one entity (any fetch_entity kind) by ID through the entity cache.
+
+        Callers that fetch the related entities themselves, such as the
+        composite views, pass prefetch=False so each is requested only once.
+        """
+        try:
+            entity_id = validate_id(ID_KINDS.get(kind, kind), entity_id)
+
+            return self._cached_fetch(kind, entity_id, prefetch=prefetch)
+        except Exception as e:
+            logger.error(f"Error fetching {kind}: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
 
     # Payment Methods
     def get_payment(self, params):
         """Get payment details by payment ID."""
         try:
-            payment_id = params.get('id')
-            if not payment_id:
-                raise ValueError("Payment ID is required")
+            payment_id = validate_id('payment', params.get('id'))
             
-            return self.client.payment.fetch(payment_id)
+            return self._cached_fetch('payment', payment_id)
         except Exception as e:
             logger.error(f"Error fetching payment: {str(e)}")
             logger.error(traceback.format_exc())
@@ -48,7 +235,7 @@ class RazorpayClient:
             if 'to' in params:
                 razorpay_params['to'] = params['to']
             
-            return self.client.payment.all(razorpay_params)
+            return self._list_page(self.client.payment.all, razorpay_params, params)
         except Exception as e:
             logger.error(f"Error listing payments: {str(e)}")
             logger.error(traceback.format_exc())
@@ -84,34 +271,70 @@ class RazorpayClient:
             logger.error(traceback.format_exc())
             raise
 
+    def list_payment_refunds(self, params):
+        """List the refunds of a payment."""
+        try:
+            payment_id = validate_id('payment', params.get('id'))
+            
+            return self._cached_fetch('payment_refunds', payment_id)
+        except Exception as e:
+            logger.error(f"Error listing payment refunds: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
     # Refund Methods
     def get_refund(self, params):
         """Get refund details by refund ID."""
         try:
-            refund_id = params.get('id')
-            if not refund_id:
-                raise ValueError("Refund ID is required")
+            refund_id = validate_id('refund', params.get('id'))
             
-            return self.client.refund.fetch(refund_id)
+            return self._checked_call('refund', refund_id, self.client.refund.fetch, refund_id)
         except Exception as e:
             logger.error(f"Error fetching refund: {str(e)}")
             logger.error(traceback.format_exc())
             raise
 
+    def list_refunds(self, params):
+        """List refunds with optional filtering."""
+        try:
+            razorpay_params = {}
+            if 'count' in params:
+                razorpay_params['count'] = params['count']
+            if 'skip' in params:
+                razorpay_params['skip'] = params['skip']
+            if 'from' in params:
+                razorpay_params['from'] = params['from']
+            if 'to' in params:
+                razorpay_params['to'] = params['to']
+
+            return self._list_page(self.client.refund.all, razorpay_params, params)
+        except Exception as e:
+            logger.error(f"Error listing refunds: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
     def create_refund(self, params):
         """Create a new refund."""
         try:
-            payment_id = params.get('payment_id')
-            if not payment_id:
-                raise ValueError("Payment ID is required")
+            payment_id = validate_id('payment', params.get('payment_id'))
             
             refund_params = {
                 'payment_id': payment_id,
                 'amount': params.get('amount'),
                 'notes': params.get('notes', {})
             }
+            if params.get('receipt'):
+                refund_params['receipt'] = params['receipt']
+            
+            # Razorpay returns the original refund when an idempotency key is replayed
+            options = {}
+            if params.get('idempotency_key'):
+                options['headers'] = {'X-Refund-Idempotency': params['idempotency_key']}
             
-            return self.client.refund.create(data=refund_params)
+            refund = self._checked_write('payment', payment_id, self.client.refund.create, data=refund_params, **options)
+            self.entity_cache.invalidate('payment', payment_id)
+            self.entity_cache.invalidate('payment_refunds', payment_id)
+            return refund
         except Exception as e:
             logger.error(f"Error creating refund: {str(e)}")
             logger.error(traceback.format_exc())
@@ -121,16 +344,25 @@ class RazorpayClient:
     def get_order(self, params):
         """Get order details by order ID."""
         try:
-            order_id = params.get('id')
-            if not order_id:
-                raise ValueError("Order ID is required")
+            order_id = validate_id('order', params.get('id'))
             
-            return self.client.order.fetch(order_id)
+            return self._cached_fetch('order', order_id)
         except Exception as e:
             logger.error(f"Error fetching order: {str(e)}")
             logger.error(traceback.format_exc())
             raise
 
+    def list_order_payments(self, params):
+        """List the payments made against an order."""
+        try:
+            order_id = validate_id('order', params.get('id'))
+            
+            return self._cached_fetch('order_payments', order_id)
+        except Exception as e:
+            logger.error(f"Error listing order payments: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
     def list_orders(self, params):
         """List orders with optional filtering."""
         try:
@@ -145,7 +377,7 @@ class RazorpayClient:
             if 'to' in params:
                 razorpay_params['to'] = params['to']
             
-            return self.client.order.all(razorpay_params)
+            return self._list_page(self.client.order.all, razorpay_params, params)
         except Exception as e:
             logger.error(f"Error listing orders: {str(e)}")
             logger.error(traceback.format_exc())
@@ -172,11 +404,9 @@ class RazorpayClient:
     def get_customer(self, params):
         """Get customer details by customer ID."""
         try:
-            customer_id = params.get('id')
-            if not customer_id:
-                raise ValueError("Customer ID is required")
+            customer_id = validate_id('customer', params.get('id'))
             
-            return self.client.customer.fetch(customer_id)
+            return self._cached_fetch('customer', customer_id)
         except Exception as e:
             logger.error(f"Error fetching customer: {str(e)}")
             logger.error(traceback.format_exc())
@@ -191,22 +421,66 @@ class RazorpayClient:
                 'contact': params.get('contact', ''),
                 'notes': params.get('notes', {})
             }
-            
-            return self.client.customer.create(data=customer_params)
+            if 'fail_existing' in params:
+                # "0" returns the existing customer with this email and contact instead of an error
+                customer_params['fail_existing'] = params['fail_existing']
+            
+            customer = self.client.customer.create(data=customer_params)
+            if self._customer_index is not None:
+                self._customer_index.add(customer)
+            return customer
         except Exception as e:
             logger.error(f"Error creating customer: {str(e)}")
             logger.error(traceback.format_exc())
             raise
 
+    def edit_customer(self, params):
+        """Update a customer's name, email, contact or notes."""
+        try:
+            customer_id = validate_id('customer', params.get('id'))
+            
+            customer_params = {}
+            for field in ('name', 'email', 'contact', 'notes'):
+                if field in params:
+                    customer_params[field] = params[field]
+            
+            customer = self._checked_write('customer', customer_id, self.client.customer.edit, customer_id,
+                                           data=customer_params)
+            self.entity_cache.invalidate('customer', customer_id)
+            if self._customer_index is not None:
+                self._customer_index.add(customer)
+            return customer
+        except Exception as e:
+            logger.error(f"Error editing customer: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
+    def list_customers(self, params):
+        """List customers with optional filtering."""
+        try:
+            razorpay_params = {}
+            if 'count' in params:
+                razorpay_params['count'] = params['count']
+            if 'skip' in params:
+                razorpay_params['skip'] = params['skip']
+            if 'from' in params:
+                razorpay_params['from'] = params['from']
+            if 'to' in params:
+                razorpay_params['to'] = params['to']
+            
+            return self._list_page(self.client.customer.all, razorpay_params, params)
+        except Exception as e:
+            logger.error(f"Error listing customers: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
+
     # Payment Link Methods
     def get_payment_link(self, params):
         """Get payment link details by payment link ID."""
         try:
-            link_id = params.get('id')
-            if not link_id:
-                raise ValueError("Payment Link ID is required")
+            link_id = validate_id('payment_link', params.get('id'))
             
-            return self.client.payment_link.fetch(link_id)
+            return self._checked_call('payment_link', link_id, self.client.payment_link.fetch, link_id)
         except Exception as e:
             logger.error(f"Error fetching payment link: {str(e)}")
             logger.error(traceback.format_exc())
@@ -238,22 +512,40 @@ class RazorpayClient:
                 'callback_url': params.get('callback_url', ''),
                 'callback_method': params.get('callback_method', 'get')
             }
+            # Razorpay rejects a second link with the same reference_id
+            if params.get('reference_id'):
+                link_params['reference_id'] = params['reference_id']
+            if params.get('expire_by'):
+                link_params['expire_by'] = params['expire_by']
             
             return self.client.payment_link.create(data=link_params)
         except Exception as e:
             logger.error(f"Error creating payment link: {str(e)}")
             logger.error(traceback.format_exc())
             raise
+
+    def list_payment_links(self, params):
+        """List payment links, optionally filtered by payment_id or reference_id."""
+        try:
+            options = {}
+            if 'payment_id' in params:
+                options['payment_id'] = params['payment_id']
+            if 'reference_id' in params:
+                options['reference_id'] = params['reference_id']
+            
+            return self.client.payment_link.all(options)
+        except Exception as e:
+            logger.error(f"Error listing payment links: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
             
     # Settlement Methods
     def get_settlement(self, params):
         """Get settlement details by settlement ID."""
         try:
-            settlement_id = params.get('id')
-            if not settlement_id:
-                raise ValueError("Settlement ID is required")
+            settlement_id = validate_id('settlement', params.get('id'))
             
-            return self.client.settlement.fetch(settlement_id)
+            return self._checked_call('settlement', settlement_id, self.client.settlement.fetch, settlement_id)
         except Exception as e:
             logger.error(f"Error fetching settlement: {str(e)}")
             logger.error(traceback.format_exc())
@@ -273,7 +565,7 @@ class RazorpayClient:
             if 'to' in params:
                 razorpay_params['to'] = params['to']
             
-            return self.client.settlement.all(razorpay_params)
+            return self._list_page(self.client.settlement.all, razorpay_params, params)
         except Exception as e:
             logger.error(f"Error listing settlements: {str(e)}")
             logger.error(traceback.format_exc())
@@ -316,11 +608,9 @@ class RazorpayClient:
     def get_plan(self, params):
         """Get plan details by plan ID."""
         try:
-            plan_id = params.get('id')
-            if not plan_id:
-                raise ValueError("Plan ID is required")
+            plan_id = validate_id('plan', params.get('id'))
             
-            return self.client.plan.fetch(plan_id)
+            return self._cached_fetch('plan', plan_id)
         except Exception as e:
             logger.error(f"Error fetching plan: {str(e)}")
             logger.error(traceback.format_exc())
@@ -334,8 +624,12 @@ class RazorpayClient:
                 options['count'] = params['count']
             if 'skip' in params:
                 options['skip'] = params['skip']
-                
-            return self.client.plan.all(options)
+            if 'from' in params:
+                options['from'] = params['from']
+            if 'to' in params:
+                options['to'] = params['to']
+
+            return self._list_page(self.client.plan.all, options, params)
         except Exception as e:
             logger.error(f"Error listing plans: {str(e)}")
             logger.error(traceback.format_exc())
@@ -370,11 +664,9 @@ class RazorpayClient:
     def get_subscription(self, params):
         """Get subscription details by subscription ID."""
         try:
-            subscription_id = params.get('id')
-            if not subscription_id:
-                raise ValueError("Subscription ID is required")
+            subscription_id = validate_id('subscription', params.get('id'))
             
-            return self.client.subscription.fetch(subscription_id)
+            return self._cached_fetch('subscription', subscription_id)
         except Exception as e:
             logger.error(f"Error fetching subscription: {str(e)}")
             logger.error(traceback.format_exc())
@@ -394,7 +686,7 @@ class RazorpayClient:
             if 'customer_id' in params:
                 razorpay_params['customer_id'] = params['customer_id']
             
-            return self.client.subscription.all(razorpay_params)
+            return self._list_page(self.client.subscription.all, razorpay_params, params)
         except Exception as e:
             logger.error(f"Error listing subscriptions: {str(e)}")
             logger.error(traceback.format_exc())
@@ -428,15 +720,16 @@ class RazorpayClient:
     def cancel_subscription(self, params):
         """Cancel an active subscription."""
         try:
-            subscription_id = params.get('id')
-            if not subscription_id:
-                raise ValueError("Subscription ID is required")
+            subscription_id = validate_id('subscription', params.get('id'))
                 
             cancel_params = {
                 'cancel_at_cycle_end': params.get('cancel_at_cycle_end', False)
             }
             
-            return self.client.subscription.cancel(subscription_id, data=cancel_params)
+            subscription = self._checked_write('subscription', subscription_id, self.client.subscription.cancel,
+                                               subscription_id, data=cancel_params)
+            self.entity_cache.invalidate('subscription', subscription_id)
+            return subscription
         except Exception as e:
             logger.error(f"Error cancelling subscription: {str(e)}")
             logger.error(traceback.format_exc())
@@ -445,15 +738,16 @@ class RazorpayClient:
     def pause_subscription(self, params):
         """Pause an active subscription."""
         try:
-            subscription_id = params.get('id')
-            if not subscription_id:
-                raise ValueError("Subscription ID is required")
+            subscription_id = validate_id('subscription', params.get('id'))
                 
             pause_params = {
                 'pause_at': params.get('pause_at', 'now')
             }
             
-            return self.client.subscription.pause(subscription_id, data=pause_params)
+            subscription = self._checked_write('subscription', subscription_id, self.client.subscription.pause,
+                                               subscription_id, data=pause_params)
+            self.entity_cache.invalidate('subscription', subscription_id)
+            return subscription
         except Exception as e:
             logger.error(f"Error pausing subscription: {str(e)}")
             logger.error(traceback.format_exc())
@@ -462,15 +756,16 @@ class RazorpayClient:
     def resume_subscription(self, params):
         """Resume a paused subscription."""
         try:
-            subscription_id = params.get('id')
-            if not subscription_id:
-                raise ValueError("Subscription ID is required")
+            subscription_id = validate_id('subscription', params.get('id'))
                 
             resume_params = {}
             if 'resume_at' in params:
                 resume_params['resume_at'] = params['resume_at']
             
-            return self.client.subscription.resume(subscription_id, data=resume_params)
+            subscription = self._checked_write('subscription', subscription_id, self.client.subscription.resume,
+                                               subscription_id, data=resume_params)
+            self.entity_cache.invalidate('subscription', subscription_id)
+            return subscription
         except Exception as e:
             logger.error(f"Error resuming subscription: {str(e)}")
             logger.error(traceback.format_exc())
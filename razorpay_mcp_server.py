@@ -6,56 +6,159 @@ A clean, efficient Model Context Protocol server that integrates Razorpay's paym
 processing capabilities with Claude AI. Uses the official MCP SDK with proper formatting
 for all identifiers.
 """
+import time
+_BOOT_STARTED = time.perf_counter()
+
 import os
 import sys
 import json
+import asyncio
+import inspect
 import logging
+import argparse
+from datetime import date
 from typing import Any, Dict
 
-from razorpay_client import RazorpayClient
+from razorpay_client import get_default_client
+from razorpay_pool import client_pool, credentials_from_headers, current_client, resolve_client, using_client
+from razorpay_sessions import SessionLimiter
+from result_budget import apply_budget, next_slice, result_buffer
+from prefetch import prefetcher
+import composite_views
+import bulk_refunds
+import bulk_subscriptions
+import revenue_analytics
+import settlement_reports
+import reconciliation
+from scheduler import activity, scheduler
+import bulk_customers
+import bulk_payment_links
 
 # Import FastMCP components
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from mcp.types import Resource, Prompt
 
+_IMPORTS_DONE = time.perf_counter()
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s', stream=sys.stderr)
 logger = logging.getLogger("razorpay-mcp-server")
 
-# Initialize Razorpay client
-razorpay_client = RazorpayClient()
+# Default Razorpay client, shared by every session that brings no credentials
+razorpay_client = get_default_client()
+
+# Per-session limits for the networked transports
+session_limiter = SessionLimiter(
+    max_sessions=int(os.environ.get("MCP_MAX_SESSIONS", "0")) or None,
+    max_concurrent_calls=int(os.environ.get("MCP_SESSION_MAX_CONCURRENT_CALLS", "4")),
+    max_calls_per_minute=int(os.environ.get("MCP_SESSION_MAX_CALLS_PER_MINUTE", "0")) or None
+)
+
+async def budgeted_list(method, params, arguments):
+    """Call a list method and cut its result to the call's size budget.
+
+    A continuation_token from an earlier truncated result is served from the
+    result buffer instead of calling Razorpay again.
+    """
+    client = current_client()
+    max_items = arguments.get("max_items")
+    max_bytes = arguments.get("max_bytes")
+    token = arguments.get("continuation_token")
+    if token:
+        return next_slice(token, client.key_id, max_items, max_bytes)
+    result = await asyncio.to_thread(getattr(client, method), params)
+    return apply_budget(result, client.key_id, max_items, max_bytes)
 
 # Define async handlers for each tool
 async def get_payment(arguments):
     payment_id = arguments.get("payment_id")
     logger.info(f"Executing get_payment with payment_id: {payment_id}")
-    return razorpay_client.get_payment({"id": payment_id})
+    return await asyncio.to_thread(current_client().get_payment, {"id": payment_id})
 
 async def list_payments(arguments):
     logger.info(f"Executing list_payments with arguments: {arguments}")
-    return razorpay_client.list_payments(arguments)
+    return await budgeted_list("list_payments", arguments, arguments)
+
+async def refreshed_index(index, client, arguments, max_age_variable, default_max_age=300):
+    """Sync a local index first if it is stale or the caller asked for it; returns the sync summary, if any"""
+    max_age = float(os.environ.get(max_age_variable, str(default_max_age)))
+    if arguments.get("refresh") or arguments.get("full_sync") or index.is_stale(max_age):
+        return await asyncio.to_thread(index.sync, client, bool(arguments.get("full_sync")))
+    return None
+
+async def search_payments(arguments):
+    logger.info(f"Executing search_payments with arguments: {arguments}")
+    client = current_client()
+    index = client.payment_index
+    sync = await refreshed_index(index, client, arguments, "RAZORPAY_PAYMENT_INDEX_MAX_AGE")
+    started = time.perf_counter()
+    result = await asyncio.to_thread(
+        index.search,
+        text=arguments.get("text"),
+        email=arguments.get("email"),
+        contact=arguments.get("contact"),
+        method=arguments.get("method"),
+        status=arguments.get("status"),
+        currency=arguments.get("currency"),
+        notes=arguments.get("notes"),
+        amount_min=arguments.get("amount_min"),
+        amount_max=arguments.get("amount_max"),
+        created_from=arguments.get("from"),
+        created_to=arguments.get("to"),
+        sort=arguments.get("sort", "created_at"),
+        descending=arguments.get("order", "desc") != "asc",
+        limit=min(int(arguments.get("limit", 20)), 100)
+    )
+    result["took_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    result["index"] = index.stats()
+    if sync:
+        result["sync"] = sync
+    return result
 
 async def create_order(arguments):
     logger.info(f"Executing create_order with arguments: {arguments}")
-    return razorpay_client.create_order(arguments)
+    return await asyncio.to_thread(current_client().create_order, arguments)
 
 async def get_order(arguments):
     order_id = arguments.get("order_id")
     logger.info(f"Executing get_order with order_id: {order_id}")
-    return razorpay_client.get_order({"id": order_id})
+    return await asyncio.to_thread(current_client().get_order, {"id": order_id})
+
+async def list_order_payments(arguments):
+    order_id = arguments.get("order_id")
+    logger.info(f"Executing list_order_payments with order_id: {order_id}")
+    return await asyncio.to_thread(current_client().list_order_payments, {"id": order_id})
 
 async def list_orders(arguments):
     logger.info(f"Executing list_orders with arguments: {arguments}")
-    return razorpay_client.list_orders(arguments)
+    return await budgeted_list("list_orders", arguments, arguments)
 
 async def create_customer(arguments):
     logger.info(f"Executing create_customer with arguments: {arguments}")
-    return razorpay_client.create_customer(arguments)
+    return await asyncio.to_thread(current_client().create_customer, arguments)
 
 async def get_customer(arguments):
     customer_id = arguments.get("customer_id")
     logger.info(f"Executing get_customer with customer_id: {customer_id}")
-    return razorpay_client.get_customer({"id": customer_id})
+    return await asyncio.to_thread(current_client().get_customer, {"id": customer_id})
+
+async def search_customers(arguments):
+    logger.info(f"Executing search_customers with arguments: {arguments}")
+    client = current_client()
+    index = client.customer_index
+    sync = await refreshed_index(index, client, arguments, "RAZORPAY_CUSTOMER_INDEX_MAX_AGE")
+    started = time.perf_counter()
+    items = index.search(
+        email=arguments.get("email"),
+        contact=arguments.get("contact"),
+        name=arguments.get("name"),
+        limit=int(arguments.get("limit", 10))
+    )
+    result = {"count": len(items), "items": items,
+              "took_ms": round((time.perf_counter() - started) * 1000, 3), "index": index.stats()}
+    if sync:
+        result["sync"] = sync
+    return result
 
 async def create_payment_link(arguments):
     logger.info(f"Executing create_payment_link with arguments: {arguments}")
@@ -78,59 +181,186 @@ async def create_payment_link(arguments):
         if "email" in notify:
             link_params["notify_email"] = notify["email"]
             
-    return razorpay_client.create_payment_link(link_params)
+    return await asyncio.to_thread(current_client().create_payment_link, link_params)
 
 async def get_payment_link(arguments):
     payment_link_id = arguments.get("payment_link_id")
     logger.info(f"Executing get_payment_link with payment_link_id: {payment_link_id}")
-    return razorpay_client.get_payment_link({"id": payment_link_id})
+    return await asyncio.to_thread(current_client().get_payment_link, {"id": payment_link_id})
 
 async def create_refund(arguments):
     logger.info(f"Executing create_refund with arguments: {arguments}")
-    return razorpay_client.create_refund(arguments)
+    return await asyncio.to_thread(current_client().create_refund, arguments)
 
 async def get_refund(arguments):
     refund_id = arguments.get("refund_id")
     logger.info(f"Executing get_refund with refund_id: {refund_id}")
-    return razorpay_client.get_refund({"id": refund_id})
+    return await asyncio.to_thread(current_client().get_refund, {"id": refund_id})
+
+def progress_reporter(ctx):
+    """Progress callback, safe to call from worker threads, that sends MCP progress notifications"""
+    loop = asyncio.get_running_loop()
+
+    def report(done, total):
+        asyncio.run_coroutine_threadsafe(ctx.report_progress(done, total), loop)
+    return report
+
+# Files named by bulk and report tools (file, output, checkpoint) are opened on
+# the server, so they must resolve inside RAZORPAY_BULK_DIR; without it those
+# arguments are refused. Load knobs are capped at the server's maximums.
+BULK_DIR = os.environ.get("RAZORPAY_BULK_DIR")
+BULK_MAX_CONCURRENCY = int(os.environ.get("RAZORPAY_BULK_MAX_CONCURRENCY", "16"))
+BULK_MAX_RATE = float(os.environ.get("RAZORPAY_BULK_MAX_RATE", "25"))
+
+def bulk_path(arguments, name):
+    """The server-side path for file argument ``name``, confined to RAZORPAY_BULK_DIR; None when not given."""
+    value = arguments.get(name)
+    if not value:
+        return None
+    if not BULK_DIR:
+        raise ValueError(f"{name} names a file on the server, which is disabled; "
+                         f"set RAZORPAY_BULK_DIR to allow files in that directory")
+    root = os.path.realpath(BULK_DIR)
+    path = os.path.realpath(os.path.join(root, str(value)))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"{name} must be a path inside RAZORPAY_BULK_DIR")
+    return path
+
+def bulk_items(arguments, name):
+    """An inline list of bulk items; a string would be read as a file path, so it goes through ``file`` instead."""
+    value = arguments.get(name) or []
+    if not isinstance(value, list):
+        raise ValueError(f"{name} must be a list; pass a file inside RAZORPAY_BULK_DIR as file")
+    return value
+
+def bulk_limits(arguments):
+    """max_workers and rate_per_second from the call, capped at the server maximums."""
+    return {
+        "max_workers": max(1, min(int(arguments.get("max_concurrency", 4)), BULK_MAX_CONCURRENCY)),
+        "rate_per_second": min(float(arguments.get("rate_per_second", 5)), BULK_MAX_RATE),
+    }
+
+async def create_refunds_bulk(arguments, ctx):
+    source = bulk_path(arguments, "file") or bulk_items(arguments, "refunds")
+    logger.info(f"Executing create_refunds_bulk with checkpoint: {arguments.get('checkpoint')}")
+    return await asyncio.to_thread(
+        bulk_refunds.create_refunds_bulk, current_client(), source,
+        checkpoint_path=bulk_path(arguments, "checkpoint"),
+        batch_id=arguments.get("batch_id"),
+        **bulk_limits(arguments),
+        progress=progress_reporter(ctx),
+        retry_failed=bool(arguments.get("retry_failed", True))
+    )
+
+async def import_customers_bulk(arguments, ctx):
+    source = bulk_path(arguments, "file") or bulk_items(arguments, "customers")
+    mode = arguments.get("mode", bulk_customers.SKIP)
+    logger.info(f"Executing import_customers_bulk in {mode} mode")
+    return await asyncio.to_thread(
+        bulk_customers.import_customers_bulk, current_client(), source,
+        mode=mode,
+        output_path=bulk_path(arguments, "output"),
+        **bulk_limits(arguments),
+        progress=progress_reporter(ctx)
+    )
+
+async def create_payment_links_bulk(arguments, ctx):
+    input_path = bulk_path(arguments, "file")
+    output_path = bulk_path(arguments, "output")
+    if not input_path or not output_path:
+        raise ValueError("file and output are required")
+    logger.info(f"Executing create_payment_links_bulk from {input_path} to {output_path}")
+    return await asyncio.to_thread(
+        bulk_payment_links.create_payment_links_bulk, current_client(), input_path, output_path,
+        checkpoint_path=bulk_path(arguments, "checkpoint"),
+        mapping=arguments.get("mapping"),
+        defaults=arguments.get("defaults"),
+        batch_id=arguments.get("batch_id"),
+        **bulk_limits(arguments),
+        progress=progress_reporter(ctx),
+        retry_failed=bool(arguments.get("retry_failed", True))
+    )
+
+# Composite handlers
+async def get_order_full(arguments):
+    order_id = arguments.get("order_id")
+    logger.info(f"Executing get_order_full with order_id: {order_id}")
+    return await asyncio.to_thread(composite_views.order_full, current_client(), order_id, arguments.get("fields"))
+
+async def get_payment_full(arguments):
+    payment_id = arguments.get("payment_id")
+    logger.info(f"Executing get_payment_full with payment_id: {payment_id}")
+    return await asyncio.to_thread(composite_views.payment_full, current_client(), payment_id, arguments.get("fields"))
+
+async def get_subscription_full(arguments):
+    subscription_id = arguments.get("subscription_id")
+    logger.info(f"Executing get_subscription_full with subscription_id: {subscription_id}")
+    return await asyncio.to_thread(composite_views.subscription_full, current_client(), subscription_id,
+                                   arguments.get("fields"))
 
 # Settlement handlers
 async def get_settlement(arguments):
     settlement_id = arguments.get("settlement_id")
     logger.info(f"Executing get_settlement with settlement_id: {settlement_id}")
-    return razorpay_client.get_settlement({"id": settlement_id})
+    return await asyncio.to_thread(current_client().get_settlement, {"id": settlement_id})
 
 async def list_settlements(arguments):
     logger.info(f"Executing list_settlements with arguments: {arguments}")
-    return razorpay_client.list_settlements(arguments)
+    return await budgeted_list("list_settlements", arguments, arguments)
 
 async def create_ondemand_settlement(arguments):
     logger.info(f"Executing create_ondemand_settlement with arguments: {arguments}")
-    return razorpay_client.create_ondemand_settlement(arguments)
+    return await asyncio.to_thread(current_client().create_ondemand_settlement, arguments)
 
 async def get_settlement_report(arguments):
     logger.info(f"Executing get_settlement_report with arguments: {arguments}")
-    return razorpay_client.get_settlement_report(arguments)
+    return await budgeted_list("get_settlement_report", arguments, arguments)
+
+async def settlement_report_range(arguments, ctx):
+    logger.info(f"Executing settlement_report_range with arguments: {arguments}")
+    return await asyncio.to_thread(
+        settlement_reports.settlement_report_range, current_client(),
+        date.fromisoformat(arguments["from"]),
+        date.fromisoformat(arguments["to"]),
+        granularity=arguments.get("granularity", "auto"),
+        output_path=bulk_path(arguments, "output"),
+        max_items=int(arguments.get("max_items", 100)),
+        **bulk_limits(arguments),
+        progress=progress_reporter(ctx)
+    )
+
+async def reconcile_settlements(arguments, ctx):
+    logger.info(f"Executing reconcile_settlements with arguments: {arguments}")
+    return await asyncio.to_thread(
+        reconciliation.reconcile_settlements, current_client(),
+        date.fromisoformat(arguments["from"]),
+        date.fromisoformat(arguments["to"]),
+        settlement_lag_days=int(arguments.get("settlement_lag_days", 7)),
+        output_path=bulk_path(arguments, "output"),
+        max_items=int(arguments.get("max_items", 100)),
+        **bulk_limits(arguments),
+        progress=progress_reporter(ctx)
+    )
 
 # Subscription handlers
 async def get_subscription(arguments):
     subscription_id = arguments.get("subscription_id")
     logger.info(f"Executing get_subscription with subscription_id: {subscription_id}")
-    return razorpay_client.get_subscription({"id": subscription_id})
+    return await asyncio.to_thread(current_client().get_subscription, {"id": subscription_id})
 
 async def list_subscriptions(arguments):
     logger.info(f"Executing list_subscriptions with arguments: {arguments}")
-    return razorpay_client.list_subscriptions(arguments)
+    return await budgeted_list("list_subscriptions", arguments, arguments)
 
 async def create_subscription(arguments):
     logger.info(f"Executing create_subscription with arguments: {arguments}")
-    return razorpay_client.create_subscription(arguments)
+    return await asyncio.to_thread(current_client().create_subscription, arguments)
 
 async def cancel_subscription(arguments):
     subscription_id = arguments.get("subscription_id")
     cancel_at_cycle_end = arguments.get("cancel_at_cycle_end", False)
     logger.info(f"Executing cancel_subscription with subscription_id: {subscription_id}")
-    return razorpay_client.cancel_subscription({
+    return await asyncio.to_thread(current_client().cancel_subscription, {
         "id": subscription_id,
         "cancel_at_cycle_end": cancel_at_cycle_end
     })
@@ -139,7 +369,7 @@ async def pause_subscription(arguments):
     subscription_id = arguments.get("subscription_id")
     pause_at = arguments.get("pause_at", "now")
     logger.info(f"Executing pause_subscription with subscription_id: {subscription_id}")
-    return razorpay_client.pause_subscription({
+    return await asyncio.to_thread(current_client().pause_subscription, {
         "id": subscription_id,
         "pause_at": pause_at
     })
@@ -153,13 +383,54 @@ async def resume_subscription(arguments):
     if resume_at:
         params["resume_at"] = resume_at
         
-    return razorpay_client.resume_subscription(params)
+    return await asyncio.to_thread(current_client().resume_subscription, params)
+
+async def subscriptions_bulk_action(action, arguments, ctx, options):
+    logger.info(f"Executing bulk {action} for subscriptions matching {arguments}")
+    return await asyncio.to_thread(
+        bulk_subscriptions.apply_subscription_action, current_client(), action,
+        plan_id=arguments.get("plan_id"),
+        customer_id=arguments.get("customer_id"),
+        status=arguments.get("status"),
+        dry_run=bool(arguments.get("dry_run", False)),
+        options=options,
+        output_path=bulk_path(arguments, "output"),
+        **bulk_limits(arguments),
+        progress=progress_reporter(ctx)
+    )
+
+async def cancel_subscriptions_bulk(arguments, ctx):
+    return await subscriptions_bulk_action("cancel", arguments, ctx, {
+        "cancel_at_cycle_end": arguments.get("cancel_at_cycle_end", False)
+    })
+
+async def pause_subscriptions_bulk(arguments, ctx):
+    return await subscriptions_bulk_action("pause", arguments, ctx, {"pause_at": arguments.get("pause_at", "now")})
+
+async def resume_subscriptions_bulk(arguments, ctx):
+    options = {"resume_at": arguments["resume_at"]} if arguments.get("resume_at") else {}
+    return await subscriptions_bulk_action("resume", arguments, ctx, options)
+
+async def revenue_report(arguments, ctx):
+    logger.info(f"Executing revenue_report with arguments: {arguments}")
+    client = current_client()
+    # Plans never change once created, so the catalogue only needs new ones added
+    await refreshed_index(client.plan_catalog, client, arguments, "RAZORPAY_PLAN_CATALOG_MAX_AGE", 3600)
+    return await asyncio.to_thread(
+        revenue_analytics.revenue_report, client,
+        horizon_days=int(arguments.get("horizon_days", 30)),
+        months=int(arguments.get("months", 12)),
+        plan_id=arguments.get("plan_id"),
+        top_plans=int(arguments.get("top_plans", 50)),
+        plans=client.plan_catalog,
+        progress=progress_reporter(ctx)
+    )
 
 # Plan handlers
 async def get_plan(arguments):
     plan_id = arguments.get("plan_id")
     logger.info(f"Executing get_plan with plan_id: {plan_id}")
-    return razorpay_client.get_plan({"id": plan_id})
+    return await asyncio.to_thread(current_client().get_plan, {"id": plan_id})
 
 async def list_plans(arguments):
     params = {}
@@ -167,9 +438,11 @@ async def list_plans(arguments):
         params["count"] = arguments["count"]
     if "skip" in arguments:
         params["skip"] = arguments["skip"]
+    if "cursor" in arguments:
+        params["cursor"] = arguments["cursor"]
         
     logger.info(f"Executing list_plans with arguments: {params}")
-    return razorpay_client.list_plans(params)
+    return await budgeted_list("list_plans", params, arguments)
 
 async def create_plan(arguments):
     params = {
@@ -182,7 +455,188 @@ async def create_plan(arguments):
         params["notes"] = arguments["notes"]
         
     logger.info(f"Executing create_plan with arguments: {params}")
-    return razorpay_client.create_plan(params)
+    return await asyncio.to_thread(current_client().create_plan, params)
+
+async def set_session_credentials(arguments, ctx):
+    key_id = arguments.get("key_id")
+    key_secret = arguments.get("key_secret")
+    if not key_id or not key_secret:
+        raise ValueError("key_id and key_secret are required")
+    logger.info(f"Session switching to merchant key {key_id}")
+    session_limiter.set_credentials(ctx.session, (key_id, key_secret))
+    return {"status": "ok", "key_id": key_id}
+
+def session_client(state, ctx):
+    """Resolve the client for a session's merchant.
+
+    Credentials set with razorpay_session_set_credentials win; on HTTP
+    transports the headers of the session's request are used next.
+    """
+    if state.credentials is None:
+        request = getattr(ctx.request_context, "request", None)
+        if request is not None:
+            state.credentials = credentials_from_headers(request.headers)
+    return resolve_client(state.credentials)
+
+def session_scoped(fn):
+    """Run a tool handler inside one of the calling session's call slots"""
+    wants_context = "ctx" in inspect.signature(fn).parameters
+
+    async def handler(arguments, ctx: Context):
+        async with session_limiter.acquire(ctx.session) as state:
+            with using_client(session_client(state, ctx)), activity.track():
+                if wants_context:
+                    return await fn(arguments, ctx)
+                return await fn(arguments)
+
+    handler.__name__ = fn.__name__
+    handler.__doc__ = fn.__doc__
+    return handler
+
+BUDGET_HINT = (". Results are cut to max_items / max_bytes; pass the returned continuation_token "
+               "back to read the next slice")
+
+FIELDS_HINT = (". Pass fields (dotted paths such as \"payments.id\") to return only those fields")
+
+FILES_HINT = (". file, output and checkpoint are paths inside the server's RAZORPAY_BULK_DIR and are refused "
+              "when it is not set")
+
+BULK_FILTER_HINT = (". Subscriptions already in the target state (for a cancel at cycle end: with scheduled "
+                    "changes) are skipped, so reruns are safe; dry_run lists "
+                    "what would change without changing it. max_concurrency and rate_per_second bound the load, "
+                    "output (a file path) receives every per-subscription result" + FILES_HINT)
+
+# Tool table: (handler, MCP tool name, description)
+TOOL_SPECS = [
+    (get_payment, "razorpay_payments_get", "Get payment details by payment ID"),
+    (list_payments, "razorpay_payments_list", "List payments with optional filtering" + BUDGET_HINT),
+    (search_payments, "razorpay_payments_search",
+     "Search payments in a local index synced from Razorpay. Filters combine: text (words in notes, email, "
+     "contact or description), email, contact, method, status, currency, notes ({key: value}), amount_min/"
+     "amount_max (paise) and from/to (unix time). sort is created_at or amount, order desc or asc, limit <= 100; "
+     "refresh forces an incremental sync"),
+    (create_order, "razorpay_orders_create", "Create a new order"),
+    (get_order, "razorpay_orders_get", "Get order details by order ID"),
+    (list_order_payments, "razorpay_orders_payments_list", "List the payments made against an order"),
+    (list_orders, "razorpay_orders_list", "List orders with optional filtering" + BUDGET_HINT),
+    (create_customer, "razorpay_customers_create", "Create a new customer"),
+    (get_customer, "razorpay_customers_get", "Get customer details by customer ID"),
+    (search_customers, "razorpay_customers_search",
+     "Find customers by email, contact and/or name (prefix or fuzzy) from a local index synced from Razorpay; "
+     "refresh forces an incremental sync, full_sync re-reads every customer"),
+    (import_customers_bulk, "razorpay_customers_import_bulk",
+     "Import customers from a list (customers) or a local CSV/NDJSON file, creating only those whose email "
+     "and contact are not already on the account; mode is skip (default) or merge to update existing customers. "
+     "Results per row go to the optional output NDJSON file" + FILES_HINT),
+    (create_payment_link, "razorpay_payment_links_create", "Create a new payment link"),
+    (get_payment_link, "razorpay_payment_links_get", "Get payment link details by payment link ID"),
+    (create_payment_links_bulk, "razorpay_payment_links_create_bulk",
+     "Create a payment link per row of a local CSV/NDJSON file, appending results to the output NDJSON file. "
+     "mapping maps link parameters to column names, defaults fills missing values; "
+     "pass checkpoint (a file path) to make the run resumable; a resumed run retries failed rows unless "
+     "retry_failed is false" + FILES_HINT),
+    (create_refund, "razorpay_refunds_create", "Create a new refund"),
+    (get_refund, "razorpay_refunds_get", "Get refund details by refund ID"),
+    (create_refunds_bulk, "razorpay_refunds_create_bulk",
+     "Refund many payments: refunds is a list of {payment_id, amount, notes} (or file is a CSV/NDJSON path). "
+     "Pass checkpoint (a file path) to make the run resumable without double refunds (failed refunds are "
+     "retried on resume unless retry_failed is false); "
+     "max_concurrency and rate_per_second bound the load on Razorpay" + FILES_HINT),
+    # Composite tools
+    (get_order_full, "razorpay_orders_get_full",
+     "Get an order with its payments and each payment's refunds in one call" + FIELDS_HINT),
+    (get_payment_full, "razorpay_payments_get_full",
+     "Get a payment with its refunds and order in one call" + FIELDS_HINT),
+    (get_subscription_full, "razorpay_subscriptions_get_full",
+     "Get a subscription with its plan and customer in one call" + FIELDS_HINT),
+    # Settlement tools
+    (get_settlement, "razorpay_settlements_get", "Get settlement details by settlement ID"),
+    (list_settlements, "razorpay_settlements_list", "List settlements with optional filtering" + BUDGET_HINT),
+    (create_ondemand_settlement, "razorpay_settlements_create_ondemand", "Create an on-demand settlement"),
+    (get_settlement_report, "razorpay_settlements_report", "Get settlement reports with filtering by year, month, and day" + BUDGET_HINT),
+    (settlement_report_range, "razorpay_settlements_report_range",
+     "Settlement reconciliation report for a date range: from and to (YYYY-MM-DD, inclusive). Whole months are "
+     "fetched as monthly reports and the rest day by day (granularity auto, or force day or month), up to "
+     "max_concurrency (default 4) at once. Returns credit/debit/fee/tax/net totals per period and overall, "
+     "the first max_items rows (default 100) and, with output, every row as NDJSON" + FILES_HINT),
+    (reconcile_settlements, "razorpay_settlements_reconcile",
+     "Reconcile settlements against the payments and refunds created from..to (YYYY-MM-DD, inclusive). Lists "
+     "captured payments and processed refunds not yet settled, settled items Razorpay does not list, and amount "
+     "mismatches (first max_items of each, default 100; all of them to output as NDJSON). The settlement report "
+     "is read settlement_lag_days (default 7) past the end of the range" + FILES_HINT),
+    # Subscription tools
+    (get_subscription, "razorpay_subscriptions_get", "Get subscription details by subscription ID"),
+    (list_subscriptions, "razorpay_subscriptions_list", "List subscriptions with optional filtering" + BUDGET_HINT),
+    (create_subscription, "razorpay_subscriptions_create", "Create a new subscription for a customer"),
+    (cancel_subscription, "razorpay_subscriptions_cancel", "Cancel an active subscription"),
+    (pause_subscription, "razorpay_subscriptions_pause", "Pause an active subscription"),
+    (resume_subscription, "razorpay_subscriptions_resume", "Resume a paused subscription"),
+    (revenue_report, "razorpay_revenue_report",
+     "Recurring-revenue report computed from every plan and subscription: MRR/ARR by currency and plan "
+     "(active subscriptions; pending/halted as MRR at risk), upcoming charges per day for horizon_days "
+     "(default 30) and started/paused/cancelled subscriptions with paused and churned MRR for the last months "
+     "(default 12). "
+     "Optional plan_id limits it to one plan; amounts are in paise"),
+    (cancel_subscriptions_bulk, "razorpay_subscriptions_cancel_bulk",
+     "Cancel every subscription matching a filter (plan_id, customer_id, status - at least one)" + BULK_FILTER_HINT),
+    (pause_subscriptions_bulk, "razorpay_subscriptions_pause_bulk",
+     "Pause every active subscription matching a filter (plan_id, customer_id, status)" + BULK_FILTER_HINT),
+    (resume_subscriptions_bulk, "razorpay_subscriptions_resume_bulk",
+     "Resume every paused subscription matching a filter (plan_id, customer_id, status)" + BULK_FILTER_HINT),
+    # Plan tools
+    (get_plan, "razorpay_plans_get", "Get plan details by plan ID"),
+    (list_plans, "razorpay_plans_list", "List plans with optional filtering" + BUDGET_HINT),
+    (create_plan, "razorpay_plans_create", "Create a new plan for subscriptions"),
+    # Session tools
+    (set_session_credentials, "razorpay_session_set_credentials",
+     "Use the given Razorpay key_id and key_secret for the rest of this session"),
+]
+
+# FastMCP releases whose tool registry (_tool_manager._tools: name -> Tool
+# model) the precomputed registration below has been checked against
+PRECOMPUTED_TOOLS_MCP_MAJOR = 1
+
+
+def _tool_table(server):
+    """FastMCP's private name -> Tool registry, or None when it cannot be used safely."""
+    try:
+        from importlib.metadata import version
+        mcp_version = version("mcp")
+    except Exception:
+        mcp_version = "unknown"
+    if mcp_version.split(".")[0] != str(PRECOMPUTED_TOOLS_MCP_MAJOR):
+        logger.warning(f"mcp {mcp_version} is not a tested release; registering tools one by one")
+        return None
+    tools = getattr(getattr(server, "_tool_manager", None), "_tools", None)
+    if not isinstance(tools, dict):
+        logger.warning(f"mcp {mcp_version} has no FastMCP tool registry; registering tools one by one")
+        return None
+    return tools
+
+
+def register_tools(server, precomputed=True):
+    """Register every entry of TOOL_SPECS on the server.
+
+    session_scoped gives every handler the same (arguments, ctx) signature, so
+    with precomputed=True FastMCP introspects it once and the remaining tools
+    reuse that metadata instead of rebuilding a pydantic model per tool. That
+    relies on FastMCP internals, so it is only done on tested mcp releases and
+    falls back (with a warning) to registering each tool through add_tool().
+    """
+    tools = _tool_table(server) if precomputed else None
+    template = None
+    for fn, name, description in TOOL_SPECS:
+        handler = session_scoped(fn)
+        if template is not None:
+            tools[name] = template.model_copy(update={"fn": handler, "name": name, "description": description})
+            continue
+        server.add_tool(fn=handler, name=name, description=description)
+        if tools is not None:
+            template = tools.get(name)
+            fields = getattr(type(template), "model_fields", {})
+            if not hasattr(template, "model_copy") or not {"fn", "name", "description"} <= set(fields):
+                logger.warning("FastMCP tool registry has an unexpected shape; registering tools one by one")
+                tools = template = None
 
 def decorate_tool(fn, name, description):
     """Add metadata to tool function for documentation purposes"""
@@ -190,164 +644,19 @@ def decorate_tool(fn, name, description):
     fn.__doc__ = description
     return fn
 
-def create_mcp_server():
+def create_mcp_server(fast_start=True):
     """Create and configure the FastMCP server with Razorpay tools."""
     # Create the FastMCP server
     server = FastMCP(
         name="razorpay-mcp-server-python",
         version="1.0.0",
-        description="Razorpay integration for the Model Context Protocol"
-    )
-    
-    # Add tools using the correct add_tool method
-    # The signature is: add_tool(fn, name=None, description=None)
-    
-    server.add_tool(
-        fn=get_payment,
-        name="razorpay_payments_get",
-        description="Get payment details by payment ID"
-    )
-    
-    server.add_tool(
-        fn=list_payments,
-        name="razorpay_payments_list",
-        description="List payments with optional filtering"
-    )
-    
-    server.add_tool(
-        fn=create_order,
-        name="razorpay_orders_create",
-        description="Create a new order"
-    )
-    
-    server.add_tool(
-        fn=get_order,
-        name="razorpay_orders_get",
-        description="Get order details by order ID"
+        description="Razorpay integration for the Model Context Protocol",
+        # Runs the RAZORPAY_SCHEDULED_JOBS refresh jobs while the server is up
+        lifespan=scheduler.lifespan
     )
     
-    server.add_tool(
-        fn=list_orders,
-        name="razorpay_orders_list",
-        description="List orders with optional filtering"
-    )
-    
-    server.add_tool(
-        fn=create_customer,
-        name="razorpay_customers_create",
-        description="Create a new customer"
-    )
-    
-    server.add_tool(
-        fn=get_customer,
-        name="razorpay_customers_get",
-        description="Get customer details by customer ID"
-    )
-    
-    server.add_tool(
-        fn=create_payment_link,
-        name="razorpay_payment_links_create",
-        description="Create a new payment link"
-    )
-    
-    server.add_tool(
-        fn=get_payment_link,
-        name="razorpay_payment_links_get",
-        description="Get payment link details by payment link ID"
-    )
-    
-    server.add_tool(
-        fn=create_refund,
-        name="razorpay_refunds_create",
-        description="Create a new refund"
-    )
-    
-    server.add_tool(
-        fn=get_refund,
-        name="razorpay_refunds_get",
-        description="Get refund details by refund ID"
-    )
-    
-    # Settlement tools
-    server.add_tool(
-        fn=get_settlement,
-        name="razorpay_settlements_get",
-        description="Get settlement details by settlement ID"
-    )
-    
-    server.add_tool(
-        fn=list_settlements,
-        name="razorpay_settlements_list",
-        description="List settlements with optional filtering"
-    )
-    
-    server.add_tool(
-        fn=create_ondemand_settlement,
-        name="razorpay_settlements_create_ondemand",
-        description="Create an on-demand settlement"
-    )
-    
-    server.add_tool(
-        fn=get_settlement_report,
-        name="razorpay_settlements_report",
-        description="Get settlement reports with filtering by year, month, and day"
-    )
-    
-    # Subscription tools
-    server.add_tool(
-        fn=get_subscription,
-        name="razorpay_subscriptions_get",
-        description="Get subscription details by subscription ID"
-    )
-    
-    server.add_tool(
-        fn=list_subscriptions,
-        name="razorpay_subscriptions_list",
-        description="List subscriptions with optional filtering"
-    )
-    
-    server.add_tool(
-        fn=create_subscription,
-        name="razorpay_subscriptions_create",
-        description="Create a new subscription for a customer"
-    )
-    
-    server.add_tool(
-        fn=cancel_subscription,
-        name="razorpay_subscriptions_cancel",
-        description="Cancel an active subscription"
-    )
-    
-    server.add_tool(
-        fn=pause_subscription,
-        name="razorpay_subscriptions_pause",
-        description="Pause an active subscription"
-    )
-    
-    server.add_tool(
-        fn=resume_subscription,
-        name="razorpay_subscriptions_resume",
-        description="Resume a paused subscription"
-    )
-    
-    # Plan tools
-    server.add_tool(
-        fn=get_plan,
-        name="razorpay_plans_get",
-        description="Get plan details by plan ID"
-    )
-    
-    server.add_tool(
-        fn=list_plans,
-        name="razorpay_plans_list",
-        description="List plans with optional filtering"
-    )
-    
-    server.add_tool(
-        fn=create_plan,
-        name="razorpay_plans_create",
-        description="Create a new plan for subscriptions"
-    )
+    # Add tools
+    register_tools(server, precomputed=fast_start)
     
     # Add resources - need uri field
     server.add_resource(
@@ -559,14 +868,82 @@ def create_mcp_server():
         )
     )
     
+    # Session metrics, readable over MCP and, on HTTP transports, at /metrics
+    @server.resource("mcp-resources://razorpay/server-stats")
+    def server_stats() -> str:
+        """Session count and per-session limit metrics for this server process"""
+        return json.dumps({"sessions": session_limiter.stats(), "client_pool": client_pool.stats(),
+                           "result_buffer": result_buffer.stats(), "prefetch": prefetcher.stats(),
+                           "scheduler": scheduler.stats()})
+
+    if hasattr(server, "custom_route"):
+        @server.custom_route("/metrics", methods=["GET"])
+        async def metrics(request):
+            from starlette.responses import JSONResponse
+            return JSONResponse({"sessions": session_limiter.stats(), "client_pool": client_pool.stats(),
+                                 "result_buffer": result_buffer.stats(), "prefetch": prefetcher.stats(),
+                                 "scheduler": scheduler.stats()})
+    
     # Return the configured server
     return server
 
-def main():
+def parse_args(argv=None):
+    """Parse the command line options for the MCP server."""
+    parser = argparse.ArgumentParser(description="Razorpay MCP server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "sse", "streamable-http"],
+        default=os.environ.get("MCP_TRANSPORT", "stdio"),
+        help="MCP transport; sse and streamable-http serve many sessions from one process"
+    )
+    parser.add_argument("--host", default=os.environ.get("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MCP_PORT", "8000")))
+    parser.add_argument("--max-sessions", type=int, default=session_limiter.max_sessions,
+                        help="Reject tool calls from new sessions beyond this many")
+    parser.add_argument("--max-session-calls", type=int, default=session_limiter.max_concurrent_calls,
+                        help="Concurrent tool calls allowed per session")
+    parser.add_argument("--fast-start", action=argparse.BooleanOptionalAction,
+                        default=os.environ.get("MCP_FAST_START", "1") == "1",
+                        help="Defer the Razorpay SDK to the first tool call and reuse precomputed tool metadata")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print a startup timing report to stderr and exit without serving")
+    return parser.parse_args(argv)
+
+def startup_report(phases):
+    """Format startup phase timings (in seconds) as a small table."""
+    lines = ["Startup profile:"]
+    for name, seconds in phases:
+        lines.append(f"  {name:<28}{seconds * 1000:>9.1f} ms")
+    lines.append(f"  {'total':<28}{sum(seconds for _, seconds in phases) * 1000:>9.1f} ms")
+    lines.append("Run `python -X importtime razorpay_mcp_server.py --profile-startup` for a per-module import breakdown.")
+    return "\n".join(lines)
+
+def main(argv=None):
     """Start the MCP server with Razorpay integration."""
-    server = create_mcp_server()
-    logger.info("Starting Razorpay MCP Server using FastMCP...")
-    server.run(transport="stdio")
+    args = parse_args(argv)
+    session_limiter.max_sessions = args.max_sessions
+    session_limiter.max_concurrent_calls = args.max_session_calls
+
+    started = time.perf_counter()
+    server = create_mcp_server(fast_start=args.fast_start)
+    phases = [("imports", _IMPORTS_DONE - _BOOT_STARTED), ("create_mcp_server", time.perf_counter() - started)]
+
+    if not args.fast_start:
+        started = time.perf_counter()
+        razorpay_client.warm()
+        phases.append(("razorpay sdk + client", time.perf_counter() - started))
+
+    if args.profile_startup:
+        print(startup_report(phases), file=sys.stderr)
+        return
+
+    if args.transport != "stdio":
+        server.settings.host = args.host
+        server.settings.port = args.port
+        logger.info(f"Starting Razorpay MCP Server ({args.transport}) on {args.host}:{args.port}...")
+    else:
+        logger.info("Starting Razorpay MCP Server using FastMCP...")
+    server.run(transport=args.transport)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
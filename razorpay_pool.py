@@ -0,0 +1,149 @@
+"""
+Multi-merchant client pool.
+
+One server process can act for many Razorpay merchants. Callers pass their
+own API credentials per request (HTTP) or per session (MCP) and ClientPool
+resolves them to a RazorpayClient. Each merchant gets its own client, and so
+its own SDK connection pool and any per-client caches or rate limiters. The
+pool is a bounded LRU, and clients that have been idle too long are dropped.
+"""
+import os
+import time
+import base64
+import hashlib
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from razorpay_client import RazorpayClient, get_default_client
+
+logger = logging.getLogger(__name__)
+
+KEY_ID_HEADER = "X-Razorpay-Key-Id"
+KEY_SECRET_HEADER = "X-Razorpay-Key-Secret"
+
+
+class ClientPool:
+    """Bounded LRU of RazorpayClient instances keyed by merchant credentials."""
+
+    def __init__(self, max_clients: int = 256, idle_timeout: float = 900.0):
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _pool_key(key_id: str, key_secret: str) -> str:
+        # Keyed on the secret too, so a wrong secret never reuses another caller's client
+        digest = hashlib.sha256(key_secret.encode("utf-8")).hexdigest()[:16]
+        return f"{key_id}:{digest}"
+
+    def get(self, key_id: str, key_secret: str) -> RazorpayClient:
+        """Return the pooled client for these credentials, creating it if needed."""
+        if not key_id or not key_secret:
+            raise ValueError("Both key_id and key_secret are required")
+
+        key = self._pool_key(key_id, key_secret)
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._clients.move_to_end(key)
+                entry[1] = now
+                self.hits += 1
+                return entry[0]
+
+            self.misses += 1
+            client = RazorpayClient(key_id=key_id, key_secret=key_secret)
+            self._clients[key] = [client, now]
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+            return client
+
+    def _sweep(self, now):
+        # Idle eviction runs at most once per tenth of the idle timeout
+        if now - self._last_sweep < self.idle_timeout / 10:
+            return
+        self._last_sweep = now
+        idle = [key for key, (_, last_used) in self._clients.items() if now - last_used > self.idle_timeout]
+        for key in idle:
+            del self._clients[key]
+        if idle:
+            self.evictions += len(idle)
+            logger.info(f"Evicted {len(idle)} idle merchant clients")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._clients)
+        return {
+            "merchants": size,
+            "max_clients": self.max_clients,
+            "idle_timeout_seconds": self.idle_timeout,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+client_pool = ClientPool(
+    max_clients=int(os.environ.get("RAZORPAY_POOL_MAX_CLIENTS", "256")),
+    idle_timeout=float(os.environ.get("RAZORPAY_POOL_IDLE_SECONDS", "900"))
+)
+
+
+def credentials_from_headers(headers) -> Optional[Tuple[str, str]]:
+    """Read merchant credentials from request headers, if present.
+
+    Accepts the X-Razorpay-Key-Id / X-Razorpay-Key-Secret pair or HTTP Basic
+    auth with the key id as user name and the key secret as password, the same
+    scheme Razorpay's own API uses.
+    """
+    key_id = headers.get(KEY_ID_HEADER)
+    key_secret = headers.get(KEY_SECRET_HEADER)
+    if key_id and key_secret:
+        return key_id, key_secret
+
+    authorization = headers.get("Authorization") or ""
+    if authorization.lower().startswith("basic "):
+        try:
+            decoded = base64.b64decode(authorization[6:].strip()).decode("utf-8")
+        except ValueError:
+            return None
+        key_id, _, key_secret = decoded.partition(":")
+        if key_id and key_secret:
+            return key_id, key_secret
+    return None
+
+
+def resolve_client(credentials: Optional[Tuple[str, str]] = None) -> RazorpayClient:
+    """Return the merchant's pooled client, or the default client without credentials."""
+    if credentials:
+        return client_pool.get(*credentials)
+    return get_default_client()
+
+
+_current_client = contextvars.ContextVar("razorpay_current_client", default=None)
+
+
+def current_client() -> RazorpayClient:
+    """The client for the merchant being served in this context."""
+    return _current_client.get() or get_default_client()
+
+
+@contextmanager
+def using_client(client: RazorpayClient):
+    """Make ``client`` the current client for the duration of the block."""
+    token = _current_client.set(client)
+    try:
+        yield client
+    finally:
+        _current_client.reset(token)
@@ -0,0 +1,106 @@
+"""
+Per-session resource limits for the networked MCP transports.
+
+With the SSE or streamable HTTP transport one server process serves many MCP
+client sessions that share a single RazorpayClient (and its connection pool).
+SessionLimiter keeps any one session from monopolising that shared capacity
+and keeps count of the sessions the process is serving.
+"""
+import time
+import asyncio
+import logging
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when a session exceeds one of its resource limits."""
+
+
+class SessionState:
+    """Bookkeeping for a single MCP client session."""
+
+    def __init__(self, max_concurrent_calls: int):
+        self.created_at = time.time()
+        self.semaphore = asyncio.Semaphore(max_concurrent_calls)
+        self.in_flight = 0
+        self.total_calls = 0
+        self.recent_calls = deque()
+        # (key_id, key_secret) when the session acts for its own merchant
+        self.credentials = None
+
+
+class SessionLimiter:
+    """Tracks MCP sessions and enforces per-session call limits.
+
+    Sessions are held weakly, so a session drops out of the count as soon as the
+    transport discards it; no disconnect hook is needed.
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, max_concurrent_calls: int = 4,
+                 max_calls_per_minute: Optional[int] = None):
+        self.max_sessions = max_sessions
+        self.max_concurrent_calls = max_concurrent_calls
+        self.max_calls_per_minute = max_calls_per_minute
+        self._sessions = weakref.WeakKeyDictionary()
+        self.sessions_opened = 0
+        self.rejected_calls = 0
+
+    def _state_for(self, session) -> SessionState:
+        state = self._sessions.get(session)
+        if state is None:
+            if self.max_sessions and len(self._sessions) >= self.max_sessions:
+                self.rejected_calls += 1
+                raise SessionLimitError(f"Server is at its limit of {self.max_sessions} sessions")
+            state = SessionState(self.max_concurrent_calls)
+            self._sessions[session] = state
+            self.sessions_opened += 1
+            logger.info(f"New MCP session; {len(self._sessions)} active")
+        return state
+
+    def _check_rate(self, state: SessionState):
+        if not self.max_calls_per_minute:
+            return
+        now = time.monotonic()
+        while state.recent_calls and now - state.recent_calls[0] > 60:
+            state.recent_calls.popleft()
+        if len(state.recent_calls) >= self.max_calls_per_minute:
+            self.rejected_calls += 1
+            raise SessionLimitError(f"Session exceeded {self.max_calls_per_minute} tool calls per minute")
+        state.recent_calls.append(now)
+
+    def set_credentials(self, session, credentials):
+        """Bind merchant credentials to a session for its remaining calls."""
+        self._state_for(session).credentials = credentials
+
+    @asynccontextmanager
+    async def acquire(self, session):
+        """Hold one of the session's call slots for the duration of a tool call."""
+        state = self._state_for(session)
+        self._check_rate(state)
+        async with state.semaphore:
+            state.in_flight += 1
+            state.total_calls += 1
+            try:
+                yield state
+            finally:
+                state.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the session count metrics."""
+        states = list(self._sessions.values())
+        return {
+            "active_sessions": len(states),
+            "sessions_opened": self.sessions_opened,
+            "in_flight_calls": sum(state.in_flight for state in states),
+            "rejected_calls": self.rejected_calls,
+            "limits": {
+                "max_sessions": self.max_sessions,
+                "max_concurrent_calls": self.max_concurrent_calls,
+                "max_calls_per_minute": self.max_calls_per_minute,
+            },
+        }
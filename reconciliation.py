@@ -0,0 +1,291 @@
+"""
+Settlement-to-payment reconciliation.
+
+reconcile_settlements() matches the settlement reconciliation report for a
+period against the payments and refunds created in it, and reports:
+
+  * unsettled items: captured payments and processed refunds with no settled
+    row in the report (``not_in_report``), or only unsettled ones (``pending``)
+  * settled-but-missing items: payment or refund rows in the report whose
+    entity is not among the payments and refunds Razorpay lists for the period
+  * amount mismatches: matched items whose report amount differs from the
+    payment or refund amount
+
+Both sides are streamed. The settlement rows are the build side of a hash
+join on entity id, and payments and refunds are probed against it as they
+are listed. Rows that match are dropped straight away, so memory holds only
+the unmatched rows. When the build side outgrows
+RAZORPAY_RECONCILIATION_MEMORY_ROWS, the join becomes a grace hash join. Both
+sides are partitioned into NDJSON files under
+RAZORPAY_RECONCILIATION_SPILL_DIR (default: the system temp directory) and
+joined one partition at a time.
+
+Payments settle a few days after they are made, so the report is read up to
+``settlement_lag_days`` past the end of the period. Only rows for entities
+created within the period are compared. Days are UTC.
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from bulk_runner import OutputWriter
+from pagination import iter_collection
+from settlement_reports import settlement_report_range
+
+logger = logging.getLogger(__name__)
+
+MEMORY_ROWS = int(os.environ.get("RAZORPAY_RECONCILIATION_MEMORY_ROWS", "200000"))
+SPILL_DIR = os.environ.get("RAZORPAY_RECONCILIATION_SPILL_DIR") or None
+
+# Statuses that must show up in a settlement
+EXPECTED_STATUSES = {"payment": ("captured", "refunded"), "refund": ("processed",)}
+ISSUES = ("unsettled", "settled_missing", "amount_mismatch")
+
+
+class SpillingHashJoin:
+    """Full outer hash join on a string key that spills to disk past ``memory_limit`` build rows.
+
+    All build rows are added before the first probe. Each probe key is
+    expected at most once. ``emit(key, build_rows, probe_value)`` is called
+    once per key, with ``build_rows`` (a list) or ``probe_value`` None on the
+    side that has no match. Matches are emitted while probing and unmatched
+    build rows by finish().
+    """
+
+    MAX_DEPTH = 3
+
+    def __init__(self, emit: Callable[[str, Optional[List[Any]], Any], None], memory_limit: int = MEMORY_ROWS,
+                 partitions: int = 16, spill_dir: Optional[str] = None, depth: int = 0):
+        self.emit = emit
+        self.memory_limit = memory_limit
+        self.partitions = partitions
+        self.spill_dir = spill_dir
+        self.depth = depth
+        self._table = {}
+        self._rows = 0
+        self._probing = False
+        self._directory = None
+        self._build_files = self._probe_files = None
+        self.stats = {"spilled_rows": 0, "partitions": 0, "peak_rows": 0}
+
+    @property
+    def spilled(self) -> bool:
+        return self._directory is not None
+
+    def _partition(self, key: str) -> int:
+        # Salting the key with the depth re-splits a partition that was still
+        # too big. It must be a fully mixing hash: a CRC's or a tuple hash's low
+        # bits barely change with the salt. Partition files only live as long
+        # as this process, so its string hash seed is fine.
+        return hash(f"{self.depth}:{key}") % self.partitions
+
+    def _write(self, files, key, value):
+        files[self._partition(key)].write(json.dumps([key, value], separators=(",", ":")) + "\n")
+        self.stats["spilled_rows"] += 1
+
+    def _spill(self):
+        self._directory = tempfile.mkdtemp(prefix="razorpay-reconcile-", dir=self.spill_dir)
+        self._build_files = [open(os.path.join(self._directory, f"build-{i}.ndjson"), "w", encoding="utf-8")
+                             for i in range(self.partitions)]
+        self._probe_files = [open(os.path.join(self._directory, f"probe-{i}.ndjson"), "w", encoding="utf-8")
+                             for i in range(self.partitions)]
+        logger.info(f"Hash join spilling {self._rows} rows to {self.partitions} partitions in {self._directory}")
+        for key, rows in self._table.items():
+            for row in rows:
+                self._write(self._build_files, key, row)
+        self._table = {}
+        self._rows = 0
+
+    def build(self, key: str, row: Any):
+        if self._probing:
+            raise RuntimeError("Build rows must all be added before probing")
+        if self.spilled:
+            self._write(self._build_files, key, row)
+            return
+        self._table.setdefault(key, []).append(row)
+        self._rows += 1
+        self.stats["peak_rows"] = max(self.stats["peak_rows"], self._rows)
+        if self._rows > self.memory_limit:
+            if self.depth < self.MAX_DEPTH:
+                self._spill()
+            elif self._rows == self.memory_limit + 1:
+                logger.warning(f"Hash join partition still holds over {self.memory_limit} rows at depth "
+                               f"{self.depth}; joining it in memory")
+
+    def probe(self, key: str, value: Any):
+        self._probing = True
+        if self.spilled:
+            self._write(self._probe_files, key, value)
+            return
+        rows = self._table.pop(key, None)
+        if rows is not None:
+            self._rows -= len(rows)
+        self.emit(key, rows, value)
+
+    def finish(self):
+        """Emit the unmatched build rows, joining any spilled partitions first."""
+        if not self.spilled:
+            for key, rows in self._table.items():
+                self.emit(key, rows, None)
+            self._table = {}
+            self._rows = 0
+            return
+        try:
+            for files in (self._build_files, self._probe_files):
+                for f in files:
+                    f.close()
+            for i in range(self.partitions):
+                child = SpillingHashJoin(self.emit, self.memory_limit, self.partitions, self.spill_dir,
+                                         self.depth + 1)
+                for name, add in (("build", child.build), ("probe", child.probe)):
+                    with open(os.path.join(self._directory, f"{name}-{i}.ndjson"), encoding="utf-8") as f:
+                        for line in f:
+                            key, value = json.loads(line)
+                            add(key, value)
+                child.finish()
+                self.stats["partitions"] += 1 + child.stats["partitions"]
+                self.stats["spilled_rows"] += child.stats["spilled_rows"]
+                self.stats["peak_rows"] = max(self.stats["peak_rows"], child.stats["peak_rows"])
+        finally:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+
+def _day_bounds(start: date, end: date):
+    """Unix seconds of start's first and end's last second, UTC."""
+    first = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+    last = datetime(end.year, end.month, end.day, tzinfo=timezone.utc) + timedelta(days=1)
+    return int(first.timestamp()), int(last.timestamp()) - 1
+
+
+def _row_amount(row: Dict[str, Any]) -> int:
+    """Gross amount of a settlement report row."""
+    if row.get("amount") is not None:
+        return row["amount"]
+    if row.get("credit"):
+        return row["credit"] + (row.get("fee") or 0)
+    return row.get("debit") or 0
+
+
+def reconcile_settlements(client, start: date, end: date, settlement_lag_days: int = 7,
+                          output_path: Optional[str] = None, max_items: int = 100,
+                          memory_limit: int = MEMORY_ROWS, spill_dir: Optional[str] = SPILL_DIR,
+                          max_workers: int = 4, rate_per_second: float = 5.0,
+                          progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+    """Reconcile the settlements of payments and refunds created in start..end.
+
+    Returns counts, the first ``max_items`` items of each issue and join
+    statistics. Every issue is appended to ``output_path`` as NDJSON with an
+    ``issue`` field when it is given.
+    """
+    if end < start:
+        raise ValueError("The end date is before the start date")
+    started = time.monotonic()
+    first, last = _day_bounds(start, end)
+    report_end = min(end + timedelta(days=settlement_lag_days), datetime.now(timezone.utc).date())
+
+    counts = {"settlement_rows": 0, "rows_outside_period": 0, "payments": 0, "refunds": 0, "matched": 0}
+    counts.update({issue: 0 for issue in ISSUES})
+    issues = {issue: [] for issue in ISSUES}
+    output = OutputWriter(output_path) if output_path else None
+    lock = threading.Lock()
+
+    def report(issue, record):
+        counts[issue] += 1
+        if len(issues[issue]) < max_items:
+            issues[issue].append(record)
+        if output is not None:
+            output.write(dict(record, issue=issue))
+
+    def emit(entity_id, rows, item):
+        if item is None:
+            report("settled_missing", {"id": entity_id, "kind": rows[0]["type"], "settled_amount": sum(
+                row["amount"] for row in rows), "settlement_id": rows[0]["settlement_id"]})
+            return
+        expected = item["status"] in EXPECTED_STATUSES[item["kind"]]
+        if rows is None:
+            if expected:
+                report("unsettled", dict(item, reason="not_in_report"))
+            return
+        counts["matched"] += 1
+        settled = [row for row in rows if row["settled"]]
+        if not settled and expected:
+            report("unsettled", dict(item, reason="pending", settlement_id=rows[0]["settlement_id"]))
+        settled_amount = sum(row["amount"] for row in rows)
+        if settled_amount != item["amount"]:
+            report("amount_mismatch", dict(item, settled_amount=settled_amount,
+                                           difference=settled_amount - item["amount"],
+                                           settlement_id=rows[0]["settlement_id"]))
+
+    join = SpillingHashJoin(emit, memory_limit=memory_limit, spill_dir=spill_dir)
+
+    def add_rows(period, rows):
+        with lock:
+            for row in rows:
+                counts["settlement_rows"] += 1
+                if row.get("type") not in EXPECTED_STATUSES or not row.get("entity_id"):
+                    continue
+                if not first <= (row.get("created_at") or 0) <= last:
+                    counts["rows_outside_period"] += 1
+                    continue
+                join.build(row["entity_id"], {
+                    "type": row["type"], "amount": _row_amount(row), "settled": bool(row.get("settled")),
+                    "settlement_id": row.get("settlement_id"),
+                })
+
+    try:
+        # Daily reports keep each period's dedupe set small
+        settlements = settlement_report_range(client, start, report_end, granularity="day", max_items=0,
+                                              max_periods=1000, max_workers=max_workers,
+                                              rate_per_second=rate_per_second, on_rows=add_rows, progress=progress)
+        if settlements.get("errors"):
+            logger.warning(f"Settlement report periods failed: {', '.join(settlements['errors'])}; "
+                           f"their items will show up as unsettled")
+
+        scanned = 0
+        last_progress = time.monotonic()
+        window = {"from": first, "to": last}
+        for kind, list_method in (("payment", client.list_payments), ("refund", client.list_refunds)):
+            for entity in iter_collection(list_method, window):
+                counts[f"{kind}s"] += 1
+                item = {"id": entity["id"], "kind": kind, "amount": entity.get("amount") or 0,
+                        "status": entity.get("status"), "created_at": entity.get("created_at")}
+                if kind == "refund":
+                    item["payment_id"] = entity.get("payment_id")
+                join.probe(entity["id"], item)
+                scanned += 1
+                if progress is not None and time.monotonic() - last_progress >= 0.5:
+                    last_progress = time.monotonic()
+                    try:
+                        progress(scanned, None)
+                    except Exception as e:
+                        logger.debug(f"Progress callback failed: {str(e)}")
+        join.finish()
+    finally:
+        if output is not None:
+            output.close()
+
+    logger.info(f"Reconciled {counts['payments']} payments and {counts['refunds']} refunds against "
+                f"{counts['settlement_rows']} settlement rows; {counts['unsettled']} unsettled, "
+                f"{counts['settled_missing']} missing, {counts['amount_mismatch']} mismatched")
+    summary = {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "report_to": report_end.isoformat(),
+        "counts": counts,
+        "items_truncated": any(counts[issue] > len(issues[issue]) for issue in ISSUES),
+        "join": dict(join.stats, spilled=join.stats["spilled_rows"] > 0),
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+    summary.update(issues)
+    if settlements.get("errors"):
+        summary["report_errors"] = settlements["errors"]
+    if output_path:
+        summary["output"] = output_path
+    return summary
@@ -0,0 +1,217 @@
+"""
+Negotiated compression for HTTP responses.
+
+List and report tools (payments, settlements, settlement reports) can return
+hundreds of KB of JSON through /mcp/request. init_app() registers an
+after_request hook on the Flask app that picks the best encoding the client
+accepts (zstd, br or gzip), compresses bodies above a size threshold and
+compresses streamed responses chunk by chunk as they are produced. brotli and
+zstd are offered only when the optional ``brotli`` / ``zstandard`` packages are
+installed; gzip is always available.
+
+Configuration:
+    RESPONSE_COMPRESSION_MIN_BYTES  smallest body worth compressing (default 1024)
+    RESPONSE_GZIP_LEVEL             zlib level 1-9 (default 6)
+    RESPONSE_BROTLI_QUALITY         brotli quality 0-11 (default 5)
+    RESPONSE_ZSTD_LEVEL             zstd level 1-22 (default 3)
+
+Per-route byte counts, compression ratio and CPU time are kept in
+compression_stats and reported at /mcp/metrics.
+"""
+import os
+import time
+import zlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("RESPONSE_BROTLI_QUALITY", "5"))
+ZSTD_LEVEL = int(os.environ.get("RESPONSE_ZSTD_LEVEL", "3"))
+
+
+def available_encodings():
+    """Encodings this process can produce, most preferred first."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+AVAILABLE_ENCODINGS = available_encodings()
+
+
+def negotiate(accept_encoding: Optional[str], available=AVAILABLE_ENCODINGS) -> Optional[str]:
+    """Pick the encoding for an Accept-Encoding header, or None for identity.
+
+    The client's q-values decide; ties go to the server's preference order.
+    """
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compressor(encoding: str):
+    """A streaming compressor object with compress() and flush() methods."""
+    if encoding == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    if encoding == "br":
+        return _BrotliStream(brotli.Compressor(quality=BROTLI_QUALITY))
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+class _BrotliStream:
+    # brotli.Compressor names its methods process/finish
+    def __init__(self, compressor):
+        self._compressor = compressor
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionStats:
+    """Per-route totals of bytes in and out and compression CPU time."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float):
+        with self._lock:
+            entry = self._routes.setdefault(route, {
+                "responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0, "encodings": {}
+            })
+            entry["responses"] += 1
+            entry["bytes_in"] += bytes_in
+            entry["bytes_out"] += bytes_out
+            entry["cpu_seconds"] += cpu_seconds
+            entry["encodings"][encoding] = entry["encodings"].get(encoding, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {}
+            for route, entry in self._routes.items():
+                routes[route] = dict(
+                    entry,
+                    encodings=dict(entry["encodings"]),
+                    ratio=round(entry["bytes_in"] / entry["bytes_out"], 2) if entry["bytes_out"] else None,
+                    cpu_ms_per_response=round(entry["cpu_seconds"] * 1000 / entry["responses"], 3),
+                )
+        return {"available_encodings": AVAILABLE_ENCODINGS, "min_bytes": MIN_BYTES, "routes": routes}
+
+
+compression_stats = CompressionStats()
+
+
+def compress_body(body: bytes, encoding: str, route: str) -> bytes:
+    """Compress a complete body and record it against ``route``."""
+    started = time.thread_time()
+    stream = compressor(encoding)
+    compressed = stream.compress(body) + stream.flush()
+    compression_stats.record(route, encoding, len(body), len(compressed), time.thread_time() - started)
+    return compressed
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, route: str) -> Iterator[bytes]:
+    """Compress a streamed body chunk by chunk, recording it once the stream ends."""
+    stream = compressor(encoding)
+    bytes_in = bytes_out = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            bytes_in += len(chunk)
+            started = time.thread_time()
+            out = stream.compress(chunk)
+            cpu_seconds += time.thread_time() - started
+            if out:
+                bytes_out += len(out)
+                yield out
+        started = time.thread_time()
+        out = stream.flush()
+        cpu_seconds += time.thread_time() - started
+        bytes_out += len(out)
+        yield out
+    finally:
+        compression_stats.record(route, encoding, bytes_in, bytes_out, cpu_seconds)
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def init_app(app, min_bytes: int = MIN_BYTES):
+    """Register negotiated response compression on a Flask app."""
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        if (request.method == "HEAD" or response.status_code < 200 or response.status_code in (204, 304)
+                or "Content-Encoding" in response.headers):
+            return response
+
+        encoding = negotiate(request.headers.get("Accept-Encoding"))
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+
+        if response.is_streamed:
+            if encoding is None:
+                return response
+            response.direct_passthrough = False
+            response.response = compress_stream(response.response, encoding, route)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < min_bytes:
+                return response
+            response.vary.add("Accept-Encoding")
+            if encoding is None:
+                return response
+            response.set_data(compress_body(body, encoding, route))
+
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        # A strong ETag names the identity bytes, not the encoded ones
+        if response.headers.get("ETag") and not response.headers["ETag"].startswith("W/"):
+            response.headers["ETag"] = "W/" + response.headers["ETag"]
+        return response
+
+    return app
@@ -0,0 +1,149 @@
+"""
+Result size budgeting for the MCP list tools.
+
+A Razorpay list call returns whatever page it was asked for, which can be far
+more than a model's context can hold. apply_budget() cuts a collection at the
+last whole item that fits a byte and item budget. The items left over are
+parked in a short-lived ResultBuffer under an opaque continuation token, and
+the agent passes the token back to read the next slice without another
+Razorpay call.
+
+Buffered slices belong to the merchant key that produced them; a token
+presented by any other merchant is treated as unknown.
+"""
+import os
+import json
+import time
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = int(os.environ.get("MCP_RESULT_MAX_BYTES", "32768"))
+DEFAULT_MAX_ITEMS = int(os.environ.get("MCP_RESULT_MAX_ITEMS", "100"))
+
+
+class ContinuationError(LookupError):
+    """Raised for a continuation token that is unknown, expired or not the caller's."""
+
+
+def _item_size(item) -> int:
+    # Serialized size plus the separating comma
+    return len(json.dumps(item, separators=(",", ":"), default=str)) + 1
+
+
+def split_items(items: List[Any], max_items: int, max_bytes: int):
+    """Split items at the last whole item within the budget.
+
+    At least one item is always returned, so an oversized item cannot stall
+    a scan.
+    """
+    used = 0
+    cut = 0
+    for item in items[:max_items]:
+        size = _item_size(item)
+        if cut and used + size > max_bytes:
+            break
+        used += size
+        cut += 1
+    return items[:cut], items[cut:]
+
+
+class ResultBuffer:
+    """TTL- and size-bounded store of the unread remainder of list results."""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.served = 0
+        self.expired = 0
+
+    def put(self, owner: str, items: List[Any], envelope: Dict[str, Any]) -> str:
+        token = secrets.token_urlsafe(18)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._entries[token] = (owner, now + self.ttl, items, envelope)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.expired += 1
+            self.stored += 1
+        return token
+
+    def take(self, token: str, owner: str):
+        """Remove and return (items, envelope) for a token owned by ``owner``."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(token)
+            if entry is None or not secrets.compare_digest(entry[0], owner):
+                raise ContinuationError("Continuation token is unknown or has expired; repeat the original list call")
+            del self._entries[token]
+            self.served += 1
+        return entry[2], entry[3]
+
+    def _expire(self, now):
+        # Entries are stored in expiry order, so expired ones sit at the front
+        while self._entries:
+            token, entry = next(iter(self._entries.items()))
+            if entry[1] > now:
+                break
+            del self._entries[token]
+            self.expired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._entries)
+        return {
+            "buffered_results": buffered,
+            "stored": self.stored,
+            "served": self.served,
+            "expired": self.expired,
+            "ttl_seconds": self.ttl,
+        }
+
+
+result_buffer = ResultBuffer(
+    ttl=float(os.environ.get("MCP_RESULT_BUFFER_TTL", "300")),
+    max_entries=int(os.environ.get("MCP_RESULT_BUFFER_MAX_ENTRIES", "1000"))
+)
+
+
+def _budget(max_items: Optional[int], max_bytes: Optional[int]):
+    return int(max_items or DEFAULT_MAX_ITEMS), int(max_bytes or DEFAULT_MAX_BYTES)
+
+
+def _slice(items, envelope, owner, max_items, max_bytes):
+    page, rest = split_items(items, max_items, max_bytes)
+    result = dict(envelope, count=len(page), items=page)
+    if rest:
+        # Following next_cursor now would skip the buffered items, so only the last slice carries it
+        result.pop("next_cursor", None)
+        result["truncated"] = True
+        result["remaining"] = len(rest)
+        result["continuation_token"] = result_buffer.put(owner, rest, envelope)
+    return result
+
+
+def apply_budget(result: Any, owner: str, max_items: Optional[int] = None,
+                 max_bytes: Optional[int] = None) -> Any:
+    """Cut a Razorpay collection down to the budget; other results pass through."""
+    if not isinstance(result, dict) or not isinstance(result.get("items"), list):
+        return result
+    max_items, max_bytes = _budget(max_items, max_bytes)
+    envelope = {key: value for key, value in result.items() if key not in ("items", "count")}
+    return _slice(result["items"], envelope, owner, max_items, max_bytes)
+
+
+def next_slice(token: str, owner: str, max_items: Optional[int] = None,
+               max_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """Serve the next slice of a buffered result from its continuation token."""
+    items, envelope = result_buffer.take(token, owner)
+    max_items, max_bytes = _budget(max_items, max_bytes)
+    return _slice(items, envelope, owner, max_items, max_bytes)
@@ -0,0 +1,256 @@
+"""
+Recurring-revenue analytics over plans and subscriptions.
+
+revenue_report() reads every plan into a hash index keyed by plan_id, then
+streams every subscription once with cursor pagination and joins each one
+to its plan. Subscriptions are folded into running aggregates as they
+arrive and never kept. Memory therefore depends on the number of plans,
+currencies, days in the charge horizon and months of history, not on the
+number of subscriptions.
+
+Metrics (amounts in the currency's smallest unit, e.g. paise):
+
+  * MRR and ARR by currency, and MRR by plan. A plan's amount times the
+    subscription quantity is normalized to a month: yearly / 12,
+    weekly * 52 / 12, daily * 365 / 12, each divided by the plan interval.
+    Active subscriptions count towards MRR. Pending and halted ones, whose
+    charges are failing, are reported separately as MRR at risk.
+  * the upcoming charge schedule: active subscriptions' next ``charge_at``
+    within ``horizon_days``, totalled per day and currency
+  * monthly trends: subscriptions started, paused and cancelled per month,
+    with the MRR paused and the MRR lost to cancellations. Razorpay keeps no
+    pause history, so a month's paused figures cover the subscriptions still
+    paused, by the month of their ``paused_at``. Paused and cancelled counts
+    are also reported per plan
+
+Days and months are UTC.
+"""
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from id_validation import is_not_found
+from pagination import iter_collection
+
+logger = logging.getLogger(__name__)
+
+# Months covered by one billing period
+MONTHS_PER_PERIOD = {"daily": 12 / 365, "weekly": 12 / 52, "monthly": 1, "yearly": 12}
+MRR_STATUSES = ("active",)
+AT_RISK_STATUSES = ("pending", "halted")
+
+# Per-plan aggregate slots
+MRR, ACTIVE, AT_RISK, PAUSED, CANCELLED = range(5)
+
+
+def monthly_amount(plan: Dict[str, Any]) -> float:
+    """A plan's charge per month, in the smallest currency unit."""
+    item = plan.get("item") or {}
+    months = MONTHS_PER_PERIOD.get(plan.get("period"))
+    if not months:
+        return 0.0
+    return (item.get("amount") or 0) / (months * max(1, int(plan.get("interval") or 1)))
+
+
+def _day(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _month(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m")
+
+
+class PlanIndex:
+    """Hash index plan_id -> (monthly amount, amount per charge, currency, name).
+
+    Filled by sync() from list_plans; a plan missing from it is fetched, and
+    remembered as UNKNOWN only if Razorpay says it does not exist.
+    Razorpay plans cannot be edited, so an incremental sync only reads plans
+    created since the last one. A long-lived index (the client's
+    ``plan_catalog``) is kept fresh that way.
+    """
+
+    UNKNOWN = (0.0, 0, None, None)
+
+    def __init__(self, client):
+        self.client = client
+        self.plans = {}
+        self.fetched = 0
+        self.synced_until = None
+        self.last_sync = None
+        self._sync_lock = threading.Lock()
+
+    def sync(self, client=None, full: bool = False) -> Dict[str, Any]:
+        """Read plans into the index; a full sync also drops plans that could not be fetched."""
+        with self._sync_lock:
+            started = time.monotonic()
+            params = {}
+            if self.synced_until is not None and not full:
+                params["from"] = self.synced_until
+            plans = {} if full or self.synced_until is None else dict(self.plans)
+            read = 0
+            newest = self.synced_until
+            for plan in iter_collection((client or self.client).list_plans, params):
+                plans[plan["id"]] = self._entry(plan)
+                read += 1
+                if newest is None or (plan.get("created_at") or 0) > newest:
+                    newest = plan.get("created_at")
+            # Only a complete pass may move the watermark
+            self.plans = plans
+            self.synced_until = newest
+            self.last_sync = time.time()
+            took = time.monotonic() - started
+            return {"read": read, "indexed": len(plans), "seconds": round(took, 3)}
+
+    def is_stale(self, max_age: float) -> bool:
+        return self.last_sync is None or time.time() - self.last_sync > max_age
+
+    @staticmethod
+    def _entry(plan: Dict[str, Any]):
+        item = plan.get("item") or {}
+        return (monthly_amount(plan), item.get("amount") or 0, item.get("currency"), item.get("name"))
+
+    def add(self, plan: Dict[str, Any]):
+        self.plans[plan["id"]] = self._entry(plan)
+
+    def get(self, plan_id: str):
+        plan = self.plans.get(plan_id)
+        if plan is None:
+            self.fetched += 1
+            try:
+                self.add(self.client.get_plan({"id": plan_id}))
+                plan = self.plans[plan_id]
+            except Exception as e:
+                logger.warning(f"Plan {plan_id} could not be fetched: {str(e)}")
+                plan = self.UNKNOWN
+                # Remember plans that do not exist; a 429 or timeout is retried on the next lookup
+                if isinstance(e, ValueError) or is_not_found(e):
+                    self.plans[plan_id] = plan
+        return plan
+
+
+def revenue_report(client, horizon_days: int = 30, months: int = 12, plan_id: Optional[str] = None,
+                   top_plans: int = 50, now: Optional[float] = None, plans: Optional[PlanIndex] = None,
+                   progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+    """Stream plans and subscriptions once and return the revenue report.
+
+    ``plans`` is an already synced PlanIndex to join against; by default
+    every plan is read first.
+    """
+    started = time.monotonic()
+    now = int(now if now is not None else time.time())
+    horizon_end = now + horizon_days * 86400
+    if plans is None:
+        plans = PlanIndex(client)
+        plans.sync(client)
+    fetched_before = plans.fetched
+
+    status_counts = {}
+    by_plan = {}        # plan_id -> [mrr, active, at-risk mrr, paused, cancelled]
+    by_currency = {}    # currency -> [mrr, active, at-risk mrr]
+    schedule = {}       # (day, currency) -> [amount, charges]
+    trends = {}         # month -> {"started", "paused", "cancelled", "paused_mrr"/"churned_mrr": {currency: amount}}
+    scanned = unpriced = 0
+    last_progress = time.monotonic()
+
+    def month_of(timestamp):
+        return trends.setdefault(_month(timestamp), {"started": 0, "paused": 0, "cancelled": 0,
+                                                     "paused_mrr": {}, "churned_mrr": {}})
+
+    for subscription in iter_collection(client.list_subscriptions, {"plan_id": plan_id} if plan_id else {}):
+        scanned += 1
+        status = subscription.get("status")
+        status_counts[status] = status_counts.get(status, 0) + 1
+        plan_mrr, charge, currency, _ = plans.get(subscription.get("plan_id"))
+        quantity = subscription.get("quantity") or 1
+        mrr = plan_mrr * quantity
+
+        plan_totals = by_plan.get(subscription.get("plan_id"))
+        if plan_totals is None:
+            plan_totals = by_plan[subscription.get("plan_id")] = [0.0, 0, 0.0, 0, 0]
+        if currency is None:
+            # Plan not found: counted by status and plan, but has no price
+            unpriced += 1
+            currency_totals = [0.0, 0, 0.0]
+        else:
+            currency_totals = by_currency.get(currency)
+            if currency_totals is None:
+                currency_totals = by_currency[currency] = [0.0, 0, 0.0]
+
+        if status in MRR_STATUSES:
+            plan_totals[MRR] += mrr
+            plan_totals[ACTIVE] += 1
+            currency_totals[MRR] += mrr
+            currency_totals[ACTIVE] += 1
+            charge_at = subscription.get("charge_at")
+            if charge_at and now <= charge_at < horizon_end and currency is not None:
+                slot = schedule.setdefault((_day(charge_at), currency), [0, 0])
+                slot[0] += charge * quantity
+                slot[1] += 1
+        elif status in AT_RISK_STATUSES:
+            plan_totals[AT_RISK] += mrr
+            currency_totals[AT_RISK] += mrr
+        elif status == "paused":
+            plan_totals[PAUSED] += 1
+        elif status == "cancelled":
+            plan_totals[CANCELLED] += 1
+
+        start = subscription.get("start_at") or subscription.get("created_at")
+        if start:
+            month_of(start)["started"] += 1
+        if status == "paused" and subscription.get("paused_at") and currency is not None:
+            month = month_of(subscription["paused_at"])
+            month["paused"] += 1
+            month["paused_mrr"][currency] = month["paused_mrr"].get(currency, 0) + mrr
+        if status == "cancelled" and subscription.get("ended_at") and currency is not None:
+            month = month_of(subscription["ended_at"])
+            month["cancelled"] += 1
+            month["churned_mrr"][currency] = month["churned_mrr"].get(currency, 0) + mrr
+
+        if progress is not None and time.monotonic() - last_progress >= 0.5:
+            last_progress = time.monotonic()
+            try:
+                progress(scanned, None)
+            except Exception as e:
+                logger.debug(f"Progress callback failed: {str(e)}")
+
+    plan_rows = []
+    for subscription_plan, totals in by_plan.items():
+        _, _, currency, name = plans.get(subscription_plan)
+        plan_rows.append({
+            "plan_id": subscription_plan, "name": name, "currency": currency,
+            "mrr": round(totals[MRR]), "active": totals[ACTIVE], "mrr_at_risk": round(totals[AT_RISK]),
+            "paused": totals[PAUSED], "cancelled": totals[CANCELLED],
+        })
+    plan_rows.sort(key=lambda row: row["mrr"], reverse=True)
+
+    recent_months = sorted(trends)[-months:] if months else []
+    logger.info(f"Revenue report scanned {scanned} subscriptions over {len(plans.plans)} plans")
+    return {
+        "as_of": now,
+        "subscriptions_scanned": scanned,
+        "status_counts": status_counts,
+        "currencies": {
+            currency: {"mrr": round(totals[MRR]), "arr": round(totals[MRR] * 12), "active": totals[ACTIVE],
+                       "mrr_at_risk": round(totals[AT_RISK])}
+            for currency, totals in by_currency.items()
+        },
+        "mrr_by_plan": plan_rows[:top_plans],
+        "plans_truncated": len(plan_rows) > top_plans,
+        "upcoming_charges": [
+            {"date": day, "currency": currency, "amount": amount, "charges": count}
+            for (day, currency), (amount, count) in sorted(schedule.items())
+        ],
+        "monthly_trends": [
+            {"month": month, "started": trends[month]["started"], "paused": trends[month]["paused"],
+             "cancelled": trends[month]["cancelled"],
+             "paused_mrr": {currency: round(amount) for currency, amount in trends[month]["paused_mrr"].items()},
+             "churned_mrr": {currency: round(amount) for currency, amount in trends[month]["churned_mrr"].items()}}
+            for month in recent_months
+        ],
+        "unpriced_subscriptions": unpriced,
+        "plans_fetched_individually": plans.fetched - fetched_before,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
@@ -0,0 +1,351 @@
+"""
+Background scheduler for recurring refresh jobs.
+
+Local indexes and catalogues only stay fresh if something refreshes them.
+The Scheduler runs recurring jobs, such as the incremental payment index
+sync every minute or the plan catalogue refresh every hour, on an asyncio
+event loop. Blocking jobs run in worker threads.
+
+  * Jitter: each run is scheduled ``interval`` seconds after the previous one
+    started, give or take ``jitter`` (a fraction of the interval), and the
+    first run lands at a random point in the first ``jitter`` of an interval.
+    Workers started together therefore do not hit Razorpay in step.
+  * Concurrency: at most ``max_concurrency`` jobs run at once. When more are
+    due, the highest ``priority`` runs first.
+  * No overlap: a job that is due while its previous run is still going is
+    skipped until its next interval.
+  * Interactive traffic first: while tool calls are in flight (or were within
+    the last ``quiet_seconds``), due jobs wait. A job that has waited
+    ``max_defer`` seconds runs anyway, so freshness stays bounded under
+    constant load.
+
+Jobs are configured with RAZORPAY_SCHEDULED_JOBS, a comma-separated list of
+jobs from JOBS, each optionally with its interval in seconds (none are
+scheduled by default):
+
+    RAZORPAY_SCHEDULED_JOBS=payment_index_sync=60,plan_catalog_refresh
+
+Jobs refresh the default client, i.e. the merchant configured with
+RAZORPAY_KEY_ID. Per-job run counts and runtimes are reported by stats().
+"""
+import os
+import time
+import random
+import asyncio
+import inspect
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from razorpay_client import get_default_client
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityTracker:
+    """Thread-safe count of interactive calls in flight."""
+
+    def __init__(self, quiet_seconds: float = 0.5):
+        self.quiet_seconds = quiet_seconds
+        self.in_flight = 0
+        self.last_active = 0.0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def exit(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.last_active = time.monotonic()
+
+    @contextmanager
+    def track(self):
+        self.enter()
+        try:
+            yield
+        finally:
+            self.exit()
+
+    def busy(self) -> bool:
+        return self.in_flight > 0 or time.monotonic() - self.last_active < self.quiet_seconds
+
+
+class Job:
+    """A recurring job and its runtime metrics."""
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval: float, jitter: float = 0.1, priority: int = 0):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.priority = priority
+        self.next_run = None
+        self.running = False
+        self.waiting_since = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.forced = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = None
+        self.last_started = None
+        self.last_error = None
+
+    def schedule(self, after: float, first: bool = False):
+        spread = self.interval * self.jitter
+        if first:
+            self.next_run = after + random.uniform(0, spread)
+        else:
+            self.next_run = after + self.interval + random.uniform(-spread, spread)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "priority": self.priority,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped_overlapping": self.skipped,
+            "deferred": self.deferred,
+            "forced_under_load": self.forced,
+            "last_started": self.last_started,
+            "last_seconds": round(self.last_seconds, 3) if self.last_seconds is not None else None,
+            "avg_seconds": round(self.total_seconds / self.runs, 3) if self.runs else None,
+            "max_seconds": round(self.max_seconds, 3),
+            "next_run_in": round(max(0.0, self.next_run - time.monotonic()), 1) if self.next_run else None,
+            "last_error": self.last_error,
+        }
+
+
+class Scheduler:
+    """Runs recurring jobs on an event loop; see the module docstring."""
+
+    def __init__(self, max_concurrency: int = 1, max_defer: float = 30.0,
+                 busy: Optional[Callable[[], bool]] = None, poll_seconds: float = 0.25):
+        self.max_concurrency = max_concurrency
+        self.max_defer = max_defer
+        self.busy = busy or (lambda: False)
+        self.poll_seconds = poll_seconds
+        self.jobs = {}
+        self._tasks = set()
+        self._loop_task = None
+        self._wake = None
+        self._users = 0
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+
+    def add(self, name: str, fn: Callable[[], Any], interval: float, jitter: float = 0.1, priority: int = 0) -> Job:
+        """Add a job; ``fn`` is a plain callable (run in a thread) or a coroutine function."""
+        if interval <= 0:
+            raise ValueError(f"Job {name} needs a positive interval")
+        job = self.jobs[name] = Job(name, fn, interval, jitter, priority)
+        return job
+
+    # The loop
+    async def run(self):
+        """Run jobs until cancelled."""
+        self._wake = asyncio.Event()
+        now = time.monotonic()
+        for job in self.jobs.values():
+            job.schedule(now, first=True)
+        logger.info(f"Scheduler started with jobs: {', '.join(self.jobs)}")
+        try:
+            while True:
+                wait = self._dispatch(time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            logger.info("Scheduler stopped")
+
+    def _dispatch(self, now: float) -> float:
+        """Start what is due and may run; returns how long to sleep."""
+        due = sorted((job for job in self.jobs.values() if job.next_run <= now),
+                     key=lambda job: (-job.priority, job.next_run))
+        busy = None
+        waiting = False
+        for job in due:
+            if job.running:
+                job.skipped += 1
+                logger.info(f"Skipping scheduled {job.name}: its previous run is still going")
+                job.schedule(job.next_run)
+                continue
+            if len(self._tasks) >= self.max_concurrency:
+                waiting = True
+                continue
+            if busy is None:
+                busy = self.busy()
+            forced = False
+            if busy:
+                if job.waiting_since is None:
+                    job.waiting_since = now
+                    job.deferred += 1
+                if now - job.waiting_since < self.max_defer:
+                    waiting = True
+                    continue
+                forced = True
+            self._start(job, now, forced)
+
+        next_due = min((job.next_run for job in self.jobs.values() if job.next_run > now), default=now + 60)
+        wait = max(0.0, next_due - now)
+        return min(wait, self.poll_seconds) if waiting else wait
+
+    def _start(self, job: Job, now: float, forced: bool):
+        job.running = True
+        job.waiting_since = None
+        if forced:
+            job.forced += 1
+        job.schedule(now)
+        task = asyncio.ensure_future(self._execute(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task):
+        self._tasks.discard(task)
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _execute(self, job: Job):
+        started = time.monotonic()
+        job.last_started = time.time()
+        try:
+            if inspect.iscoroutinefunction(job.fn):
+                await job.fn()
+            else:
+                await asyncio.to_thread(job.fn)
+            job.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Scheduled job {job.name} failed: {str(e)}")
+        finally:
+            took = time.monotonic() - started
+            job.running = False
+            job.runs += 1
+            job.last_seconds = took
+            job.total_seconds += took
+            job.max_seconds = max(job.max_seconds, took)
+            logger.debug(f"Scheduled job {job.name} finished in {took:.2f}s")
+
+    # Hosting
+    def start(self):
+        """Start on the running event loop (no-op without jobs or when already running)."""
+        if self.jobs and self._loop_task is None:
+            self._loop_task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self):
+        task, self._loop_task = self._loop_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    @asynccontextmanager
+    async def lifespan(self, app=None):
+        """Lifespan for FastMCP or Starlette apps.
+
+        Reference counted, so a transport that enters the lifespan once per
+        session still runs a single scheduler.
+        """
+        self._users += 1
+        self.start()
+        try:
+            yield None
+        finally:
+            self._users -= 1
+            if self._users == 0:
+                await self.stop()
+
+    def start_in_thread(self):
+        """Run the scheduler on its own event loop in a daemon thread, once per process."""
+        if not self.jobs or (self._thread is not None and self._thread_pid == os.getpid()):
+            return
+        with self._start_lock:
+            # A thread inherited across fork() is gone, so forked workers start their own
+            if self._thread is not None and self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="razorpay-scheduler",
+                                            daemon=True)
+            self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": sum(1 for job in self.jobs.values() if job.running),
+            "jobs": {name: job.stats() for name, job in self.jobs.items()},
+        }
+
+
+def _sync_payment_index():
+    client = get_default_client()
+    return client.payment_index.sync(client)
+
+
+def _sync_customer_index():
+    client = get_default_client()
+    return client.customer_index.sync(client)
+
+
+def _refresh_plan_catalog():
+    client = get_default_client()
+    return client.plan_catalog.sync(client)
+
+
+# job name -> (function, default interval in seconds, priority)
+JOBS = {
+    "payment_index_sync": (_sync_payment_index, 60, 2),
+    "customer_index_sync": (_sync_customer_index, 300, 1),
+    "plan_catalog_refresh": (_refresh_plan_catalog, 3600, 0),
+}
+
+
+def parse_jobs(spec: Optional[str]) -> List[Tuple[str, float]]:
+    """Turn a RAZORPAY_SCHEDULED_JOBS value into [(job name, interval), ...]."""
+    jobs = []
+    for entry in (spec or "").split(","):
+        name, _, interval = entry.strip().partition("=")
+        name = name.strip()
+        if not name or name == "none":
+            continue
+        if name not in JOBS:
+            logger.warning(f"Ignoring unknown scheduled job: {name}")
+            continue
+        try:
+            jobs.append((name, float(interval) if interval.strip() else JOBS[name][1]))
+        except ValueError:
+            logger.warning(f"Ignoring scheduled job {name} with a bad interval: {interval}")
+    return jobs
+
+
+def add_configured_jobs(target: Scheduler, spec: Optional[str], jitter: float = 0.1):
+    """Add the jobs named in a RAZORPAY_SCHEDULED_JOBS value to a scheduler."""
+    for name, interval in parse_jobs(spec):
+        fn, _, priority = JOBS[name]
+        target.add(name, fn, interval, jitter=jitter, priority=priority)
+
+
+# Interactive tool calls in flight, which scheduled jobs yield to
+activity = ActivityTracker(quiet_seconds=float(os.environ.get("RAZORPAY_SCHEDULER_QUIET_SECONDS", "0.5")))
+
+scheduler = Scheduler(
+    max_concurrency=int(os.environ.get("RAZORPAY_SCHEDULER_CONCURRENCY", "1")),
+    max_defer=float(os.environ.get("RAZORPAY_SCHEDULER_MAX_DEFER", "30")),
+    busy=activity.busy
+)
+add_configured_jobs(scheduler, os.environ.get("RAZORPAY_SCHEDULED_JOBS"),
+                    jitter=float(os.environ.get("RAZORPAY_SCHEDULER_JITTER", "0.1")))
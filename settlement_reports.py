@@ -0,0 +1,212 @@
+"""
+Settlement reconciliation reports over a date range.
+
+Razorpay's settlement report (``settlement.report``) covers one day or one
+month per call and is paged with count/skip. settlement_report_range()
+splits a date range into report periods: whole calendar months as monthly
+reports, and partial months at either end as daily ones. It fetches the
+periods concurrently on a bounded, paced pool and pages each one through to
+the end.
+
+Rows are deduplicated within each period, since paging by skip can repeat a
+row when new ones arrive mid-read, and the periods themselves never
+overlap. A period's rows are held until its last page has been read, and
+then streamed to an optional NDJSON output file and ``on_rows``. A period
+that fails partway is retried from its first page (PERIOD_ATTEMPTS times in
+all), and one that still fails emits nothing, so the output, the items and
+the totals always cover the same complete periods. Memory is bounded by the
+largest periods in flight rather than by the whole range. Each period gets
+totals for credit, debit, fee, tax, net (credit - debit) and the net that
+has actually settled.
+"""
+import time
+import logging
+import calendar
+import threading
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bulk_runner import OutputWriter
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Razorpay's largest page for settlement reports
+PAGE_SIZE = 1000
+GRANULARITIES = ("auto", "day", "month")
+TOTAL_FIELDS = ("credit", "debit", "fee", "tax")
+PERIOD_ATTEMPTS = 3
+
+
+def report_periods(start: date, end: date, granularity: str = "auto") -> List[Tuple[int, int, Optional[int]]]:
+    """(year, month, day-or-None) report periods covering start..end inclusive."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    if end < start:
+        raise ValueError("The end date is before the start date")
+    periods = []
+    current = start
+    while current <= end:
+        last_day = date(current.year, current.month, calendar.monthrange(current.year, current.month)[1])
+        whole_month = current.day == 1 and last_day <= end
+        if granularity == "month" or (granularity == "auto" and whole_month):
+            periods.append((current.year, current.month, None))
+            current = last_day + timedelta(days=1)
+        else:
+            periods.append((current.year, current.month, current.day))
+            current += timedelta(days=1)
+    return periods
+
+
+def period_label(period: Tuple[int, int, Optional[int]]) -> str:
+    year, month, day = period
+    return f"{year:04d}-{month:02d}" if day is None else f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def row_key(row: Dict[str, Any]) -> Tuple:
+    return (row.get("entity_id"), row.get("type"), row.get("settlement_id"), row.get("created_at"))
+
+
+def _new_totals() -> Dict[str, Any]:
+    totals = {field: 0 for field in TOTAL_FIELDS}
+    totals.update({"net": 0, "settled_net": 0, "rows_by_type": {}})
+    return totals
+
+
+def _accumulate(totals: Dict[str, Any], rows: List[Dict[str, Any]]):
+    for row in rows:
+        for field in TOTAL_FIELDS:
+            totals[field] += row.get(field) or 0
+        net = (row.get("credit") or 0) - (row.get("debit") or 0)
+        totals["net"] += net
+        if row.get("settled"):
+            totals["settled_net"] += net
+        by_type = totals["rows_by_type"]
+        by_type[row.get("type")] = by_type.get(row.get("type"), 0) + 1
+
+
+def settlement_report_range(client, start: date, end: date, granularity: str = "auto",
+                            output_path: Optional[str] = None, max_items: int = 100, max_workers: int = 4,
+                            rate_per_second: float = 5.0, max_periods: int = 400,
+                            on_rows: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+                            progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+    """Fetch and merge the settlement reports for every day or month in start..end.
+
+    Returns per-period and overall totals and the first ``max_items`` rows.
+    All rows go to ``output_path`` (NDJSON, one row per line with its
+    ``period``) and to ``on_rows(period, rows)`` as each period completes.
+    """
+    periods = report_periods(start, end, granularity)
+    if len(periods) > max_periods:
+        raise ValueError(f"{len(periods)} report periods requested; the limit is {max_periods}. "
+                         f"Use granularity 'month' or a shorter range")
+    started = time.monotonic()
+    limiter = TokenBucket(rate_per_second, burst=max(1, int(rate_per_second)))
+    output = OutputWriter(output_path) if output_path else None
+    items = []
+    lock = threading.Lock()
+
+    def read(period):
+        """Page through one period's report; returns (rows, duplicates, pages)."""
+        year, month, day = period
+        seen = set()
+        rows = []
+        duplicates = pages = 0
+        skip = 0
+        while True:
+            limiter.acquire()
+            params = {"year": year, "month": month, "count": PAGE_SIZE, "skip": skip}
+            if day is not None:
+                params["day"] = day
+            page = client.get_settlement_report(params).get("items") or []
+            pages += 1
+            for row in page:
+                key = row_key(row)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                rows.append(row)
+            if len(page) < PAGE_SIZE:
+                return rows, duplicates, pages
+            skip += len(page)
+
+    def fetch(period):
+        """Read one complete period, then emit it; returns (rows kept, duplicates, pages, totals)."""
+        label = period_label(period)
+        for attempt in range(1, PERIOD_ATTEMPTS + 1):
+            try:
+                rows, duplicates, pages = read(period)
+                break
+            except Exception as e:
+                if attempt == PERIOD_ATTEMPTS:
+                    raise
+                logger.warning(f"Settlement report for {label} failed (attempt {attempt}), retrying: {str(e)}")
+        totals = _new_totals()
+        _accumulate(totals, rows)
+        if rows:
+            if output is not None:
+                for row in rows:
+                    output.write(dict(row, period=label))
+            if on_rows is not None:
+                on_rows(label, rows)
+            with lock:
+                room = max_items - len(items)
+                if room > 0:
+                    items.extend(dict(row, period=label) for row in rows[:room])
+        return len(rows), duplicates, pages, totals
+
+    results = {}
+    errors = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers)),
+                                thread_name_prefix="razorpay-settlement-report") as pool:
+            futures = {pool.submit(fetch, period): period for period in periods}
+            for done, future in enumerate(as_completed(futures), 1):
+                label = period_label(futures[future])
+                try:
+                    results[label] = future.result()
+                except Exception as e:
+                    logger.error(f"Settlement report for {label} failed: {str(e)}")
+                    errors[label] = str(e)
+                if progress is not None:
+                    try:
+                        progress(done, len(periods))
+                    except Exception as e:
+                        logger.debug(f"Progress callback failed: {str(e)}")
+    finally:
+        if output is not None:
+            output.close()
+
+    period_rows = []
+    overall = {field: 0 for field in TOTAL_FIELDS + ("net", "settled_net")}
+    rows = duplicates = requests = 0
+    for period in periods:
+        label = period_label(period)
+        if label not in results:
+            continue
+        kept, dropped, pages, totals = results[label]
+        rows += kept
+        duplicates += dropped
+        requests += pages
+        for field in overall:
+            overall[field] += totals[field]
+        period_rows.append(dict(totals, period=label, rows=kept))
+
+    summary = {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "periods": period_rows,
+        "totals": dict(overall, rows=rows),
+        "duplicates_dropped": duplicates,
+        "requests": requests,
+        "items": items,
+        "items_truncated": rows > len(items),
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+    if errors:
+        summary["errors"] = errors
+    if output_path:
+        summary["output"] = output_path
+    return summary
@@ -0,0 +1,621 @@
+"""
+Tool catalogue and dispatch shared by the HTTP front ends.
+
+Both the Flask app (main.py) and the ASGI app (asgi_app.py) describe their
+tools with RAZORPAY_TOOLS and route calls through execute_tool, so the two
+modes always expose exactly the same behaviour.
+"""
+import logging
+from typing import Dict, Any, Optional
+
+from razorpay_client import RazorpayClient, get_default_client
+
+logger = logging.getLogger(__name__)
+
+SERVER_INFO = {
+    "name": "Razorpay MCP Server",
+    "version": "1.0.0",
+    "description": "Model Context Protocol server for Razorpay integration"
+}
+
+# Initialize Razorpay client; HTTP workers build the SDK client up front so a
+# preloaded gunicorn master shares it with its workers
+razorpay_client = get_default_client()
+razorpay_client.warm()
+
+# Define MCP tools
+RAZORPAY_TOOLS = [
+    {
+        "name": "payment_fetch",
+        "description": "Fetch payment details",
+        "parameters": {
+            "payment_id": {
+                "type": "string",
+                "description": "Payment ID"
+            }
+        }
+    },
+    {
+        "name": "order_create",
+        "description": "Create a new order",
+        "parameters": {
+            "amount": {
+                "type": "integer",
+                "description": "Order amount in smallest currency unit"
+            },
+            "currency": {
+                "type": "string",
+                "description": "Currency code (default: INR)"
+            },
+            "receipt": {
+                "type": "string",
+                "description": "Receipt number"
+            },
+            "notes": {
+                "type": "object",
+                "description": "Additional notes"
+            }
+        }
+    },
+    {
+        "name": "order_fetch",
+        "description": "Fetch order details",
+        "parameters": {
+            "order_id": {
+                "type": "string",
+                "description": "Order ID"
+            }
+        }
+    },
+    {
+        "name": "payment_link_create",
+        "description": "Create a new payment link",
+        "parameters": {
+            "amount": {
+                "type": "integer",
+                "description": "Payment amount in smallest currency unit"
+            },
+            "currency": {
+                "type": "string",
+                "description": "Currency code"
+            },
+            "description": {
+                "type": "string",
+                "description": "Payment description"
+            },
+            "customer_name": {
+                "type": "string",
+                "description": "Customer name"
+            },
+            "customer_email": {
+                "type": "string",
+                "description": "Customer email"
+            },
+            "customer_contact": {
+                "type": "string",
+                "description": "Customer contact number"
+            },
+            "notes": {
+                "type": "object",
+                "description": "Additional notes"
+            }
+        }
+    },
+    {
+        "name": "payment_link_fetch",
+        "description": "Fetch payment link details",
+        "parameters": {
+            "payment_link_id": {
+                "type": "string",
+                "description": "Payment Link ID"
+            }
+        }
+    },
+    {
+        "name": "customer_create",
+        "description": "Create a new customer",
+        "parameters": {
+            "name": {
+                "type": "string",
+                "description": "Customer name"
+            },
+            "email": {
+                "type": "string",
+                "description": "Customer email"
+            },
+            "contact": {
+                "type": "string",
+                "description": "Customer contact number"
+            },
+            "notes": {
+                "type": "object",
+                "description": "Additional notes"
+            }
+        }
+    },
+    {
+        "name": "customer_fetch",
+        "description": "Fetch customer details",
+        "parameters": {
+            "customer_id": {
+                "type": "string",
+                "description": "Customer ID"
+            }
+        }
+    },
+    
+    {
+        "name": "settlement_fetch",
+        "description": "Fetch settlement details",
+        "parameters": {
+            "settlement_id": {
+                "type": "string",
+                "description": "Settlement ID"
+            }
+        }
+    },
+    
+    {
+        "name": "settlements_list",
+        "description": "List settlements with optional filtering",
+        "parameters": {
+            "count": {
+                "type": "integer",
+                "description": "Number of settlements to fetch (default: 10)"
+            },
+            "skip": {
+                "type": "integer",
+                "description": "Number of settlements to skip (default: 0)"
+            },
+            "from": {
+                "type": "integer",
+                "description": "Timestamp of the starting date for settlement fetching"
+            },
+            "to": {
+                "type": "integer",
+                "description": "Timestamp of the ending date for settlement fetching"
+            },
+            "cursor": {
+                "type": "string",
+                "description": "next_cursor from the previous page, to continue a scan"
+            }
+        }
+    },
+    
+    {
+        "name": "settlement_create_ondemand",
+        "description": "Create an on-demand settlement",
+        "parameters": {
+            "amount": {
+                "type": "integer",
+                "description": "Settlement amount in smallest currency unit"
+            },
+            "settle_full_balance": {
+                "type": "boolean",
+                "description": "Whether to settle the full balance (default: false)"
+            },
+            "description": {
+                "type": "string",
+                "description": "Settlement description"
+            },
+            "notes": {
+                "type": "object",
+                "description": "Additional notes"
+            }
+        }
+    },
+    
+    {
+        "name": "settlement_report",
+        "description": "Get settlement reports with filtering",
+        "parameters": {
+            "year": {
+                "type": "integer",
+                "description": "Year for the settlement report"
+            },
+            "month": {
+                "type": "integer",
+                "description": "Month for the settlement report"
+            },
+            "day": {
+                "type": "integer",
+                "description": "Day for the settlement report (optional)"
+            },
+            "count": {
+                "type": "integer",
+                "description": "Number of reports to fetch (optional)"
+            },
+            "skip": {
+                "type": "integer",
+                "description": "Number of reports to skip (optional)"
+            }
+        }
+    },
+    
+    {
+        "name": "subscription_fetch",
+        "description": "Fetch subscription details",
+        "parameters": {
+            "subscription_id": {
+                "type": "string",
+                "description": "Subscription ID"
+            }
+        }
+    },
+    
+    {
+        "name": "subscriptions_list",
+        "description": "List subscriptions with optional filtering",
+        "parameters": {
+            "count": {
+                "type": "integer",
+                "description": "Number of subscriptions to fetch (default: 10)"
+            },
+            "skip": {
+                "type": "integer",
+                "description": "Number of subscriptions to skip (default: 0)"
+            },
+            "plan_id": {
+                "type": "string",
+                "description": "Filter subscriptions by plan ID"
+            },
+            "customer_id": {
+                "type": "string",
+                "description": "Filter subscriptions by customer ID"
+            },
+            "cursor": {
+                "type": "string",
+                "description": "next_cursor from the previous page, to continue a scan"
+            }
+        }
+    },
+    
+    {
+        "name": "subscription_create",
+        "description": "Create a new subscription",
+        "parameters": {
+            "plan_id": {
+                "type": "string",
+                "description": "Plan ID"
+            },
+            "customer_id": {
+                "type": "string",
+                "description": "Customer ID"
+            },
+            "total_count": {
+                "type": "integer",
+                "description": "Total number of billing cycles"
+            },
+            "quantity": {
+                "type": "integer",
+                "description": "Quantity of the product (default: 1)"
+            },
+            "start_at": {
+                "type": "integer",
+                "description": "Timestamp for when the subscription starts"
+            },
+            "expire_by": {
+                "type": "integer",
+                "description": "Timestamp for when the subscription link expires"
+            },
+            "customer_notify": {
+                "type": "boolean",
+                "description": "Whether to notify the customer (default: true)"
+            },
+            "notes": {
+                "type": "object",
+                "description": "Additional notes"
+            }
+        }
+    },
+    
+    {
+        "name": "subscription_cancel",
+        "description": "Cancel an active subscription",
+        "parameters": {
+            "subscription_id": {
+                "type": "string",
+                "description": "Subscription ID"
+            },
+            "cancel_at_cycle_end": {
+                "type": "boolean",
+                "description": "Whether to cancel at the end of the billing cycle (default: false)"
+            }
+        }
+    },
+    
+    {
+        "name": "subscription_pause",
+        "description": "Pause an active subscription",
+        "parameters": {
+            "subscription_id": {
+                "type": "string",
+                "description": "Subscription ID"
+            },
+            "pause_at": {
+                "type": "string",
+                "description": "When to pause the subscription (default: 'now')"
+            }
+        }
+    },
+    
+    {
+        "name": "subscription_resume",
+        "description": "Resume a paused subscription",
+        "parameters": {
+            "subscription_id": {
+                "type": "string",
+                "description": "Subscription ID"
+            },
+            "resume_at": {
+                "type": "string",
+                "description": "When to resume the subscription (optional)"
+            }
+        }
+    },
+    
+    {
+        "name": "plan_fetch",
+        "description": "Fetch plan details",
+        "parameters": {
+            "plan_id": {
+                "type": "string",
+                "description": "Plan ID"
+            }
+        }
+    },
+    
+    {
+        "name": "plans_list",
+        "description": "List plans with optional filtering",
+        "parameters": {
+            "count": {
+                "type": "integer",
+                "description": "Number of plans to fetch (default: 10)"
+            },
+            "skip": {
+                "type": "integer",
+                "description": "Number of plans to skip (default: 0)"
+            },
+            "cursor": {
+                "type": "string",
+                "description": "next_cursor from the previous page, to continue a scan"
+            }
+        }
+    },
+    
+    {
+        "name": "plan_create",
+        "description": "Create a new plan for subscriptions",
+        "parameters": {
+            "period": {
+                "type": "string",
+                "description": "Period type (daily, weekly, monthly, yearly)"
+            },
+            "interval": {
+                "type": "integer",
+                "description": "Number of periods between billings"
+            },
+            "item": {
+                "type": "object",
+                "description": "Item details including name, amount, currency and description"
+            },
+            "notes": {
+                "type": "object",
+                "description": "Additional notes (optional)"
+            }
+        }
+    }
+]
+
+# Tool execution function
+def execute_tool(tool_name: str, arguments: Dict[str, Any], client: Optional[RazorpayClient] = None) -> Dict[str, Any]:
+    """Execute the specified tool with the given arguments.
+
+    ``client`` is the merchant's client from the pool; the shared default
+    client is used when the caller supplied no credentials.
+    """
+    logger.info(f"Executing tool: {tool_name} with arguments: {arguments}")
+    client = client or razorpay_client
+    
+    # Map tool_name to handler function
+    if tool_name == "payment_fetch" or tool_name == "payment.fetch":
+        return client.get_payment({"id": arguments.get("payment_id")})
+    
+    elif tool_name == "order_create" or tool_name == "order.create":
+        params = {
+            "amount": arguments.get("amount"),
+            "currency": arguments.get("currency", "INR")
+        }
+        if "receipt" in arguments and arguments["receipt"]:
+            params["receipt"] = arguments["receipt"]
+        if "notes" in arguments and arguments["notes"]:
+            params["notes"] = arguments["notes"]
+        
+        return client.create_order(params)
+    
+    elif tool_name == "order_fetch" or tool_name == "order.fetch":
+        return client.get_order({"id": arguments.get("order_id")})
+    
+    elif tool_name == "payment_link_create" or tool_name == "payment_link.create":
+        params = {
+            "amount": arguments.get("amount"),
+            "currency": arguments.get("currency"),
+            "description": arguments.get("description")
+        }
+        
+        if "customer_name" in arguments and arguments["customer_name"]:
+            params["customer_name"] = arguments["customer_name"]
+        if "customer_email" in arguments and arguments["customer_email"]:
+            params["customer_email"] = arguments["customer_email"]
+        if "customer_contact" in arguments and arguments["customer_contact"]:
+            params["customer_contact"] = arguments["customer_contact"]
+        if "notes" in arguments and arguments["notes"]:
+            params["notes"] = arguments["notes"]
+        
+        return client.create_payment_link(params)
+    
+    elif tool_name == "payment_link_fetch" or tool_name == "payment_link.fetch":
+        return client.get_payment_link({"id": arguments.get("payment_link_id")})
+    
+    elif tool_name == "customer_create" or tool_name == "customer.create":
+        params = {
+            "name": arguments.get("name"),
+            "email": arguments.get("email")
+        }
+        
+        if "contact" in arguments and arguments["contact"]:
+            params["contact"] = arguments["contact"]
+        if "notes" in arguments and arguments["notes"]:
+            params["notes"] = arguments["notes"]
+        
+        return client.create_customer(params)
+    
+    elif tool_name == "customer_fetch" or tool_name == "customer.fetch":
+        return client.get_customer({"id": arguments.get("customer_id")})
+        
+    # Settlement tools
+    elif tool_name == "settlement_fetch" or tool_name == "settlement.fetch":
+        return client.get_settlement({"id": arguments.get("settlement_id")})
+        
+    elif tool_name == "settlements_list" or tool_name == "settlements.list":
+        params = {}
+        if "count" in arguments:
+            params["count"] = arguments["count"]
+        if "skip" in arguments:
+            params["skip"] = arguments["skip"]
+        if "from" in arguments:
+            params["from"] = arguments["from"]
+        if "to" in arguments:
+            params["to"] = arguments["to"]
+        if "cursor" in arguments:
+            params["cursor"] = arguments["cursor"]
+            
+        return client.list_settlements(params)
+        
+    elif tool_name == "settlement_create_ondemand" or tool_name == "settlement.create_ondemand":
+        params = {}
+        if "amount" in arguments:
+            params["amount"] = arguments["amount"]
+        if "settle_full_balance" in arguments:
+            params["settle_full_balance"] = arguments["settle_full_balance"]
+        if "description" in arguments:
+            params["description"] = arguments["description"]
+        if "notes" in arguments:
+            params["notes"] = arguments["notes"]
+            
+        return client.create_ondemand_settlement(params)
+        
+    elif tool_name == "settlement_report" or tool_name == "settlement.report":
+        params = {
+            "year": arguments.get("year"),
+            "month": arguments.get("month")
+        }
+        
+        if "day" in arguments:
+            params["day"] = arguments["day"]
+        if "count" in arguments:
+            params["count"] = arguments["count"]
+        if "skip" in arguments:
+            params["skip"] = arguments["skip"]
+            
+        return client.get_settlement_report(params)
+        
+    # Plan tools
+    elif tool_name == "plan_fetch" or tool_name == "plan.fetch":
+        return client.get_plan({"id": arguments.get("plan_id")})
+        
+    elif tool_name == "plans_list" or tool_name == "plans.list":
+        params = {}
+        if "count" in arguments:
+            params["count"] = arguments["count"]
+        if "skip" in arguments:
+            params["skip"] = arguments["skip"]
+        if "cursor" in arguments:
+            params["cursor"] = arguments["cursor"]
+            
+        return client.list_plans(params)
+        
+    elif tool_name == "plan_create" or tool_name == "plan.create":
+        params = {
+            "period": arguments.get("period"),
+            "interval": arguments.get("interval"),
+            "item": arguments.get("item")
+        }
+        
+        if "notes" in arguments:
+            params["notes"] = arguments["notes"]
+            
+        return client.create_plan(params)
+    
+    # Subscription tools
+    elif tool_name == "subscription_fetch" or tool_name == "subscription.fetch":
+        return client.get_subscription({"id": arguments.get("subscription_id")})
+        
+    elif tool_name == "subscriptions_list" or tool_name == "subscriptions.list":
+        params = {}
+        if "count" in arguments:
+            params["count"] = arguments["count"]
+        if "skip" in arguments:
+            params["skip"] = arguments["skip"]
+        if "plan_id" in arguments:
+            params["plan_id"] = arguments["plan_id"]
+        if "customer_id" in arguments:
+            params["customer_id"] = arguments["customer_id"]
+        if "cursor" in arguments:
+            params["cursor"] = arguments["cursor"]
+            
+        return client.list_subscriptions(params)
+        
+    elif tool_name == "subscription_create" or tool_name == "subscription.create":
+        params = {
+            "plan_id": arguments.get("plan_id"),
+            "customer_id": arguments.get("customer_id"),
+            "total_count": arguments.get("total_count")
+        }
+        
+        if "quantity" in arguments:
+            params["quantity"] = arguments["quantity"]
+        if "start_at" in arguments:
+            params["start_at"] = arguments["start_at"]
+        if "expire_by" in arguments:
+            params["expire_by"] = arguments["expire_by"]
+        if "customer_notify" in arguments:
+            params["customer_notify"] = arguments["customer_notify"]
+        if "notes" in arguments:
+            params["notes"] = arguments["notes"]
+            
+        return client.create_subscription(params)
+        
+    elif tool_name == "subscription_cancel" or tool_name == "subscription.cancel":
+        params = {
+            "id": arguments.get("subscription_id")
+        }
+        
+        if "cancel_at_cycle_end" in arguments:
+            params["cancel_at_cycle_end"] = arguments["cancel_at_cycle_end"]
+            
+        return client.cancel_subscription(params)
+        
+    elif tool_name == "subscription_pause" or tool_name == "subscription.pause":
+        params = {
+            "id": arguments.get("subscription_id")
+        }
+        
+        if "pause_at" in arguments:
+            params["pause_at"] = arguments["pause_at"]
+            
+        return client.pause_subscription(params)
+        
+    elif tool_name == "subscription_resume" or tool_name == "subscription.resume":
+        params = {
+            "id": arguments.get("subscription_id")
+        }
+        
+        if "resume_at" in arguments:
+            params["resume_at"] = arguments["resume_at"]
+            
+        return client.resume_subscription(params)
+    
+    else:
+        raise ValueError(f"Unknown tool: {tool_name}")